@@ -1,13 +1,27 @@
-from fastapi import APIRouter
+import json
+from contextlib import aclosing
 
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from api.dependencies import get_question_pipeline
 from core.question_pipeline import QuestionPipeline
-from models.consult import ConsultRequest, ConsultResponse
+from models.consult import (
+    BatchConsultRequest,
+    BatchConsultResult,
+    ConsultRequest,
+    ConsultResponse,
+)
+from services.logs import logger
 
 router = APIRouter(tags=["Consult"])
 
 
 @router.post("/question", response_model=ConsultResponse, status_code=200)
-async def consult_files(request: ConsultRequest) -> ConsultResponse:
+async def consult_files(
+    request: ConsultRequest,
+    pipeline: QuestionPipeline = Depends(get_question_pipeline),
+) -> ConsultResponse:
     """
     Process a question and return an answer with relevant references.
 
@@ -25,6 +39,101 @@ async def consult_files(request: ConsultRequest) -> ConsultResponse:
             "question": "What is the operating temperature range?"
         }
     """
-    pipeline = QuestionPipeline()
     answer, references = await pipeline.answer_question(request.question)
     return {"answer": answer, "references": references}
+
+
+@router.post(
+    "/question/stream",
+    response_class=StreamingResponse,
+    status_code=200,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def consult_files_stream(
+    request: ConsultRequest,
+    pipeline: QuestionPipeline = Depends(get_question_pipeline),
+) -> StreamingResponse:
+    """
+    Process a question and stream the answer as server-sent events.
+
+    Args:
+        request (ConsultRequest): The request object containing the question to be answered.
+
+    Returns:
+        StreamingResponse: A stream of server-sent events:
+            - references: JSON list of relevant references, sent as soon as they are retrieved
+            - token: JSON string with the next piece of the generated answer
+            - done: sent once the answer is complete
+            - error: JSON string describing a failure while answering
+
+    Example:
+        POST /question/stream
+        {
+            "question": "What is the operating temperature range?"
+        }
+    """
+
+    async def event_stream():
+        try:
+            # Closing the events when the client disconnects stops the answer
+            # generation and releases its connection to the LLM API
+            async with aclosing(pipeline.stream_answer(request.question)) as events:
+                async for event, data in events:
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logger.error(f"Error while streaming the answer: {e}")
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/questions/batch",
+    response_class=StreamingResponse,
+    status_code=200,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def consult_files_batch(
+    request: BatchConsultRequest,
+    pipeline: QuestionPipeline = Depends(get_question_pipeline),
+) -> StreamingResponse:
+    """
+    Answer many questions, streaming each result as a line of JSON.
+
+    The questions are embedded and searched in batches, and their answers are
+    generated concurrently. Results are sent as soon as they are ready, so their
+    order differs from the order of the questions.
+
+    Args:
+        request (BatchConsultRequest): The request object containing the questions to be answered.
+
+    Returns:
+        StreamingResponse: Newline-delimited JSON, one object per question:
+            - index (int): Position of the question in the request
+            - question (str): The question
+            - answer (str): The generated answer, absent if the question failed
+            - references (list): List of relevant references from the source documents
+            - error (str): Description of the failure, if the question failed
+
+    Example:
+        POST /questions/batch
+        {
+            "questions": [
+                "What is the operating temperature range?",
+                "How do I reset the device?"
+            ]
+        }
+    """
+
+    async def result_stream():
+        async with aclosing(pipeline.answer_questions(request.questions)) as results:
+            async for result in results:
+                yield BatchConsultResult(**result).model_dump_json(
+                    exclude_none=True
+                ) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
@@ -0,0 +1,56 @@
+from fastapi import Depends, Request
+
+from core.ingestion_jobs import IngestionJobManager
+from core.question_pipeline import QuestionPipeline
+from services.answer_cache import SemanticAnswerCache
+from services.llm import OpenAI
+from services.metadata_matcher import MetadataMatcher
+from services.single_flight import SingleFlight
+from services.vector_database import VectorDatabase
+
+
+def get_llm(request: Request) -> OpenAI:
+    """Return the application-scoped LLM service created on startup."""
+    return request.app.state.llm
+
+
+def get_vector_database(request: Request) -> VectorDatabase:
+    """Return the application-scoped vector database service created on startup."""
+    return request.app.state.vector_database
+
+
+def get_answer_cache(request: Request) -> SemanticAnswerCache | None:
+    """Return the semantic answer cache, or None when it is disabled."""
+    return request.app.state.answer_cache
+
+
+def get_metadata_matcher(request: Request) -> MetadataMatcher:
+    """Return the matcher of the metadata of the ingested documents."""
+    return request.app.state.metadata_matcher
+
+
+def get_question_flights(request: Request) -> SingleFlight:
+    """Return the coalescer of the identical questions answered concurrently."""
+    return request.app.state.question_flights
+
+
+def get_question_pipeline(
+    llm: OpenAI = Depends(get_llm),
+    vector_database: VectorDatabase = Depends(get_vector_database),
+    answer_cache: SemanticAnswerCache | None = Depends(get_answer_cache),
+    metadata_matcher: MetadataMatcher = Depends(get_metadata_matcher),
+    question_flights: SingleFlight = Depends(get_question_flights),
+) -> QuestionPipeline:
+    """Build a question pipeline on top of the shared service clients."""
+    return QuestionPipeline(
+        llm=llm,
+        vector_database=vector_database,
+        answer_cache=answer_cache,
+        metadata_matcher=metadata_matcher,
+        question_flights=question_flights,
+    )
+
+
+def get_ingestion_job_manager(request: Request) -> IngestionJobManager:
+    """Return the application-scoped ingestion job manager created on startup."""
+    return request.app.state.ingestion_job_manager
@@ -1,37 +1,80 @@
 import asyncio
-from typing import List
+from typing import Any, Dict, List
 
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 
-from core.ingestion_pipeline import IngestionPipeline
-from models.ingestion import IngestionResponse
+from api.dependencies import get_ingestion_job_manager
+from config.settings import Settings
+from core.ingestion_jobs import IngestionJobManager
+from models.ingestion import IngestionResponse, JobStatusResponse
+
+settings = Settings()
 
 router = APIRouter(tags=["Document Ingestion"])
 
 
-@router.post("/documents", response_model=IngestionResponse, status_code=200)
-async def upload_documents(files: List[UploadFile] = File(...)):
+@router.post("/documents", response_model=IngestionResponse, status_code=202)
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    job_manager: IngestionJobManager = Depends(get_ingestion_job_manager),
+):
     """
     Upload one or more PDF documents.
 
+    The documents are streamed to disk, at most ``INGESTION_UPLOAD_CONCURRENCY``
+    at a time, and processed in the background, one job per document.
+
     Args:
         files: List of PDF files to be uploaded
 
     Returns:
-        dict: Status of the upload operation
+        dict: The ingestion jobs created for the uploaded documents
     """
-    pipeline = IngestionPipeline()
+    semaphore = asyncio.Semaphore(settings.INGESTION_UPLOAD_CONCURRENCY)
+
+    async def submit(f: UploadFile) -> Dict[str, Any]:
+        async with semaphore:
+            job = await job_manager.submit(f.filename, f.file)
+        return {
+            "job_id": job["id"],
+            "filename": job["filename"],
+            "status": job["status"],
+        }
+
+    jobs = await asyncio.gather(
+        *[submit(f) for f in files if f.content_type == "application/pdf"]
+    )
+
+    return {
+        "message": "Documents queued for processing",
+        "jobs": jobs,
+    }
 
-    ingestion_tasks = []
-    for f in files:
-        if f.content_type == "application/pdf":
-            ingestion_tasks.append(pipeline.process(f.filename, await f.read()))
 
-    results = await asyncio.gather(*ingestion_tasks)
-    total_chunks = sum(len(chunks) for chunks in results)
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse, status_code=200)
+async def get_job(
+    job_id: str,
+    job_manager: IngestionJobManager = Depends(get_ingestion_job_manager),
+):
+    """
+    Get the status and progress of an ingestion job.
+
+    Args:
+        job_id: Id of the job returned by the upload
+
+    Returns:
+        dict: Status of the job and progress of each ingestion stage
+    """
+    job = await job_manager.job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
 
     return {
-        "message": "Documents processed successfully",
-        "documents_indexed": len(results),
-        "total_chunks": total_chunks,
+        "job_id": job["id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
     }
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from services.telemetry import registry
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, status_code=200)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Expose the metrics of the pipelines in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: Stage durations, LLM and Qdrant request durations, token
+            usage, retries, cache hit rates and event loop lag
+    """
+    return PlainTextResponse(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import os
+import re
+import time
+from io import BytesIO
+from typing import Callable, Coroutine, List
+
+from benchmarks.run_benchmark import DATA_DIR, _load_documents
+
+# The chunker only reads the embedding model from the settings, which require the
+# whole configuration of the backend: placeholders let the benchmark run without it
+_PLACEHOLDER_ENVIRONMENT = {
+    "OPENAI_ENDPOINT": "http://127.0.0.1:9",
+    "OPENAI_API_KEY": "benchmark",
+    "OPENAI_API_VERSION": "2024-10-21",
+    "OPENAI_TYPE": "openai",
+    "OPENAI_CHAT_MODEL": "gpt-4o-mini",
+    "OPENAI_EMBEDDING_MODEL": "text-embedding-3-small",
+    "QDRANT_ENDPOINT": ":memory:",
+    "QDRANT_PORT": "6333",
+    "QDRANT_COLLECTION_NAME": "benchmark",
+    "AZURE_OCR_ENDPOINT": "http://127.0.0.1:9",
+    "AZURE_OCR_KEY": "benchmark",
+}
+
+
+class _LegacyTextChunker:
+    """
+    The asynchronous TextChunker this benchmark compares against, kept as the
+    baseline: it recompiles its patterns on every call, copies the text several
+    times and gathers one coroutine per chunk to add the overlap.
+    """
+
+    def __init__(self, chunk_size=1000, chunk_overlap=200, separator="\n"):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separator = separator
+
+    async def _handle_long_segment(self, segment: str) -> List[str]:
+        words = segment.split()
+        chunks = []
+        temp_chunk = []
+        temp_length = 0
+        for word in words:
+            word_length = len(word) + 1
+            if temp_length + word_length > self.chunk_size:
+                if temp_chunk:
+                    chunks.append(" ".join(temp_chunk))
+                temp_chunk = [word]
+                temp_length = word_length
+            else:
+                temp_chunk.append(word)
+                temp_length += word_length
+        if temp_chunk:
+            chunks.append(" ".join(temp_chunk))
+        await asyncio.sleep(0)
+        return chunks
+
+    async def _add_overlap(self, chunks: List[str]) -> List[str]:
+        if self.chunk_overlap <= 0 or len(chunks) <= 1:
+            return chunks
+
+        async def process_chunk(i: int) -> str:
+            if i == 0:
+                return chunks[i]
+            prev_chunk = chunks[i - 1]
+            start_idx = max(0, len(prev_chunk) - self.chunk_overlap)
+            return prev_chunk[start_idx:] + self.separator + chunks[i]
+
+        tasks = [process_chunk(i) for i in range(len(chunks))]
+        return list(await asyncio.gather(*tasks))
+
+    async def split_text(self, text: str) -> List[str]:
+        text = re.sub(r"<[^>]+>", "", text)
+        text = re.sub(r"\s+", " ", text).strip()
+        text = re.sub(r"\n+", "\n", text.strip())
+        segments = [seg.strip() for seg in text.split(self.separator) if seg.strip()]
+
+        chunks = []
+        current_chunk = []
+        current_length = 0
+        chunk_tasks: List[Coroutine] = []
+        for segment in segments:
+            if len(segment) > self.chunk_size:
+                if current_chunk:
+                    chunks.append(self.separator.join(current_chunk))
+                chunk_tasks.append(self._handle_long_segment(segment))
+                current_chunk = []
+                current_length = 0
+                continue
+            if current_length + len(segment) > self.chunk_size and current_chunk:
+                chunks.append(self.separator.join(current_chunk))
+                current_chunk = []
+                current_length = 0
+            current_chunk.append(segment)
+            current_length += len(segment) + len(self.separator)
+        if current_chunk:
+            chunks.append(self.separator.join(current_chunk))
+        for result in await asyncio.gather(*chunk_tasks):
+            chunks.extend(result)
+
+        return await self._add_overlap(chunks)
+
+
+def _load_texts(args: argparse.Namespace) -> List[str]:
+    if args.text_files:
+        texts = []
+        for path in args.text_files:
+            with open(path, encoding="utf-8") as f:
+                texts.append(f.read())
+        return texts
+
+    from markitdown import MarkItDown
+
+    markitdown = MarkItDown()
+    return [
+        markitdown.convert(BytesIO(content)).markdown
+        for _, content in _load_documents(args.documents)
+    ]
+
+
+def _measure(split: Callable[[str], List[str]], texts: List[str], repeat: int):
+    """Return the best time of splitting every text and the number of chunks."""
+    best = float("inf")
+    chunks = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = sum(len(split(text)) for text in texts)
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the throughput of the TextChunker with the legacy one."
+    )
+    parser.add_argument(
+        "--documents",
+        default=os.path.join(DATA_DIR, "*.pdf"),
+        help="Glob of the PDF documents to convert and chunk",
+    )
+    parser.add_argument(
+        "--text-files",
+        nargs="*",
+        help="Already extracted texts to chunk instead of the PDF documents",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, value in _PLACEHOLDER_ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    from services.chunker import TextChunker
+
+    texts = _load_texts(args)
+    megabytes = sum(len(text) for text in texts) / 1e6
+
+    legacy = _LegacyTextChunker(args.chunk_size, args.chunk_overlap)
+    chunker = TextChunker(args.chunk_size, args.chunk_overlap, clean_html_tags=True)
+
+    loop = asyncio.new_event_loop()
+    results = {
+        "legacy": _measure(
+            lambda text: loop.run_until_complete(legacy.split_text(text)),
+            texts,
+            args.repeat,
+        ),
+        "current": _measure(chunker.chunk, texts, args.repeat),
+    }
+    loop.close()
+
+    print(f"{len(texts)} texts, {megabytes:.2f} MB, best of {args.repeat} runs")
+    for name, (seconds, chunks) in results.items():
+        print(
+            f"{name:<8} {seconds * 1000:8.2f} ms {megabytes / seconds:8.2f} MB/s "
+            f"{chunks / seconds:10.0f} chunks/s ({chunks} chunks)"
+        )
+    print(f"Speedup: {results['legacy'][0] / results['current'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
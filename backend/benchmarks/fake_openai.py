@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+_WORD_PATTERN = re.compile(r"[a-z][a-z0-9\-]{3,}")
+_STOPWORDS = {
+    "about",
+    "after",
+    "also",
+    "before",
+    "between",
+    "could",
+    "does",
+    "each",
+    "extract",
+    "following",
+    "from",
+    "have",
+    "information",
+    "into",
+    "more",
+    "must",
+    "query",
+    "relevant",
+    "should",
+    "that",
+    "their",
+    "them",
+    "then",
+    "there",
+    "these",
+    "this",
+    "what",
+    "when",
+    "which",
+    "with",
+    "would",
+    "your",
+}
+
+
+def _top_words(text: str, count: int) -> List[str]:
+    """Return the most frequent meaningful words of a text."""
+    words = Counter(
+        word
+        for word in _WORD_PATTERN.findall(text.lower())
+        if word not in _STOPWORDS
+    )
+    return [word for word, _ in words.most_common(count)]
+
+
+class FakeOpenAIServer:
+    """
+    A deterministic stand-in for the OpenAI and Azure OpenAI APIs.
+
+    This server provides:
+    - Embeddings built by hashing the words of each input, so texts sharing words
+      have similar vectors and searches return meaningful results
+    - Chat completions answering JSON prompts with keywords taken from the input and
+      any other prompt with a fixed answer, optionally streamed
+    - A configurable latency per request and per streamed token
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        embedding_latency: float = 0.05,
+        chat_latency: float = 0.2,
+        token_latency: float = 0.005,
+        answer_tokens: int = 200,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Initialize the FakeOpenAIServer.
+
+        Args:
+            dimensions (int): Size of the embedding vectors
+            embedding_latency (float): Delay in seconds of each embedding request
+            chat_latency (float): Delay in seconds before a chat completion starts
+            token_latency (float): Delay in seconds between streamed answer tokens
+            answer_tokens (int): Number of tokens of the generated answers
+            host (str): Host to listen on
+            port (int): Port to listen on, 0 to pick a free port
+        """
+        self.dimensions = dimensions
+        self.embedding_latency = embedding_latency
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.host = host
+        self.port = port
+
+        self.requests: Counter = Counter()
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the OpenAI compatible API."""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _embed(self, text: str) -> List[float]:
+        """Build a normalized bag-of-words vector of a text."""
+        vector = [0.0] * self.dimensions
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _answer(self) -> List[str]:
+        """Build the tokens of a generated answer."""
+        return [f"token{i} " for i in range(self.answer_tokens)]
+
+    async def _handle_embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.requests["embeddings"] += 1
+
+        await asyncio.sleep(self.embedding_latency)
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = self._embed(text)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(array("f", vector).tobytes()).decode()
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        return web.json_response(
+            {
+                "object": "list",
+                "model": body.get("model", "fake-embedding"),
+                "data": data,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    async def _handle_chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        messages = body["messages"]
+        system_prompt = str(messages[0]["content"])
+        user_prompt = json.dumps(messages[-1]["content"])
+        self.requests["chat"] += 1
+
+        await asyncio.sleep(self.chat_latency)
+
+        if "JSON" in system_prompt:
+            is_document = "documents" in system_prompt
+            tokens = [
+                json.dumps(
+                    {
+                        "product_name": "",
+                        "keywords": _top_words(user_prompt, 10 if is_document else 3),
+                    }
+                )
+            ]
+        else:
+            tokens = self._answer()
+
+        completion = {
+            "id": f"chatcmpl-{self.requests['chat']}",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-chat"),
+        }
+        prompt_tokens = sum(len(str(m["content"])) // 4 + 1 for m in messages)
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.token_latency * len(tokens))
+            return web.json_response(
+                {
+                    **completion,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": "".join(tokens),
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": prompt_tokens + len(tokens),
+                    },
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in tokens:
+            chunk = {
+                **completion,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {"index": 0, "delta": {"content": token}, "finish_reason": None}
+                ],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(self.token_latency)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+
+        return response
+
+    def _create_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/embeddings", self._handle_embeddings)
+        app.router.add_post("/v1/chat/completions", self._handle_chat)
+        # Azure OpenAI routes
+        app.router.add_post(
+            "/openai/deployments/{deployment}/embeddings", self._handle_embeddings
+        )
+        app.router.add_post(
+            "/openai/deployments/{deployment}/chat/completions", self._handle_chat
+        )
+        return app
+
+    async def serve(self) -> None:
+        """Start serving on the current event loop."""
+        self._runner = web.AppRunner(self._create_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+
+    async def shutdown(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start(self) -> None:
+        """
+        Start serving from a background thread, so the server does not share the
+        event loop of the benchmarked application.
+        """
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-openai", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self) -> None:
+        """Stop the server started with ``start``."""
+        if self._loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of requests served by endpoint."""
+        return dict(self.requests)
+
+
+async def _serve_forever(server: FakeOpenAIServer) -> None:
+    await server.serve()
+    print(f"Fake OpenAI API listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run a deterministic fake OpenAI API for local benchmarks."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        dimensions=args.dimensions,
+        embedding_latency=args.embedding_latency,
+        chat_latency=args.chat_latency,
+        token_latency=args.token_latency,
+        answer_tokens=args.answer_tokens,
+        host=args.host,
+        port=args.port,
+    )
+    try:
+        asyncio.run(_serve_forever(server))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+from qdrant_client import models as qdrant_models
+
+from config.settings import Settings
+from services.vector_database import VectorDatabase
+
+settings = Settings()
+
+# Bytes of one dimension of a dense vector with each quantization
+_BYTES_PER_DIMENSION = {"none": 4, "scalar": 1, "binary": 1 / 8}
+
+
+async def _sample_vectors(
+    vector_database: VectorDatabase, count: int
+) -> List[List[float]]:
+    """Return the dense vectors of random points of the collection."""
+    response = await vector_database.qdrant.query_points(
+        collection_name=settings.QDRANT_COLLECTION_NAME,
+        query=qdrant_models.SampleQuery(sample=qdrant_models.Sample.RANDOM),
+        limit=count,
+        with_payload=False,
+        with_vectors=True,
+    )
+    vectors = []
+    for point in response.points:
+        vector = point.vector
+        if isinstance(vector, dict):
+            vector = vector.get("")
+        if vector:
+            vectors.append(vector)
+    return vectors
+
+
+async def _search(
+    vector_database: VectorDatabase,
+    vector: List[float],
+    limit: int,
+    params: Optional[qdrant_models.SearchParams],
+) -> List[str]:
+    response = await vector_database.qdrant.query_points(
+        collection_name=settings.QDRANT_COLLECTION_NAME,
+        query=vector,
+        limit=limit,
+        search_params=params,
+        with_payload=False,
+    )
+    return [str(point.id) for point in response.points]
+
+
+async def run(args: argparse.Namespace) -> None:
+    vector_database = VectorDatabase()
+    try:
+        collection = await vector_database.qdrant.get_collection(
+            settings.QDRANT_COLLECTION_NAME
+        )
+        vectors = await _sample_vectors(vector_database, args.queries)
+        if not vectors:
+            print(f"Collection {settings.QDRANT_COLLECTION_NAME} has no vectors")
+            return
+
+        exact = qdrant_models.SearchParams(exact=True)
+        approximate = vector_database._search_params()
+        recalls = []
+        exact_seconds = approximate_seconds = 0.0
+        for vector in vectors:
+            start = time.perf_counter()
+            expected = await _search(vector_database, vector, args.limit, exact)
+            exact_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = await _search(vector_database, vector, args.limit, approximate)
+            approximate_seconds += time.perf_counter() - start
+
+            if expected:
+                recalls.append(len(set(found) & set(expected)) / len(expected))
+    finally:
+        await vector_database.close()
+
+    quantization = settings.QDRANT_QUANTIZATION
+    points = collection.points_count or 0
+    dimensions = len(vectors[0])
+    original_mb = points * dimensions * 4 / 1e6
+    searched_mb = points * dimensions * _BYTES_PER_DIMENSION[quantization] / 1e6
+
+    print(
+        f"{settings.QDRANT_COLLECTION_NAME}: {points} points, {dimensions} dimensions, "
+        f"quantization={quantization}, on_disk={settings.QDRANT_ON_DISK}, "
+        f"hnsw_ef={settings.QDRANT_HNSW_EF}, "
+        f"oversampling={settings.QDRANT_OVERSAMPLING}, "
+        f"rescore={settings.QDRANT_RESCORE}"
+    )
+    print(
+        f"Recall@{args.limit}: {sum(recalls) / len(recalls):.4f} "
+        f"(min {min(recalls):.2f}) over {len(recalls)} queries"
+    )
+    print(
+        f"Latency: exact {exact_seconds / len(vectors) * 1000:.2f} ms, "
+        f"approximate {approximate_seconds / len(vectors) * 1000:.2f} ms"
+    )
+    print(
+        f"Searched vectors: {searched_mb:.1f} MB instead of {original_mb:.1f} MB of "
+        "float32 vectors "
+        f"({original_mb / searched_mb:.0f}x less)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure the recall of the configured vector search against an exact "
+            "search on the Qdrant collection."
+        )
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=100,
+        help="Number of random points of the collection used as queries",
+    )
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
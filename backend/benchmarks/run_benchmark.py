@@ -0,0 +1,468 @@
+import argparse
+import asyncio
+import functools
+import glob
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import warnings
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """Return the percentile of sorted values, interpolating between ranks."""
+    if len(values) == 1:
+        return values[0]
+    rank = (len(values) - 1) * percentile / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+class LatencyRecorder:
+    """Collects latency samples by name and summarizes them."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Record a latency sample.
+
+        Args:
+            name (str): Name of the measured operation
+            seconds (float): Duration of the operation in seconds
+        """
+        self.samples[name].append(seconds)
+
+    def summary(self, prefix: str = "") -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the samples whose name starts with a prefix.
+
+        Args:
+            prefix (str): Prefix of the names to summarize
+
+        Returns:
+            Dict[str, Dict[str, float]]: Count and latency percentiles in
+                milliseconds, by name
+        """
+        summary = {}
+        for name, samples in sorted(self.samples.items()):
+            if not name.startswith(prefix):
+                continue
+            values = sorted(samples)
+            summary[name] = {
+                "count": len(values),
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": _percentile(values, 50) * 1000,
+                "p95_ms": _percentile(values, 95) * 1000,
+                "p99_ms": _percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return summary
+
+
+def _timed(owner: type, method: str, name: str, recorder: LatencyRecorder) -> None:
+    """Wrap a coroutine method so each call is recorded under a name."""
+    original = getattr(owner, method)
+
+    @functools.wraps(original)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            recorder.add(name, time.perf_counter() - start)
+
+    setattr(owner, method, wrapper)
+
+
+def _instrument(recorder: LatencyRecorder) -> None:
+    """Record the latency of every pipeline stage and backend call."""
+    from core.ingestion_pipeline import IngestionPipeline
+    from core.stage_graph import StageRun
+    from services.llm import OpenAI
+    from services.vector_database import VectorDatabase
+
+    run_stage = StageRun._run_stage
+
+    @functools.wraps(run_stage)
+    async def record_stage(self, stage):
+        try:
+            return await run_stage(self, stage)
+        finally:
+            # Stage timings exclude the time spent waiting for dependencies
+            if stage.name in self.timings:
+                recorder.add(f"question.{stage.name}", self.timings[stage.name])
+
+    StageRun._run_stage = record_stage
+
+    _timed(IngestionPipeline, "process", "ingestion.document", recorder)
+    _timed(IngestionPipeline, "_extract_text_from_pdf", "ingestion.extract", recorder)
+    _timed(IngestionPipeline, "_extract_metadata", "ingestion.metadata", recorder)
+    _timed(OpenAI, "_embed_batch", "backend.embedding_batch", recorder)
+    _timed(VectorDatabase, "_upsert_batch", "backend.qdrant_upsert_batch", recorder)
+    _timed(VectorDatabase, "search_by_embedding", "backend.qdrant_search", recorder)
+
+
+def _configure_environment(openai_url: str, work_dir: str, caches: bool) -> None:
+    """Point the settings to the local stand-ins before the application loads."""
+    os.environ.update(
+        {
+            "OPENAI_ENDPOINT": openai_url,
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_API_VERSION": "2024-10-21",
+            "OPENAI_TYPE": "openai",
+            "OPENAI_CHAT_MODEL": "fake-chat",
+            "OPENAI_EMBEDDING_MODEL": "fake-embedding",
+            "QDRANT_ENDPOINT": ":memory:",
+            "QDRANT_PORT": "6333",
+            "QDRANT_COLLECTION_NAME": "benchmark",
+            "EMBEDDING_CACHE_PATH": os.path.join(work_dir, "embeddings.sqlite3"),
+            "INGESTION_JOBS_DB_PATH": os.path.join(work_dir, "jobs.sqlite3"),
+            "INGESTION_REGISTRY_DB_PATH": os.path.join(work_dir, "documents.sqlite3"),
+            "INGESTION_UPLOAD_DIR": os.path.join(work_dir, "uploads"),
+            # OCR is not available offline, documents must have a text layer
+            "AZURE_OCR_ENDPOINT": "http://127.0.0.1:9",
+            "AZURE_OCR_KEY": "benchmark",
+        }
+    )
+    if not caches:
+        os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+
+
+def _load_documents(pattern: str) -> List[Tuple[str, bytes]]:
+    """
+    Load the benchmark documents.
+
+    Some of the bundled PDFs were saved with a download page header before the
+    ``%PDF`` signature, which PDF parsers reject, so anything before it is dropped.
+    """
+    documents = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "rb") as f:
+            content = f.read()
+        start = content.find(b"%PDF")
+        documents.append((os.path.basename(path), content[max(start, 0) :]))
+    return documents
+
+
+def _load_questions(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [example["question"] for example in json.load(f)]
+
+
+def _peak_rss_mb() -> Dict[str, float]:
+    """Return the peak resident set size of this process and its children."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit,
+    }
+
+
+async def _ingest(
+    client: httpx.AsyncClient,
+    documents: List[Tuple[str, bytes]],
+    recorder: LatencyRecorder,
+) -> Dict[str, Any]:
+    """Upload the documents and wait for their ingestion jobs to finish."""
+    start = time.perf_counter()
+    response = await client.post(
+        "/documents",
+        files=[
+            ("files", (name, content, "application/pdf"))
+            for name, content in documents
+        ],
+    )
+    response.raise_for_status()
+    recorder.add("api.documents", time.perf_counter() - start)
+
+    pending = {job["job_id"] for job in response.json()["jobs"]}
+    jobs = {}
+    while pending:
+        await asyncio.sleep(0.1)
+        for job_id in list(pending):
+            job = (await client.get(f"/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                recorder.add("ingestion.job", job["updated_at"] - job["created_at"])
+                jobs[job_id] = job
+                pending.discard(job_id)
+
+    wall_time = time.perf_counter() - start
+    failed = [job for job in jobs.values() if job["status"] == "failed"]
+    chunks = sum(job["progress"]["upserted"] for job in jobs.values())
+
+    return {
+        "documents": len(documents),
+        "failed": len(failed),
+        "errors": [f"{job['filename']}: {job['error']}" for job in failed],
+        "chunks": chunks,
+        "wall_time_s": wall_time,
+        "chunks_per_second": chunks / wall_time,
+    }
+
+
+async def _ask(
+    client: httpx.AsyncClient, question: str, stream: bool, recorder: LatencyRecorder
+) -> None:
+    start = time.perf_counter()
+    if not stream:
+        response = await client.post("/question", json={"question": question})
+        response.raise_for_status()
+        recorder.add("api.question", time.perf_counter() - start)
+        return
+
+    first_token = None
+    async with client.stream(
+        "POST", "/question/stream", json={"question": question}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line == "event: error":
+                raise RuntimeError("The answer stream failed")
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - start
+                recorder.add("api.question_stream.first_token", first_token)
+    recorder.add("api.question_stream", time.perf_counter() - start)
+
+
+async def _replay_questions(
+    client: httpx.AsyncClient,
+    questions: List[str],
+    concurrency: int,
+    stream: bool,
+    recorder: LatencyRecorder,
+) -> Dict[str, Any]:
+    """Ask the questions with a bounded number of requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = []
+
+    async def ask(question: str) -> None:
+        async with semaphore:
+            try:
+                await _ask(client, question, stream, recorder)
+            except Exception as e:
+                errors.append(repr(e))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[ask(question) for question in questions])
+    wall_time = time.perf_counter() - start
+
+    return {
+        "requests": len(questions),
+        "failed": len(errors),
+        "errors": sorted(set(errors)),
+        "concurrency": concurrency,
+        "wall_time_s": wall_time,
+        "requests_per_second": len(questions) / wall_time,
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the benchmark against the application with local stand-ins.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        Dict[str, Any]: The benchmark results
+    """
+    server = FakeOpenAIServer(
+        dimensions=int(os.environ.get("VECTOR_DIMENSIONS", 1536)),
+        embedding_latency=args.embedding_latency,
+        chat_latency=args.chat_latency,
+        token_latency=args.token_latency,
+        answer_tokens=args.answer_tokens,
+    )
+    server.start()
+    work_dir = tempfile.TemporaryDirectory(prefix="rag-benchmark-")
+    _configure_environment(server.url, work_dir.name, caches=not args.no_caches)
+
+    # The settings are read when the application modules are imported
+    from main import app
+
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+    recorder = LatencyRecorder()
+    _instrument(recorder)
+
+    documents = _load_documents(args.documents)
+    questions = _load_questions(args.questions) * args.iterations
+
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://benchmark",
+                timeout=None,
+            ) as client:
+                ingestion = await _ingest(client, documents, recorder)
+                questions_result = await _replay_questions(
+                    client, questions, args.concurrency, args.stream, recorder
+                )
+    finally:
+        server.stop()
+        work_dir.cleanup()
+
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "iterations": args.iterations,
+            "stream": args.stream,
+            "caches": not args.no_caches,
+            "embedding_latency_s": args.embedding_latency,
+            "chat_latency_s": args.chat_latency,
+            "token_latency_s": args.token_latency,
+            "answer_tokens": args.answer_tokens,
+        },
+        "ingestion": {**ingestion, "stages": recorder.summary("ingestion.")},
+        "questions": {**questions_result, "stages": recorder.summary("question.")},
+        "api": recorder.summary("api."),
+        "backends": {**recorder.summary("backend."), "openai_requests": server.stats()},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare_with_baseline(
+    results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float
+) -> List[str]:
+    """
+    Compare the results with a baseline run.
+
+    Args:
+        results (Dict[str, Any]): Results of this run
+        baseline (Dict[str, Any]): Results of the baseline run
+        max_regression (float): Tolerated relative increase of the p95 latencies
+            and decrease of the throughputs
+
+    Returns:
+        List[str]: Description of each regression
+    """
+    regressions = []
+    for section in ("ingestion", "questions"):
+        for name, stage in results[section]["stages"].items():
+            base = baseline[section]["stages"].get(name)
+            if base and stage["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+                regressions.append(
+                    f"{name} p95 {base['p95_ms']:.1f}ms -> {stage['p95_ms']:.1f}ms"
+                )
+
+    for section, key in (
+        ("ingestion", "chunks_per_second"),
+        ("questions", "requests_per_second"),
+    ):
+        base, current = baseline[section][key], results[section][key]
+        if current < base * (1 - max_regression):
+            regressions.append(f"{section} {key} {base:.2f} -> {current:.2f}")
+
+    return regressions
+
+
+def _print_summary(results: Dict[str, Any]) -> None:
+    ingestion, questions = results["ingestion"], results["questions"]
+    print(
+        f"Ingestion: {ingestion['documents']} documents, {ingestion['chunks']} chunks "
+        f"in {ingestion['wall_time_s']:.2f}s ({ingestion['failed']} failed)"
+    )
+    print(
+        f"Questions: {questions['requests']} requests in "
+        f"{questions['wall_time_s']:.2f}s, "
+        f"{questions['requests_per_second']:.2f} req/s ({questions['failed']} failed)"
+    )
+
+    stages = {
+        **ingestion["stages"],
+        **questions["stages"],
+        **results["api"],
+        **{k: v for k, v in results["backends"].items() if k.startswith("backend.")},
+    }
+    print(f"{'stage':<36}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stage in stages.items():
+        print(
+            f"{name:<36}{stage['count']:>7}{stage['p50_ms']:>10.1f}"
+            f"{stage['p95_ms']:>10.1f}{stage['p99_ms']:>10.1f}"
+        )
+
+    rss = results["peak_rss_mb"]
+    print(f"Peak RSS: {rss['self']:.0f} MB (workers: {rss['children']:.0f} MB)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark document ingestion and question answering offline, against "
+            "a fake OpenAI API and an in-memory Qdrant. Other settings are read from "
+            "the environment as usual."
+        )
+    )
+    parser.add_argument(
+        "--documents",
+        default=os.path.join(DATA_DIR, "*.pdf"),
+        help="Glob of the PDF documents to ingest",
+    )
+    parser.add_argument(
+        "--questions",
+        default=os.path.join(DATA_DIR, "question_examples.json"),
+        help="JSON file of question examples to replay",
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--iterations", type=int, default=1, help="Number of replays of the questions"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="Ask through /question/stream"
+    )
+    parser.add_argument(
+        "--no-caches",
+        action="store_true",
+        help="Disable the embedding and answer caches",
+    )
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="Path of the JSON results"
+    )
+    parser.add_argument("--baseline", help="JSON results of a previous run")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Tolerated relative regression compared to the baseline",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    _print_summary(results)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
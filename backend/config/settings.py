@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -14,12 +14,100 @@ class Settings(BaseSettings):
     OPENAI_CHAT_MODEL: str
     OPENAI_EMBEDDING_MODEL: str
 
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 60.0
+
+    EMBEDDING_BATCH_SIZE: int = 256
+    EMBEDDING_BATCH_MAX_TOKENS: int = 50000
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 5
+    EMBEDDING_RETRY_BASE_DELAY: float = 1.0
+
+    LLM_REQUESTS_PER_MINUTE: int = 0
+    LLM_TOKENS_PER_MINUTE: int = 0
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_BACKGROUND_RESERVE: float = 0.2
+    LLM_CHAT_COMPLETION_TOKENS: int = 500
+
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_PATH: Optional[str] = ".cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = 100000
+
     QDRANT_ENDPOINT: str
     QDRANT_PORT: int
     QDRANT_API_KEY: Optional[str] = None
     QDRANT_COLLECTION_NAME: str
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_UPSERT_BATCH_SIZE: int = 64
+    QDRANT_UPSERT_PARALLELISM: int = 4
+    QDRANT_UPSERT_WAIT: bool = True
+    QDRANT_UPSERT_MAX_RETRIES: int = 3
+    QDRANT_UPSERT_RETRY_BASE_DELAY: float = 0.5
+    QDRANT_QUANTIZATION: Literal["none", "scalar", "binary"] = "none"
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True
+    QDRANT_ON_DISK: bool = False
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    QDRANT_HNSW_EF: Optional[int] = None
+    QDRANT_RESCORE: bool = True
+    QDRANT_OVERSAMPLING: float = 2.0
+    QDRANT_MIGRATE_COLLECTION: bool = True
 
     VECTOR_DIMENSIONS: int = 1536
 
+    HYBRID_SEARCH_ENABLED: bool = False
+    HYBRID_PREFETCH_LIMIT: int = 20
+
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_COLLECTION_NAME: Optional[str] = None
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+
+    QUESTION_ENHANCE_TIMEOUT: float = 10.0
+    QUESTION_FILTER_TIMEOUT: float = 10.0
+    QUESTION_RETRIEVAL_TIMEOUT: float = 15.0
+    QUESTION_ANSWER_TIMEOUT: float = 60.0
+    QUESTION_BATCH_SIZE: int = 64
+    QUESTION_BATCH_CONCURRENCY: int = 8
+
+    FILTER_FUZZY_CUTOFF: float = 0.8
+    FILTER_LLM_FALLBACK: bool = False
+
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    RETRIEVAL_CANDIDATES: int = 20
+    RERANK_ENABLED: bool = True
+    RERANK_MMR_LAMBDA: float = 0.5
+    RERANK_MIN_SCORE: float = 0.0
+    RERANK_MAX_RESULTS: int = 8
+    RERANK_MAX_CONTEXT_TOKENS: int = 1500
+
+    INGESTION_WORKERS: int = 2
+    INGESTION_JOBS_DB_PATH: str = ".cache/jobs.sqlite3"
+    INGESTION_REGISTRY_DB_PATH: str = ".cache/documents.sqlite3"
+    INGESTION_UPLOAD_DIR: str = ".cache/uploads"
+    INGESTION_UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    INGESTION_UPLOAD_CONCURRENCY: int = 4
+    INGESTION_BATCH_SIZE: int = 64
+    INGESTION_EMBEDDING_WORKERS: int = 2
+
+    CHUNKING_MODE: Literal["characters", "markdown"] = "characters"
+    CHUNK_MAX_TOKENS: int = 512
+    CHUNK_OVERLAP_TOKENS: int = 64
+
+    METADATA_MAX_TOKENS: int = 8000
+    METADATA_MAX_PARTS: int = 4
+
+    PDF_PROCESS_WORKERS: int = 2
+    PDF_THREAD_WORKERS: int = 4
+    PDF_PROCESS_POOL_MIN_BYTES: int = 1024 * 1024
+    PDF_CONVERSION_TIMEOUT: float = 300.0
+
+    METRICS_EVENT_LOOP_INTERVAL: float = 0.5
+
     AZURE_OCR_ENDPOINT: str
     AZURE_OCR_KEY: str
@@ -1,19 +1,96 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
+from config.settings import Settings
+from core.ingestion_jobs import IngestionJobManager
+from core.ingestion_pipeline import IngestionPipeline
+from services.answer_cache import SemanticAnswerCache
+from services.document_converter import DocumentConverter
+from services.document_registry import DocumentRegistry
+from services.embedding_cache import embedding_cache
+from services.job_store import JobStore
+from services.llm import OpenAI
 from services.logs import logger
+from services.metadata_matcher import MetadataMatcher
+from services.single_flight import SingleFlight
+from services.telemetry import EventLoopMonitor
+from services.tokenizer import get_token_counter
 from services.vector_database import VectorDatabase
 
+settings = Settings()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    event_loop_monitor = EventLoopMonitor()
+    event_loop_monitor.start()
+
+    # Load the tokenizer of the chunker now, so a missing encoding is logged at
+    # startup rather than on the first upload
+    await asyncio.to_thread(get_token_counter)
+
+    llm = OpenAI()
+    vector_database = VectorDatabase(llm=llm)
+
     try:
         logger.info("Checking Vector DB Collection")
-        await VectorDatabase.assert_collection()
+        await vector_database.assert_collection()
         logger.info("Vector DB Collection is ready")
     except Exception as e:
         logger.error(f"Error during Vector DB Collection check: {e}")
-        await VectorDatabase.create_collection()
+        await vector_database.create_collection()
         logger.info("Vector DB Collection created")
 
-    yield
+    if settings.QDRANT_MIGRATE_COLLECTION:
+        try:
+            await vector_database.migrate_collection()
+        except Exception as e:
+            logger.error(f"Error during Vector DB Collection migration: {e}")
+
+    answer_cache = None
+    if settings.ANSWER_CACHE_ENABLED:
+        answer_cache = SemanticAnswerCache(vector_database.qdrant)
+        await answer_cache.ensure_collection()
+        logger.info("Answer cache collection is ready")
+
+    document_converter = DocumentConverter()
+
+    document_registry = DocumentRegistry()
+    metadata_matcher = MetadataMatcher()
+    ingestion_pipeline = IngestionPipeline(
+        llm=llm,
+        vector_database=vector_database,
+        answer_cache=answer_cache,
+        document_converter=document_converter,
+        document_registry=document_registry,
+        metadata_matcher=metadata_matcher,
+    )
+    await ingestion_pipeline.load_metadata()
+
+    job_store = JobStore()
+    ingestion_job_manager = IngestionJobManager(ingestion_pipeline, job_store)
+    await ingestion_job_manager.start()
+
+    app.state.llm = llm
+    app.state.vector_database = vector_database
+    app.state.answer_cache = answer_cache
+    app.state.document_converter = document_converter
+    app.state.metadata_matcher = metadata_matcher
+    app.state.question_flights = SingleFlight("answer_question")
+    app.state.ingestion_job_manager = ingestion_job_manager
+
+    try:
+        yield
+    finally:
+        logger.info("Stopping ingestion workers")
+        await ingestion_job_manager.stop()
+        job_store.close()
+        document_registry.close()
+
+        logger.info("Closing service clients")
+        await vector_database.close()
+        await llm.close()
+        embedding_cache.close()
+        document_converter.shutdown()
+        await event_loop_monitor.stop()
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, BinaryIO, Dict, List
+
+from config.settings import Settings
+from core.ingestion_pipeline import IngestionPipeline
+from services.job_store import JobStatus, JobStore
+from services.logs import logger
+from services.telemetry import span
+
+settings = Settings()
+
+
+class IngestionJobManager:
+    """
+    A background queue of document ingestion jobs.
+
+    This class coordinates the following steps:
+    1. Streams each uploaded document to disk, hashing it on the way, and records
+       a queued job
+    2. Drains the queue with a configurable number of concurrent workers
+    3. Records the progress of every ingestion stage in the job store
+    4. Resumes the unfinished jobs of a previous run on startup
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        job_store: JobStore,
+        workers: int = None,
+        upload_dir: str = None,
+    ):
+        """
+        Initialize the IngestionJobManager.
+
+        Args:
+            pipeline (IngestionPipeline): Pipeline used to process the documents
+            job_store (JobStore): Persistent store of the jobs
+            workers (int, optional): Number of documents processed concurrently
+            upload_dir (str, optional): Directory where uploaded documents are kept
+                until they are processed
+        """
+        self.pipeline = pipeline
+        self.job_store = job_store
+        self.workers = workers or settings.INGESTION_WORKERS
+        self.upload_dir = upload_dir or settings.INGESTION_UPLOAD_DIR
+
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Re-enqueue the unfinished jobs and start the workers."""
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+        unfinished = await self.job_store.list_unfinished()
+        for job in unfinished:
+            self._queue.put_nowait(job["id"])
+        if unfinished:
+            logger.info(f"Resuming {len(unfinished)} unfinished ingestion jobs")
+
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers. Interrupted jobs are resumed on the next start."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(self, filename: str, source: BinaryIO) -> Dict[str, Any]:
+        """
+        Store an uploaded document and enqueue its ingestion.
+
+        The document is copied to the upload directory in chunks of
+        ``INGESTION_UPLOAD_CHUNK_SIZE`` bytes, so it is never fully held in memory.
+
+        Args:
+            filename (str): Name of the uploaded file
+            source (BinaryIO): The uploaded file, read from its current position
+
+        Returns:
+            Dict[str, Any]: The queued job
+        """
+        job_id = self.job_store.new_id()
+        file_path = os.path.join(self.upload_dir, f"{job_id}.pdf")
+
+        content_hash = await asyncio.to_thread(self._store_file, source, file_path)
+        job = await self.job_store.create(
+            filename, file_path, job_id=job_id, content_hash=content_hash
+        )
+        self._queue.put_nowait(job_id)
+
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Unexpected error in ingestion job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        """
+        Process the document of a job and record its outcome.
+
+        Args:
+            job_id (str): Id of the job
+        """
+        job = await self.job_store.get(job_id)
+        if job is None:
+            return
+
+        progress: Dict[str, Any] = {}
+
+        async def on_progress(**updates: Any) -> None:
+            progress.update(updates)
+            await self.job_store.update(job_id, progress=progress)
+
+        await self.job_store.update(
+            job_id, status=JobStatus.RUNNING, progress=progress, error=None
+        )
+
+        try:
+            with span("ingestion", "document", filename=job["filename"]):
+                await self.pipeline.process(
+                    job["filename"],
+                    job["file_path"],
+                    on_progress=on_progress,
+                    content_hash=job["content_hash"],
+                )
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} ({job['filename']}) failed: {e}")
+            await self.job_store.update(job_id, status=JobStatus.FAILED, error=str(e))
+        else:
+            await self.job_store.update(job_id, status=JobStatus.COMPLETED)
+
+        await asyncio.to_thread(self._remove_file, job["file_path"])
+
+    @staticmethod
+    def _store_file(source: BinaryIO, file_path: str) -> str:
+        """Copy a file in chunks and return the SHA-256 hash of its content."""
+        content_hash = hashlib.sha256()
+        try:
+            with open(file_path, "wb") as f:
+                while chunk := source.read(settings.INGESTION_UPLOAD_CHUNK_SIZE):
+                    content_hash.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            IngestionJobManager._remove_file(file_path)
+            raise
+        return content_hash.hexdigest()
+
+    @staticmethod
+    def _remove_file(file_path: str) -> None:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
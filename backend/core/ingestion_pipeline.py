@@ -1,62 +1,206 @@
 import asyncio
+import hashlib
 import json
-from io import BytesIO
-from typing import Any, Dict, List
-from uuid import uuid4
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+from uuid import UUID, uuid5
 
 from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
-from azure.ai.documentintelligence.models import (
-    AnalyzeDocumentRequest,
-    DocumentContentFormat,
-)
+from azure.ai.documentintelligence.models import DocumentContentFormat
 from azure.core.credentials import AzureKeyCredential
-from markitdown import MarkItDown
 from openai import AsyncAzureOpenAI, AsyncOpenAI
 from qdrant_client import AsyncQdrantClient
 from qdrant_client import models as qdrant_models
 
 from config.settings import Settings
-from services.chunker import TextChunker
+from services.answer_cache import SemanticAnswerCache
+from services.chunker import MarkdownChunker, TextChunk, TextChunker
+from services.document_converter import DocumentConverter
+from services.document_registry import DocumentRegistry
 from services.llm import OpenAI
-from services.vector_database import VectorDatabase
+from services.logs import logger
+from services.metadata_extractor import MetadataExtractor
+from services.metadata_matcher import MetadataMatcher
+from services.rate_governor import Priority, request_priority
+from services.telemetry import span
+from services.vector_database import PRODUCT_ID_KEY, VectorDatabase, get_product_id
 
 settings = Settings()
 
+ProgressCallback = Callable[..., Awaitable[None]]
+
+# Namespace of the point ids, derived from the document name and chunk content
+_POINT_ID_NAMESPACE = UUID("8b2f10e8-77e4-4b5a-99a2-cd4c14b9e0b8")
+
 
 class IngestionPipeline:
     """
     A pipeline that processes documents for storage in the RAG system.
 
-    This class coordinates the following steps:
-    1. Breaks documents into manageable chunks
+    This class coordinates the following steps, streaming chunks between them:
+    1. Breaks documents into manageable chunks, batch by batch
     2. Extracts metadata and contextual information
-    3. Generates vector embeddings
-    4. Stores chunks and metadata in the vector database
+    3. Generates vector embeddings in batches
+    4. Stores chunks and metadata in the vector database, batch by batch
+    5. Deletes the points of the chunks a re-ingested document no longer has
+    6. Invalidates the cached answers referencing the document
+    7. Feeds the metadata matcher filtering the search of the questions
+
+    Documents are ingested incrementally: a document already ingested with the
+    same content and settings is skipped, and a changed document only embeds the
+    chunks that were not already stored.
     """
 
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
-        """Initialize the pipeline with required services."""
-        self.chunker = TextChunker(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap, clean_html_tags=True
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        llm: OpenAI = None,
+        vector_database: VectorDatabase = None,
+        answer_cache: SemanticAnswerCache = None,
+        document_converter: DocumentConverter = None,
+        document_registry: DocumentRegistry = None,
+        metadata_matcher: MetadataMatcher = None,
+    ):
+        """
+        Initialize the pipeline with required services.
+
+        With ``CHUNKING_MODE=markdown``, documents are chunked following their
+        headings and tables into chunks of ``CHUNK_MAX_TOKENS`` tokens, and the
+        chunk size and overlap arguments are ignored.
+
+        Args:
+            chunk_size (int): Maximum size of each chunk in characters
+            chunk_overlap (int): Number of characters to overlap between chunks
+            llm (OpenAI, optional): Shared LLM service
+            vector_database (VectorDatabase, optional): Shared vector database service
+            answer_cache (SemanticAnswerCache, optional): Semantic cache of answers
+                invalidated when a document is ingested
+            document_converter (DocumentConverter, optional): Shared PDF converter
+                running outside of the event loop
+            document_registry (DocumentRegistry, optional): Record of the ingested
+                documents
+            metadata_matcher (MetadataMatcher, optional): Matcher of the metadata
+                of the ingested documents in the questions
+        """
+        if settings.CHUNKING_MODE == "markdown":
+            self.chunker = MarkdownChunker(
+                max_tokens=settings.CHUNK_MAX_TOKENS,
+                overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+            )
+        else:
+            self.chunker = TextChunker(
+                chunk_size=chunk_size, chunk_overlap=chunk_overlap, clean_html_tags=True
+            )
+        self.llm = llm or OpenAI()
+        self.vector_database = vector_database or VectorDatabase(llm=self.llm)
+        self.answer_cache = answer_cache
+        self.document_converter = document_converter or DocumentConverter()
+        self.document_registry = document_registry or DocumentRegistry()
+        self.metadata_matcher = metadata_matcher or MetadataMatcher()
+        self.metadata_extractor = MetadataExtractor(llm=self.llm)
+        # Versions of the same document are ingested one at a time
+        self._document_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def load_metadata(self) -> None:
+        """
+        Feed the metadata matcher with the metadata of the ingested documents.
+
+        The points stored before the partitioning by product, whether their
+        document is recorded or not, get the product id of their product name,
+        and so does the recorded metadata of their documents.
+        """
+        partitioned = await self.vector_database.partition_by_product()
+        if partitioned:
+            logger.info(f"Partitioned {partitioned} points by product")
+
+        for document in await self.document_registry.list_documents():
+            metadata = document["metadata"]
+            product_id = get_product_id(metadata.get("product_name"))
+            if product_id is not None and PRODUCT_ID_KEY not in metadata:
+                metadata[PRODUCT_ID_KEY] = product_id
+                await self.document_registry.set_metadata(
+                    document["filename"], metadata
+                )
+            self.metadata_matcher.update(document["filename"], metadata)
+        logger.info(
+            f"Loaded the metadata of {self.metadata_matcher.document_count} documents"
         )
-        self.llm = OpenAI()
-        self.vector_database = VectorDatabase()
 
-    async def _extract_text_from_pdf(self, pdf: bytes) -> str:
+    def _ingestion_config(self) -> str:
+        """
+        Describe the ingestion settings the points of a document depend on. Points
+        ingested with other settings are embedded again.
+
+        Returns:
+            str: The settings, as JSON
+        """
+        if isinstance(self.chunker, MarkdownChunker):
+            chunking = {
+                "mode": "markdown",
+                "max_tokens": self.chunker.max_tokens,
+                "overlap_tokens": self.chunker.overlap_tokens,
+            }
+        else:
+            chunking = {
+                "mode": "characters",
+                "chunk_size": self.chunker.chunk_size,
+                "chunk_overlap": self.chunker.chunk_overlap,
+            }
+
+        return json.dumps(
+            {
+                "chunking": chunking,
+                "embedding_model": settings.OPENAI_EMBEDDING_MODEL,
+                "vector_dimensions": settings.VECTOR_DIMENSIONS,
+                "sparse_vectors": self.vector_database.hybrid,
+            },
+            sort_keys=True,
+        )
+
+    @staticmethod
+    def _get_point_id(pdf_name: str, chunk: TextChunk) -> str:
+        """
+        Derive the id of the point of a chunk from the document and the chunk
+        content, so the same chunk of the same document always has the same id.
+
+        Args:
+            pdf_name (str): Name of the PDF file
+            chunk (TextChunk): Text chunk
+
+        Returns:
+            str: The point id
+        """
+        document_hash = hashlib.sha256(pdf_name.encode()).hexdigest()
+        chunk_hash = hashlib.sha256(
+            "\x1f".join((*chunk.section_path, chunk.text)).encode()
+        ).hexdigest()
+        return str(uuid5(_POINT_ID_NAMESPACE, f"{document_hash}:{chunk_hash}"))
+
+    @staticmethod
+    def _hash_file(file_path: str) -> str:
+        """Return the SHA-256 hash of the content of a file, read in chunks."""
+        content_hash = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(settings.INGESTION_UPLOAD_CHUNK_SIZE):
+                content_hash.update(chunk)
+        return content_hash.hexdigest()
+
+    async def _extract_text_from_pdf(self, pdf_path: str) -> str:
         """
         Extract text from a PDF document.
 
         Args:
-            pdf (bytes): Raw content of the PDF document
+            pdf_path (str): Path of the PDF document
 
         Returns:
             str: Extracted text in markdown format
         """
         try:
-            md = MarkItDown()
-            result = md.convert(BytesIO(pdf))
-            pdf_md = result.markdown
-        except:
+            pdf_md = await self.document_converter.convert_pdf(pdf_path)
+        except Exception as e:
+            logger.warning(f"PDF conversion failed, falling back to OCR: {e!r}")
             pdf_md = ""
 
         if not pdf_md.strip():
@@ -65,116 +209,435 @@ class IngestionPipeline:
                 credential=AzureKeyCredential(settings.AZURE_OCR_KEY),
             )
 
-            async with di_client:
-                poller = await di_client.begin_analyze_document(
-                    model_id="prebuilt-layout",
-                    body=AnalyzeDocumentRequest(bytes_source=pdf),
-                    output_content_format=DocumentContentFormat.MARKDOWN,
-                )
-                result = await poller.result()
+            # The file is streamed as the request body, instead of being read and
+            # encoded in a JSON request
+            with open(pdf_path, "rb") as pdf:
+                async with di_client:
+                    poller = await di_client.begin_analyze_document(
+                        model_id="prebuilt-layout",
+                        body=pdf,
+                        content_type="application/octet-stream",
+                        output_content_format=DocumentContentFormat.MARKDOWN,
+                    )
+                    result = await poller.result()
                 pdf_md = result.content
 
         return pdf_md
 
-    async def _extract_metadata(self, text: str) -> Dict[str, str | List[str]]:
+    async def _extract_metadata(
+        self, text: str, content_hash: str = None
+    ) -> Dict[str, str | List[str]]:
         """
         Extract metadata from the provided text.
 
+        The metadata is cached by the hash of the document and the chat model, so
+        a document already ingested, even under another name or with other
+        settings, is not sent to the LLM again.
+
         Args:
             text (str): Text content of the document
+            content_hash (str, optional): SHA-256 hash of the document
 
         Returns:
             Dict[str, str | List[str]]: Extracted metadata in JSON format
         """
-        response = await self.llm.client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                    You are a helpful assistant that extracts relevant information from documents.
-
-                    Your task is to analyze the provided document and extract key information.
-
-                    Extract the following information:
-                    - Product Name
-                    - Keywords
-
-                    The output should be in JSON format with the following structure:
-                    {
-                        "product_name": "<Product Name>",
-                        "keywords": ["<Keyword1>", "<Keyword2>", ...]
-                    }
-                    Please provide the output in JSON format.
-                    Do not include any other text or explanation.
-                    """,
-                },
-                {"role": "user", "content": text},
-            ],
-            model=settings.OPENAI_CHAT_MODEL,
-            temperature=0,
-            response_format={"type": "json_object"},
-        )
+        model = settings.OPENAI_CHAT_MODEL
+        if content_hash is not None:
+            metadata = await self.document_registry.get_extracted_metadata(
+                content_hash, model
+            )
+            if metadata is not None:
+                logger.info("Reusing the metadata extracted from the same content")
+                return metadata
 
-        response_str = response.choices[0].message.content.lower()
-        return json.loads(response_str)
+        metadata = await self.metadata_extractor.extract(text)
+        if content_hash is not None and metadata:
+            await self.document_registry.put_extracted_metadata(
+                content_hash, model, metadata
+            )
+        return metadata
 
-    async def _embed_and_get_qdrant_point(
-        self, chunk: str, metadata: Dict[str, Any]
+    def _get_qdrant_point(
+        self,
+        point_id: str,
+        chunk: TextChunk,
+        embedding: List[float],
+        metadata: Dict[str, Any],
     ) -> qdrant_models.PointStruct:
         """
-        Generate vector embedding for a text chunk and create a Qdrant point.
+        Create a Qdrant point from a text chunk and its vector embedding.
 
         Args:
-            chunk (str): Text chunk
+            point_id (str): Id of the point
+            chunk (TextChunk): Text chunk
+            embedding (List[float]): Vector embedding of the chunk
             metadata (Dict[str, Any]): Metadata associated with the chunk
 
         Returns:
             qdrant_models.PointStruct: Qdrant point with vector embedding and metadata
         """
-        # Embed the chunk
-        embedding = await self.llm.get_embedding(chunk)
-
-        payload = {"text": chunk}
+        payload = {"text": chunk.text}
+        if chunk.section_path:
+            payload["section_path"] = list(chunk.section_path)
         payload.update(metadata)
 
         return qdrant_models.PointStruct(
-            id=str(uuid4()),
-            vector=embedding,
+            id=point_id,
+            vector=self.vector_database.get_point_vector(embedding, chunk.text),
             payload=payload,
         )
 
-    async def _store_chunks_in_vector_db(
-        self, chunks: List[str], metadata: Dict[str, Any]
+    async def _produce_chunks(
+        self,
+        pdf_name: str,
+        text: str,
+        chunk_queue: asyncio.Queue,
+        report: ProgressCallback,
+        stored_ids: Set[str],
+        point_ids: List[str],
+        progress: Dict[str, int],
+    ) -> None:
+        """
+        Chunk the document into the chunk queue, one batch at a time.
+
+        Chunks already stored, and repeated chunks, are not sent to the embedding
+        stage. Chunks already stored count as embedded in the progress, repeated
+        chunks are counted once.
+
+        Args:
+            pdf_name (str): Name of the PDF file
+            text (str): Text content of the document
+            chunk_queue (asyncio.Queue): Queue feeding the embedding stage
+            report (ProgressCallback): Progress callback
+            stored_ids (Set[str]): Ids of the points already stored for the document
+            point_ids (List[str]): Filled with the ids of the points of the document
+            progress (Dict[str, int]): Counters shared with the embedding workers
+        """
+        seen_ids = set()
+        chunks = self.chunker.iter_chunks(text)
+        while True:
+            with span("ingestion", "chunk"):
+                batch = list(islice(chunks, settings.INGESTION_BATCH_SIZE))
+            if not batch:
+                break
+            reused = 0
+            for chunk in batch:
+                point_id = self._get_point_id(pdf_name, chunk)
+                if point_id in seen_ids:
+                    continue
+                seen_ids.add(point_id)
+                point_ids.append(point_id)
+                if point_id in stored_ids:
+                    reused += 1
+                else:
+                    await chunk_queue.put((point_id, chunk))
+            await report(chunked=len(point_ids))
+            if reused:
+                progress["embedded"] += reused
+                await report(embedded=progress["embedded"])
+
+        await report(total_chunks=len(point_ids))
+        for _ in range(settings.INGESTION_EMBEDDING_WORKERS):
+            await chunk_queue.put(None)
+
+    async def _embed_chunks(
+        self,
+        chunk_queue: asyncio.Queue,
+        embedding_queue: asyncio.Queue,
+        report: ProgressCallback,
+        progress: Dict[str, int],
     ) -> None:
         """
-        Store text chunks and their metadata in the vector database.
+        Embed batches of chunks from the chunk queue into the embedding queue.
+
+        Args:
+            chunk_queue (asyncio.Queue): Queue fed by the chunking stage
+            embedding_queue (asyncio.Queue): Queue feeding the upsert stage
+            report (ProgressCallback): Progress callback
+            progress (Dict[str, int]): Counters shared by the embedding workers
+        """
+        finished = False
+        while not finished:
+            batch = []
+            while len(batch) < settings.INGESTION_BATCH_SIZE:
+                chunk = await chunk_queue.get()
+                if chunk is None:
+                    finished = True
+                    break
+                batch.append(chunk)
+
+            if batch:
+                with span("ingestion", "embed"):
+                    embeddings = await self.llm.get_embeddings(
+                        [chunk.text for _, chunk in batch]
+                    )
+                await embedding_queue.put((batch, embeddings))
+                progress["embedded"] += len(batch)
+                await report(embedded=progress["embedded"])
+
+        # The last embedding worker to finish closes the embedding queue
+        progress["embedding_workers"] -= 1
+        if progress["embedding_workers"] == 0:
+            await embedding_queue.put(None)
+
+    async def _upsert_points(
+        self,
+        embedding_queue: asyncio.Queue,
+        metadata_task: asyncio.Task,
+        pdf_name: str,
+        report: ProgressCallback,
+    ) -> int:
+        """
+        Upsert the embedded chunks into the vector database, batch by batch.
 
         Args:
-            chunks (List[str]): List of text chunks
-            metadata (Dict[str, Any]): Metadata associated with the chunks
+            embedding_queue (asyncio.Queue): Queue fed by the embedding stage
+            metadata_task (asyncio.Task): Task extracting the document metadata
+            pdf_name (str): Name of the PDF file
+            report (ProgressCallback): Progress callback
+
+        Returns:
+            int: Number of upserted chunks
         """
-        point_tasks = []
-        for chunk in chunks:
-            if chunk.strip():
-                point_tasks.append(self._embed_and_get_qdrant_point(chunk, metadata))
-        points = await asyncio.gather(*point_tasks)
-        await self.vector_database.upsert(points)
+        metadata = None
+        acknowledged = []
+        upserted = 0
+        while (item := await embedding_queue.get()) is not None:
+            if metadata is None:
+                metadata = await metadata_task
+                metadata.update({"filename": pdf_name})
+
+            chunks, embeddings = item
+            points = [
+                self._get_qdrant_point(point_id, chunk, embedding, metadata)
+                for (point_id, chunk), embedding in zip(chunks, embeddings)
+            ]
+            with span("ingestion", "upsert"):
+                acknowledged += await self.vector_database.upsert(
+                    points, wait=settings.QDRANT_UPSERT_WAIT
+                )
+            upserted += len(points)
+            await report(upserted=upserted)
+
+        # Points upserted without waiting are sent again, waiting this time, so
+        # the document is searchable once it is processed
+        if acknowledged:
+            with span("ingestion", "wait_for_upserts"):
+                await self.vector_database.upsert(acknowledged, wait=True)
 
-    async def process(self, pdf_name: str, pdf_bytes: bytes) -> List[str]:
+        return upserted
+
+    async def _run_stages(
+        self,
+        pdf_name: str,
+        pdf_md: str,
+        content_hash: str,
+        stored_ids: Set[str],
+        report: ProgressCallback,
+    ) -> Tuple[Dict[str, Any], List[str]]:
         """
-        Process the input text and return a list of chunks.
+        Run the chunking, embedding, upsert and metadata extraction stages of a
+        document concurrently.
 
         Args:
             pdf_name (str): Name of the PDF file
-            pdf_bytes (bytes): Raw content of the PDF file
+            pdf_md (str): Text content of the document
+            content_hash (str): SHA-256 hash of the document
+            stored_ids (Set[str]): Ids of the points already stored for the document,
+                which are not embedded again
+            report (ProgressCallback): Progress callback
 
         Returns:
-            List[str]: List of processed text chunks
+            Tuple[Dict[str, Any], List[str]]: The metadata of the document and the
+                ids of all its points
         """
-        pdf_md = await self._extract_text_from_pdf(pdf_bytes)
-        metadata = await self._extract_metadata(pdf_md)
+
+        async def extract_metadata() -> Dict[str, Any]:
+            with span("ingestion", "metadata"):
+                metadata = await self._extract_metadata(pdf_md, content_hash)
+            product_id = get_product_id(metadata.get("product_name"))
+            if product_id is not None:
+                metadata[PRODUCT_ID_KEY] = product_id
+            await report(metadata_extracted=True)
+            return metadata
+
+        chunk_queue = asyncio.Queue(
+            maxsize=settings.INGESTION_BATCH_SIZE * settings.INGESTION_EMBEDDING_WORKERS
+        )
+        embedding_queue = asyncio.Queue(maxsize=settings.INGESTION_EMBEDDING_WORKERS)
+        progress = {
+            "embedded": 0,
+            "embedding_workers": settings.INGESTION_EMBEDDING_WORKERS,
+        }
+        point_ids: List[str] = []
+
+        metadata_task = asyncio.create_task(extract_metadata())
+        tasks = [
+            metadata_task,
+            asyncio.create_task(
+                self._upsert_points(embedding_queue, metadata_task, pdf_name, report)
+            ),
+            asyncio.create_task(
+                self._produce_chunks(
+                    pdf_name,
+                    pdf_md,
+                    chunk_queue,
+                    report,
+                    stored_ids,
+                    point_ids,
+                    progress,
+                )
+            ),
+            *[
+                asyncio.create_task(
+                    self._embed_chunks(chunk_queue, embedding_queue, report, progress)
+                )
+                for _ in range(settings.INGESTION_EMBEDDING_WORKERS)
+            ],
+        ]
+
+        try:
+            # Stop at the first failure instead of waiting on stalled queues
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        metadata = metadata_task.result()
         metadata.update({"filename": pdf_name})
-        chunks = await self.chunker.split_text(pdf_md)
-        await self._store_chunks_in_vector_db(chunks, metadata)
+        return metadata, point_ids
+
+    async def process(
+        self,
+        pdf_name: str,
+        pdf_path: str,
+        on_progress: ProgressCallback = None,
+        content_hash: str = None,
+    ) -> int:
+        """
+        Process a PDF document and store its chunks in the vector database.
+
+        Chunking, embedding and upserting run as concurrent stages connected by
+        bounded queues, so the first chunks become searchable while the rest of the
+        document is still being processed. Metadata extraction runs concurrently
+        with chunking and embedding.
+
+        A document already ingested with the same content and settings is skipped.
+        When it changed, only its new chunks are embedded: the payload of the
+        chunks it kept is updated, and the points of the chunks it no longer has
+        are deleted. The points of a document ingested before the document
+        registry, which has no record, are all replaced.
+
+        The LLM requests of the ingestion have a background priority, so they do
+        not delay the questions.
+
+        Args:
+            pdf_name (str): Name of the PDF file
+            pdf_path (str): Path of the PDF file
+            on_progress (ProgressCallback, optional): Called with keyword arguments
+                describing the progress each time a stage advances
+            content_hash (str, optional): SHA-256 hash of the file, computed from
+                the file when not provided
+
+        Returns:
+            int: Number of chunks of the document
+        """
+        with request_priority(Priority.BACKGROUND):
+            return await self._process(pdf_name, pdf_path, on_progress, content_hash)
+
+    async def _process(
+        self,
+        pdf_name: str,
+        pdf_path: str,
+        on_progress: ProgressCallback = None,
+        content_hash: str = None,
+    ) -> int:
+        """
+        Process a PDF document and store its chunks in the vector database.
+
+        Args:
+            pdf_name (str): Name of the PDF file
+            pdf_path (str): Path of the PDF file
+            on_progress (ProgressCallback, optional): Called with keyword arguments
+                describing the progress each time a stage advances
+            content_hash (str, optional): SHA-256 hash of the file
+
+        Returns:
+            int: Number of chunks of the document
+        """
+
+        async def report(**progress: Any) -> None:
+            if on_progress:
+                await on_progress(**progress)
+
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(self._hash_file, pdf_path)
+        config = self._ingestion_config()
+
+        async with self._document_locks[pdf_name]:
+            record = await self.document_registry.get(pdf_name)
+            if (
+                record is not None
+                and record["content_hash"] == content_hash
+                and record["config"] == config
+            ):
+                logger.info(f"{pdf_name} is unchanged, skipping its ingestion")
+                await report(skipped=True, total_chunks=len(record["point_ids"]))
+                return len(record["point_ids"])
+
+            previous_ids = record["point_ids"] if record is not None else []
+            stored_ids = (
+                set(previous_ids)
+                if record is not None and record["config"] == config
+                else set()
+            )
+
+            if record is None:
+                # Documents ingested before the registry have random point ids,
+                # their points are only found by their filename
+                with span("ingestion", "delete_stale"):
+                    await self.vector_database.delete_by_filename(pdf_name)
+
+            with span("ingestion", "extract"):
+                pdf_md = await self._extract_text_from_pdf(pdf_path)
+            await report(extracted=True)
+
+            metadata, point_ids = await self._run_stages(
+                pdf_name, pdf_md, content_hash, stored_ids, report
+            )
+
+            kept_ids = [point_id for point_id in point_ids if point_id in stored_ids]
+            if kept_ids:
+                # Setting a payload merges its keys, so the metadata keys of the
+                # previous version that are gone are removed explicitly
+                previous_metadata = record["metadata"]
+                removed_keys = [key for key in previous_metadata if key not in metadata]
+                with span("ingestion", "update_payloads"):
+                    if removed_keys:
+                        await self.vector_database.delete_payload(
+                            kept_ids, removed_keys
+                        )
+                    await self.vector_database.set_payload(kept_ids, metadata)
+
+            new_ids = set(point_ids)
+            stale_ids = [
+                point_id for point_id in previous_ids if point_id not in new_ids
+            ]
+            if stale_ids:
+                with span("ingestion", "delete_stale"):
+                    await self.vector_database.delete(stale_ids)
+            await report(reused=len(kept_ids), deleted=len(stale_ids))
+
+            await self.document_registry.put(
+                pdf_name, content_hash, config, point_ids, metadata
+            )
+            self.metadata_matcher.update(pdf_name, metadata)
+
+        if self.answer_cache is not None:
+            with span("ingestion", "invalidate_answers"):
+                await self.answer_cache.invalidate_documents([pdf_name])
 
-        return chunks
+        return len(point_ids)
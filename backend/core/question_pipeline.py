@@ -1,27 +1,74 @@
+import asyncio
 import json
-from typing import List, Tuple
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+
+from qdrant_client import models as qdrant_models
 
 from config.settings import Settings
+from core.stage_graph import Stage, StageGraph
+from services.answer_cache import SemanticAnswerCache
 from services.llm import OpenAI
+from services.logs import logger
+from services.metadata_matcher import MetadataMatcher
+from services.reranker import Reranker
+from services.single_flight import SingleFlight
+from services.telemetry import span
 from services.vector_database import VectorDatabase
 
 settings = Settings()
 
+# Retrieved batches of questions waiting for their answers
+_BATCHES_IN_FLIGHT = 2
+
 
 class QuestionPipeline:
     """
     A pipeline that processes questions and generates answers using RAG (Retrieval Augmented Generation).
 
     This class coordinates the following steps:
-    1. Retrieves relevant document chunks from the vector database
-    2. Constructs a prompt with the retrieved context
-    3. Generates an answer using the LLM service
+    1. Enhances the question, matches search filters and embeds the question concurrently
+    2. Returns the answer of a similar question from the semantic cache, if any
+    3. Retrieves candidate document chunks from the vector database and reranks
+       them into the context
+    4. Constructs a prompt with the retrieved context
+    5. Generates an answer using the LLM service
+
+    Batches of questions are embedded and searched together, with batched
+    embedding requests and a single Qdrant request per ``QUESTION_BATCH_SIZE``
+    questions.
     """
 
-    def __init__(self):
-        """Initialize the pipeline with vector database and LLM services."""
-        self.llm = OpenAI()
-        self.vector_database = VectorDatabase()
+    def __init__(
+        self,
+        llm: OpenAI = None,
+        vector_database: VectorDatabase = None,
+        answer_cache: SemanticAnswerCache = None,
+        reranker: Reranker = None,
+        metadata_matcher: MetadataMatcher = None,
+        question_flights: SingleFlight = None,
+    ):
+        """
+        Initialize the pipeline with vector database and LLM services.
+
+        Args:
+            llm (OpenAI, optional): Shared LLM service
+            vector_database (VectorDatabase, optional): Shared vector database service
+            answer_cache (SemanticAnswerCache, optional): Semantic cache of answers,
+                disabled when not provided
+            reranker (Reranker, optional): Reranker selecting the context among the
+                retrieved candidates, used when ``RERANK_ENABLED`` is set
+            metadata_matcher (MetadataMatcher, optional): Matcher of the metadata
+                of the ingested documents, creating the search filters
+            question_flights (SingleFlight, optional): Coalescer of the identical
+                questions answered concurrently, shared by the pipelines
+        """
+        self.llm = llm or OpenAI()
+        self.vector_database = vector_database or VectorDatabase(llm=self.llm)
+        self.answer_cache = answer_cache
+        self.reranker = reranker or Reranker()
+        self.metadata_matcher = metadata_matcher or MetadataMatcher()
+        self.question_flights = question_flights or SingleFlight("answer_question")
 
     async def _enhance_user_message(self, message: str) -> str:
         """
@@ -33,7 +80,7 @@ class QuestionPipeline:
         Returns:
             str: The enhanced message
         """
-        response = await self.llm.client.chat.completions.create(
+        response = await self.llm.chat_completion(
             messages=[
                 {
                     "role": "system",
@@ -48,37 +95,10 @@ class QuestionPipeline:
 
         return enhanced_response
 
-    async def _extract_product_from_user_message(self, message: str) -> str:
-        """
-        Extract the product name from the user's message.
-
-        Args:
-            message (str): The user's original message
-
-        Returns:
-            str: The extracted product name
-        """
-        response = await self.llm.client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that extracts product names from user queries.",
-                },
-                {
-                    "role": "user",
-                    "content": f"Extract the product name from the following query: {message}",
-                },
-            ],
-            model=settings.OPENAI_CHAT_MODEL,
-            temperature=0,
-        )
-        product_response = response.choices[0].message.content
-
-        return product_response
-
     async def _create_filter_from_query(self, query: str) -> List[Tuple]:
         """
-        Create filters from the user's query to be used in the vector database.
+        Create filters from the user's query to be used in the vector database,
+        with the LLM.
 
         Args:
             query (str): The user's original query
@@ -86,7 +106,7 @@ class QuestionPipeline:
         Returns:
             List[Tuple]: A list of filters extracted from the query
         """
-        response = await self.llm.client.chat.completions.create(
+        response = await self.llm.chat_completion(
             messages=[
                 {
                     "role": "system",
@@ -112,9 +132,18 @@ class QuestionPipeline:
             ],
             model=settings.OPENAI_CHAT_MODEL,
             temperature=0,
+            response_format={"type": "json_object"},
         )
         filter_response_str = response.choices[0].message.content.lower()
-        filter_response_json: dict = json.loads(filter_response_str)
+        try:
+            filter_response_json = json.loads(filter_response_str)
+        except json.JSONDecodeError:
+            logger.warning(
+                f"Invalid filters returned by the LLM: {filter_response_str}"
+            )
+            return []
+        if not isinstance(filter_response_json, dict):
+            return []
 
         # Validate the response
         filter_keys = list(filter_response_json.keys())
@@ -140,10 +169,95 @@ class QuestionPipeline:
                 filter_items.append((key, value))
             elif isinstance(value, list):
                 for item in value:
-                    filter_items.append((key, item))
+                    if isinstance(item, str):
+                        filter_items.append((key, item))
+
+        # Values that are not the metadata of any document would filter out every
+        # chunk, so they are replaced by the known values they match
+        if self.metadata_matcher.document_count:
+            known_items = []
+            for _, value in filter_items:
+                for item in self.metadata_matcher.match(value):
+                    if item not in known_items:
+                        known_items.append(item)
+            filter_items = known_items
 
         return filter_items
 
+    async def _create_search_filters(self, query: str) -> qdrant_models.Filter | None:
+        """
+        Create the vector database filters for the user's query.
+
+        The product names and keywords of the ingested documents are matched
+        locally in the query. The LLM only extracts them when nothing matched and
+        ``FILTER_LLM_FALLBACK`` is set. A product name restricts the search to the
+        partition of the product.
+
+        Args:
+            query (str): The user's original query
+
+        Returns:
+            qdrant_models.Filter | None: Qdrant filter object, or None when the query
+                mentions no known product name or keyword
+        """
+        filter_items = self.metadata_matcher.match(query)
+        if not filter_items and settings.FILTER_LLM_FALLBACK:
+            filter_items = await self._create_filter_from_query(query)
+        if not filter_items:
+            return None
+        return await self.vector_database.create_filters(filter_items)
+
+    @staticmethod
+    def _build_context(context_results: List[qdrant_models.ScoredPoint]) -> str:
+        """
+        Join the retrieved chunks into the context of the answer.
+
+        Chunks are preceded by the headings of their section when known, which
+        situates them in their document.
+
+        Args:
+            context_results (List[qdrant_models.ScoredPoint]): The retrieved chunks
+
+        Returns:
+            str: The context
+        """
+        context_chunks = []
+        for result in context_results:
+            section_path = result.payload.get("section_path")
+            if section_path:
+                context_chunks.append(
+                    f"[{' > '.join(section_path)}]\n{result.payload['text']}"
+                )
+            else:
+                context_chunks.append(result.payload["text"])
+        return "\n\n".join(context_chunks)
+
+    @staticmethod
+    def _build_answer_messages(question: str, context: str) -> List[dict]:
+        """
+        Build the chat messages asking the LLM to answer a question from a context.
+
+        Args:
+            question (str): The user's question
+            context (str): The context to be used for generating the answer
+
+        Returns:
+            List[dict]: The chat messages
+        """
+        return [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant that answers questions based on the context provided.",
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": f"Context:\n{context}"},
+                    {"type": "text", "text": question},
+                ],
+            },
+        ]
+
     async def _generate_answer(self, question: str, context: str) -> str:
         """
         Generate an answer to the user's question based on the provided context.
@@ -155,20 +269,8 @@ class QuestionPipeline:
         Returns:
             str: The generated answer
         """
-        response = await self.llm.client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that answers questions based on the context provided.",
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": f"Context:\n{context}"},
-                        {"type": "text", "text": question},
-                    ],
-                },
-            ],
+        response = await self.llm.chat_completion(
+            messages=self._build_answer_messages(question, context),
             model=settings.OPENAI_CHAT_MODEL,
             temperature=0.2,
         )
@@ -176,10 +278,198 @@ class QuestionPipeline:
 
         return answer
 
+    async def _generate_answer_stream(
+        self, question: str, context: str
+    ) -> AsyncIterator[str]:
+        """
+        Generate an answer to the user's question, yielding tokens as they arrive.
+
+        Args:
+            question (str): The user's question
+            context (str): The context to be used for generating the answer
+
+        Yields:
+            str: The next piece of the generated answer
+        """
+        response = await self.llm.chat_completion(
+            messages=self._build_answer_messages(question, context),
+            model=settings.OPENAI_CHAT_MODEL,
+            temperature=0.2,
+            stream=True,
+        )
+        async with aclosing(response):
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def _build_graph(
+        self, question: str, generate_answer: bool = True
+    ) -> StageGraph:
+        """
+        Build the stage graph answering a question.
+
+        Query enhancement, filter extraction and query embedding only depend on the
+        raw question and run concurrently. Enhancement, filter extraction and the
+        answer cache lookup are optional: on failure or timeout the original
+        question is used, the search runs without filters and the cache is skipped.
+        The search is restricted to the partitions of the products mentioned in
+        the question, and runs on the whole collection when they hold no match. It
+        over-fetches ``RETRIEVAL_CANDIDATES`` chunks, which are reranked into the
+        context of the answer.
+
+        Args:
+            question (str): The user's question to be answered
+            generate_answer (bool): Whether the graph ends with the answer generation
+                stage, or stops once the context is retrieved
+
+        Returns:
+            StageGraph: The graph of the question pipeline
+        """
+
+        async def search(query_embedding, filters):
+            if not settings.RERANK_ENABLED:
+                candidates = await self.vector_database.search_by_embedding(
+                    query_embedding, filters=filters, query_text=question
+                )
+            else:
+                candidates = await self.vector_database.search_by_embedding(
+                    query_embedding,
+                    filters=filters,
+                    query_text=question,
+                    limit=settings.RETRIEVAL_CANDIDATES,
+                    with_vectors=True,
+                )
+            # Points ingested before their product was known are not in any
+            # partition, so an empty partition falls back to the whole collection
+            if candidates or filters is None:
+                return candidates
+            logger.info("No results with the search filters, searching globally")
+            return await search(query_embedding, None)
+
+        async def rerank(query_embedding, candidates):
+            if not settings.RERANK_ENABLED:
+                return candidates
+            return self.reranker.rerank(query_embedding, candidates)
+
+        async def lookup_cached_answer(query_embedding, filters):
+            if self.answer_cache is None:
+                return None
+            return await self.answer_cache.lookup(query_embedding, filters)
+
+        async def answer(enhanced_question, context_results, cached_answer):
+            if cached_answer is not None:
+                return cached_answer.answer
+
+            return await self._generate_answer(
+                enhanced_question, self._build_context(context_results)
+            )
+
+        stages = [
+            Stage(
+                "enhanced_question",
+                lambda: self._enhance_user_message(question),
+                timeout=settings.QUESTION_ENHANCE_TIMEOUT,
+                optional=True,
+                default=question,
+            ),
+            Stage(
+                "filters",
+                lambda: self._create_search_filters(question),
+                timeout=settings.QUESTION_FILTER_TIMEOUT,
+                optional=True,
+                default=None,
+            ),
+            Stage(
+                "query_embedding",
+                lambda: self.llm.get_embedding(question),
+                timeout=settings.QUESTION_RETRIEVAL_TIMEOUT,
+            ),
+            Stage(
+                "cached_answer",
+                lookup_cached_answer,
+                depends_on=("query_embedding", "filters"),
+                timeout=settings.QUESTION_RETRIEVAL_TIMEOUT,
+                optional=True,
+                default=None,
+            ),
+            Stage(
+                "candidates",
+                search,
+                depends_on=("query_embedding", "filters"),
+                timeout=settings.QUESTION_RETRIEVAL_TIMEOUT,
+            ),
+            Stage(
+                "context_results",
+                rerank,
+                depends_on=("query_embedding", "candidates"),
+            ),
+        ]
+        if generate_answer:
+            stages.append(
+                Stage(
+                    "answer",
+                    answer,
+                    depends_on=(
+                        "enhanced_question",
+                        "context_results",
+                        "cached_answer",
+                    ),
+                    timeout=settings.QUESTION_ANSWER_TIMEOUT,
+                )
+            )
+
+        return StageGraph(stages, name="question")
+
+    def _cache_generation(self) -> Optional[int]:
+        """Generation of the answer cache, None when it is disabled."""
+        return self.answer_cache.generation if self.answer_cache else None
+
+    async def _store_answer(
+        self,
+        question: str,
+        results: Dict[str, Any],
+        answer: str,
+        generation: Optional[int],
+    ) -> None:
+        """
+        Store a generated answer in the semantic answer cache.
+
+        Answers without references are not grounded in any document and could not
+        be invalidated when documents are ingested, so they are not cached.
+
+        Args:
+            question (str): The user's question
+            results (Dict[str, Any]): Results of the stage graph that answered it
+            answer (str): The generated answer
+            generation (int, optional): Generation of the answer cache when the
+                question started to be answered
+        """
+        context_results = results["context_results"]
+        if self.answer_cache is None or not context_results:
+            return
+
+        with span("question", "store_answer"):
+            await self.answer_cache.store(
+                question,
+                results["query_embedding"],
+                answer,
+                [result.payload["text"] for result in context_results],
+                [
+                    result.payload["filename"]
+                    for result in context_results
+                    if "filename" in result.payload
+                ],
+                filters=results["filters"],
+                generation=generation,
+            )
+
     async def answer_question(self, question: str) -> Tuple[str, List[str]]:
         """
         Process a question and generate an answer with supporting references.
 
+        Questions identical up to case and whitespace that are asked while the
+        first one is being answered share its answer.
+
         Args:
             question (str): The user's question to be answered
 
@@ -188,17 +478,338 @@ class QuestionPipeline:
                 - The generated answer (str)
                 - A list of relevant references from the source documents
         """
-        enhanced_response = await self._enhance_user_message(question)
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return await self._answer_question(question)
+        key = " ".join(question.casefold().split())
+        return await self.question_flights.do(
+            key, lambda: self._answer_question(question)
+        )
 
-        filter_response = await self._create_filter_from_query(question)
-        filters = await self.vector_database.create_filters(filter_response)
+    async def _answer_question(self, question: str) -> Tuple[str, List[str]]:
+        """
+        Process a question and generate an answer with supporting references.
+
+        Args:
+            question (str): The user's question to be answered
+
+        Returns:
+            Tuple[str, List[str]]: The answer and its references
+        """
+        generation = self._cache_generation()
+        run = self._build_graph(question).start()
+        try:
+            cached_answer = await run.result("cached_answer")
+            if cached_answer is not None:
+                return cached_answer.answer, cached_answer.references
 
-        context_results = await self.vector_database.search_context(
-            question, filters=filters
+            results = await run.results()
+        finally:
+            run.cancel()
+
+        context_chunks = [
+            result.payload["text"] for result in results["context_results"]
+        ]
+        await self._store_answer(question, results, results["answer"], generation)
+
+        return results["answer"], context_chunks
+
+    async def stream_answer(self, question: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Process a question, streaming the references and then the answer tokens.
+
+        Args:
+            question (str): The user's question to be answered
+
+        Yields:
+            Tuple[str, Any]: Events as (name, data) pairs:
+                - ("references", List[str]) once the context is retrieved
+                - ("token", str) for each piece of the generated answer
+                - ("done", None) once the answer is complete
+        """
+        generation = self._cache_generation()
+        run = self._build_graph(question, generate_answer=False).start()
+        try:
+            cached_answer = await run.result("cached_answer")
+            if cached_answer is None:
+                results = await run.results()
+        finally:
+            run.cancel()
+
+        if cached_answer is not None:
+            yield "references", cached_answer.references
+            yield "token", cached_answer.answer
+            yield "done", None
+            return
+
+        context_chunks = [
+            result.payload["text"] for result in results["context_results"]
+        ]
+        yield "references", context_chunks
+
+        answer_tokens = []
+        with span("question", "answer_stream"):
+            async with aclosing(
+                self._generate_answer_stream(
+                    results["enhanced_question"],
+                    self._build_context(results["context_results"]),
+                )
+            ) as tokens:
+                async for token in tokens:
+                    answer_tokens.append(token)
+                    yield "token", token
+
+        await self._store_answer(
+            question, results, "".join(answer_tokens), generation
         )
-        context_chunks = [result.payload["text"] for result in context_results]
-        context = "\n\n".join(context_chunks)
+        yield "done", None
+
+    @staticmethod
+    async def _optional(
+        name: str, call: Awaitable[Any], timeout: float, default: Any
+    ) -> Any:
+        """Await an optional step of a batch, falling back to a default."""
+        try:
+            return await asyncio.wait_for(call, timeout)
+        except Exception as e:
+            logger.warning(f"Optional step '{name}' failed, using default: {e!r}")
+            return default
+
+    async def _retrieve_batch(
+        self, questions: List[str]
+    ) -> List[
+        Tuple[
+            List[float],
+            Optional[qdrant_models.Filter],
+            Any,
+            List[qdrant_models.ScoredPoint],
+        ]
+    ]:
+        """
+        Retrieve the context of many questions at once.
+
+        The questions are embedded with batched requests and searched with a
+        single Qdrant request, after a single lookup of their cached answers.
+        Questions with a cached answer are not searched, and questions whose
+        filtered search found nothing are searched again without filters in a
+        second request.
+
+        Args:
+            questions (List[str]): The questions
+
+        Returns:
+            List[Tuple[List[float], Optional[qdrant_models.Filter], Any,
+                List[qdrant_models.ScoredPoint]]]: The embedding, search filters,
+                cached answer (None on a miss) and context of each question
+        """
+        with span("question_batch", "query_embedding"):
+            embeddings = await asyncio.wait_for(
+                self.llm.get_embeddings(questions),
+                settings.QUESTION_RETRIEVAL_TIMEOUT,
+            )
+
+        with span("question_batch", "filters"):
+            filters = await asyncio.gather(
+                *[
+                    self._optional(
+                        "filters",
+                        self._create_search_filters(question),
+                        settings.QUESTION_FILTER_TIMEOUT,
+                        None,
+                    )
+                    for question in questions
+                ]
+            )
+
+        cached_answers = [None] * len(questions)
+        if self.answer_cache is not None:
+            with span("question_batch", "cached_answer"):
+                cached_answers = await self._optional(
+                    "cached_answer",
+                    self.answer_cache.lookup_many(embeddings, filters),
+                    settings.QUESTION_RETRIEVAL_TIMEOUT,
+                    cached_answers,
+                )
+
+        if settings.RERANK_ENABLED:
+            limit, with_vectors = settings.RETRIEVAL_CANDIDATES, True
+        else:
+            limit, with_vectors = 5, False
+
+        async def search(indexes: List[int], use_filters: bool) -> None:
+            searched = await asyncio.wait_for(
+                self.vector_database.search_batch_by_embedding(
+                    [embeddings[i] for i in indexes],
+                    [filters[i] if use_filters else None for i in indexes],
+                    [questions[i] for i in indexes],
+                    limit=limit,
+                    with_vectors=with_vectors,
+                ),
+                settings.QUESTION_RETRIEVAL_TIMEOUT,
+            )
+            for i, found in zip(indexes, searched):
+                candidates[i] = found
+
+        candidates: List[List[qdrant_models.ScoredPoint]] = [[] for _ in questions]
+        with span("question_batch", "candidates"):
+            await search(
+                [i for i, cached in enumerate(cached_answers) if cached is None], True
+            )
+            # An empty partition falls back to the whole collection
+            await search(
+                [
+                    i
+                    for i, cached in enumerate(cached_answers)
+                    if cached is None and filters[i] is not None and not candidates[i]
+                ],
+                False,
+            )
+
+        context_results = [
+            (
+                self.reranker.rerank(embedding, found)
+                if settings.RERANK_ENABLED
+                else found
+            )
+            for embedding, found in zip(embeddings, candidates)
+        ]
+        return list(zip(embeddings, filters, cached_answers, context_results))
+
+    async def answer_questions(
+        self, questions: List[str]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer many questions, yielding each answer as soon as it is generated.
 
-        final_response = await self._generate_answer(enhanced_response, context)
+        The questions are retrieved in batches of ``QUESTION_BATCH_SIZE``, and at
+        most ``QUESTION_BATCH_CONCURRENCY`` answers are generated at the same time.
+        The next batch is retrieved while the answers of the previous one are
+        generated, and at most two batches are held in memory.
 
-        return final_response, context_chunks
+        Args:
+            questions (List[str]): The questions to be answered
+
+        Yields:
+            Dict[str, Any]: The result of each question, in order of completion:
+                its ``index`` in ``questions``, the ``question``, and either the
+                ``answer`` and its ``references`` or the ``error`` that failed it
+        """
+        semaphore = asyncio.Semaphore(settings.QUESTION_BATCH_CONCURRENCY)
+        batches = asyncio.Semaphore(_BATCHES_IN_FLIGHT)
+        stopped = asyncio.Event()
+        results: asyncio.Queue = asyncio.Queue()
+
+        def fail(index: int, error: Exception) -> None:
+            logger.error(f"Error while answering question {index}: {error}")
+            results.put_nowait(
+                {"index": index, "question": questions[index], "error": str(error)}
+            )
+
+        async def generate(
+            index: int,
+            generation: Optional[int],
+            embedding: List[float],
+            filters: Optional[qdrant_models.Filter],
+            cached_answer: Any,
+            context_results: List[qdrant_models.ScoredPoint],
+        ) -> None:
+            question = questions[index]
+            try:
+                if cached_answer is not None:
+                    answer, references = (
+                        cached_answer.answer,
+                        cached_answer.references,
+                    )
+                else:
+                    async with semaphore:
+                        enhanced_question = await self._optional(
+                            "enhanced_question",
+                            self._enhance_user_message(question),
+                            settings.QUESTION_ENHANCE_TIMEOUT,
+                            question,
+                        )
+                        with span("question_batch", "answer"):
+                            answer = await asyncio.wait_for(
+                                self._generate_answer(
+                                    enhanced_question,
+                                    self._build_context(context_results),
+                                ),
+                                settings.QUESTION_ANSWER_TIMEOUT,
+                            )
+                    references = [result.payload["text"] for result in context_results]
+                    await self._store_answer(
+                        question,
+                        {
+                            "query_embedding": embedding,
+                            "filters": filters,
+                            "context_results": context_results,
+                        },
+                        answer,
+                        generation,
+                    )
+            except Exception as e:
+                fail(index, e)
+                return
+            results.put_nowait(
+                {
+                    "index": index,
+                    "question": question,
+                    "answer": answer,
+                    "references": references,
+                }
+            )
+
+        async def answer_batch(
+            indexes: range, generation: Optional[int], retrieved: List[Tuple]
+        ) -> None:
+            try:
+                await asyncio.gather(
+                    *[
+                        generate(i, generation, *item)
+                        for i, item in zip(indexes, retrieved)
+                    ]
+                )
+            finally:
+                batches.release()
+
+        async def produce() -> None:
+            answers = []
+            try:
+                for start in range(0, len(questions), settings.QUESTION_BATCH_SIZE):
+                    indexes = range(
+                        start, min(start + settings.QUESTION_BATCH_SIZE, len(questions))
+                    )
+                    # Wait for the answers of a batch before retrieving another one
+                    await batches.acquire()
+                    # asyncio.wait_for can swallow the cancellation of the producer
+                    # before Python 3.12, so the consumer also flags its exit
+                    if stopped.is_set():
+                        return
+                    generation = self._cache_generation()
+                    try:
+                        retrieved = await self._retrieve_batch(
+                            [questions[i] for i in indexes]
+                        )
+                    except Exception as e:
+                        batches.release()
+                        for i in indexes:
+                            fail(i, e)
+                        continue
+                    answers.append(
+                        asyncio.create_task(
+                            answer_batch(indexes, generation, retrieved)
+                        )
+                    )
+                await asyncio.gather(*answers)
+            finally:
+                for task in answers:
+                    task.cancel()
+                results.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+        finally:
+            # The client stopped reading, the remaining questions are dropped
+            stopped.set()
+            producer.cancel()
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.logs import logger
+from services.telemetry import span
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A single step of a StageGraph.
+
+    Attributes:
+        name (str): Unique name of the stage, also the key of its result
+        func (Callable[..., Awaitable[Any]]): Coroutine function running the stage. It
+            receives the results of its dependencies as keyword arguments
+        depends_on (Tuple[str, ...]): Names of the stages whose results are needed
+        timeout (float, optional): Maximum time in seconds the stage may run
+        optional (bool): Whether a failure or timeout falls back to ``default``
+            instead of failing the whole graph
+        default (Any): Result used when an optional stage fails
+    """
+
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    optional: bool = False
+    default: Any = None
+
+
+class StageRun:
+    """A running execution of a StageGraph."""
+
+    def __init__(self, stages: List[Stage], name: str = "graph"):
+        self.name = name
+        self.timings: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        for stage in stages:
+            self._tasks[stage.name] = asyncio.create_task(
+                self._run_stage(stage), name=stage.name
+            )
+
+    async def _run_stage(self, stage: Stage) -> Any:
+        start = None
+        try:
+            # A failed dependency fails the stage, so optional stages fall back
+            dependencies = {name: await self._tasks[name] for name in stage.depends_on}
+
+            start = time.perf_counter()
+            with span(self.name, stage.name):
+                return await asyncio.wait_for(
+                    stage.func(**dependencies), stage.timeout
+                )
+        except Exception as e:
+            if not stage.optional:
+                raise
+            logger.warning(
+                f"Optional stage '{stage.name}' failed, using default: {e!r}"
+            )
+            return stage.default
+        finally:
+            if start is not None:
+                self.timings[stage.name] = time.perf_counter() - start
+
+    async def result(self, name: str) -> Any:
+        """
+        Wait for a single stage and return its result.
+
+        The other stages keep running, so callers must ``cancel()`` the run once
+        they stop waiting for it, including on errors.
+
+        Args:
+            name (str): Name of the stage
+
+        Returns:
+            Any: The result of the stage
+        """
+        return await self._tasks[name]
+
+    async def results(self) -> Dict[str, Any]:
+        """
+        Wait for every stage and return their results.
+
+        If a required stage fails, the remaining stages are cancelled and the
+        error is raised.
+
+        Returns:
+            Dict[str, Any]: The result of each stage, by name
+        """
+        try:
+            await asyncio.gather(*self._tasks.values())
+        except BaseException:
+            self.cancel()
+            raise
+
+        return {name: task.result() for name, task in self._tasks.items()}
+
+    def cancel(self) -> None:
+        """Cancel every stage that is still running."""
+        for task in self._tasks.values():
+            task.cancel()
+
+
+class StageGraph:
+    """
+    A small dependency graph of asynchronous stages.
+
+    Each stage starts as soon as all of its dependencies are done, so stages that
+    do not depend on each other run concurrently. Every stage is traced under the
+    name of the graph.
+    """
+
+    def __init__(self, stages: List[Stage], name: str = "graph"):
+        """
+        Initialize the graph.
+
+        Args:
+            stages (List[Stage]): The stages of the graph. A stage may only depend on
+                stages listed before it
+            name (str): Name of the graph, used as the pipeline name of its traces
+        """
+        seen = set()
+        for stage in stages:
+            unknown = [name for name in stage.depends_on if name not in seen]
+            if unknown:
+                raise ValueError(
+                    f"Stage '{stage.name}' depends on undeclared stages: {unknown}"
+                )
+            seen.add(stage.name)
+
+        self.stages = stages
+        self.name = name
+
+    def start(self) -> StageRun:
+        """
+        Start running the graph.
+
+        Returns:
+            StageRun: Handle to the running stages
+        """
+        return StageRun(self.stages, self.name)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run the graph until every stage is done.
+
+        Returns:
+            Dict[str, Any]: The result of each stage, by name
+        """
+        return await self.start().results()
@@ -2,7 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_utils.timing import add_timing_middleware
 
-from api import consult, ingestion
+from api import consult, ingestion, metrics
 from config.startup import lifespan
 from services.logs import logger
 
@@ -20,3 +20,4 @@ add_timing_middleware(app, record=logger.info, prefix="app")
 
 app.include_router(consult.router)
 app.include_router(ingestion.router)
+app.include_router(metrics.router)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -9,3 +9,15 @@ class ConsultRequest(BaseModel):
 class ConsultResponse(BaseModel):
     answer: str
     references: List[str]
+
+
+class BatchConsultRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1)
+
+
+class BatchConsultResult(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    references: List[str] = []
+    error: Optional[str] = None
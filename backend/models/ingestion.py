@@ -1,7 +1,36 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
+class IngestionJob(BaseModel):
+    job_id: str
+    filename: str
+    status: str
+
+
 class IngestionResponse(BaseModel):
     message: str
-    documents_indexed: int
-    total_chunks: int
+    jobs: List[IngestionJob]
+
+
+class IngestionProgress(BaseModel):
+    skipped: bool = False
+    extracted: bool = False
+    metadata_extracted: bool = False
+    chunked: int = 0
+    total_chunks: Optional[int] = None
+    embedded: int = 0
+    upserted: int = 0
+    reused: int = 0
+    deleted: int = 0
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str
+    progress: IngestionProgress
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,278 @@
+import json
+import time
+from typing import List, NamedTuple, Optional
+from uuid import NAMESPACE_URL, uuid5
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client import models as qdrant_models
+
+from config.settings import Settings
+from services.telemetry import CACHE_REQUESTS, QDRANT_REQUEST_DURATION, track
+
+settings = Settings()
+
+
+class CachedAnswer(NamedTuple):
+    answer: str
+    references: List[str]
+
+
+class SemanticAnswerCache:
+    """
+    A semantic cache of previously answered questions.
+
+    Answers are stored in a dedicated Qdrant collection, indexed by the embedding of
+    the question. This class provides:
+    - Lookups returning a stored answer when a similar enough question was answered
+    - Expiration of entries after a configurable TTL
+    - Invalidation of the answers referencing documents that were re-ingested
+
+    Answers are scoped by the search filters of their question: questions
+    differing only by the product they mention have nearly identical embeddings,
+    so a lookup only matches answers stored with the same filters.
+    """
+
+    def __init__(
+        self,
+        qdrant: AsyncQdrantClient,
+        collection_name: str = None,
+        similarity_threshold: float = None,
+        ttl_seconds: int = None,
+    ):
+        """
+        Initialize the SemanticAnswerCache.
+
+        Args:
+            qdrant (AsyncQdrantClient): Shared Qdrant client
+            collection_name (str, optional): Name of the collection storing the answers
+            similarity_threshold (float, optional): Minimum cosine similarity of a hit
+            ttl_seconds (int, optional): Time in seconds an answer remains valid
+        """
+        self.qdrant = qdrant
+        self.collection_name = (
+            collection_name
+            or settings.ANSWER_CACHE_COLLECTION_NAME
+            or f"{settings.QDRANT_COLLECTION_NAME}_answers"
+        )
+        self.similarity_threshold = (
+            settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+            if similarity_threshold is None
+            else similarity_threshold
+        )
+        self.ttl_seconds = (
+            settings.ANSWER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+
+        self.hits = 0
+        self.misses = 0
+        # Incremented by each invalidation, so answers generated from the documents
+        # as they were before it are not stored after it
+        self.generation = 0
+
+    async def ensure_collection(self) -> None:
+        """Create the answer cache collection if it does not exist yet."""
+        if await self.qdrant.collection_exists(self.collection_name):
+            return
+
+        await self.qdrant.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=qdrant_models.VectorParams(
+                size=settings.VECTOR_DIMENSIONS,
+                distance=qdrant_models.Distance.COSINE,
+            ),
+        )
+        await self.qdrant.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="scope",
+            field_schema=qdrant_models.PayloadSchemaType.KEYWORD,
+        )
+        await self.qdrant.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="filenames",
+            field_schema=qdrant_models.PayloadSchemaType.KEYWORD,
+        )
+        await self.qdrant.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="expires_at",
+            field_schema=qdrant_models.PayloadSchemaType.FLOAT,
+        )
+
+    @staticmethod
+    def _scope(filters: Optional[qdrant_models.Filter]) -> str:
+        """Canonical form of the search filters of a question, empty for none."""
+        if filters is None:
+            return ""
+        return json.dumps(filters.model_dump(exclude_none=True), sort_keys=True)
+
+    def _lookup_filter(
+        self, filters: Optional[qdrant_models.Filter]
+    ) -> qdrant_models.Filter:
+        return qdrant_models.Filter(
+            must=[
+                qdrant_models.FieldCondition(
+                    key="expires_at",
+                    range=qdrant_models.Range(gt=time.time()),
+                ),
+                qdrant_models.FieldCondition(
+                    key="scope",
+                    match=qdrant_models.MatchValue(value=self._scope(filters)),
+                ),
+            ]
+        )
+
+    def _to_cached_answer(
+        self, points: List[qdrant_models.ScoredPoint]
+    ) -> Optional[CachedAnswer]:
+        if not points:
+            self.misses += 1
+            CACHE_REQUESTS.labels(cache="answer", result="miss").inc()
+            return None
+
+        self.hits += 1
+        CACHE_REQUESTS.labels(cache="answer", result="hit").inc()
+        payload = points[0].payload
+        return CachedAnswer(payload["answer"], payload["references"])
+
+    async def lookup(
+        self,
+        question_embedding: List[float],
+        filters: Optional[qdrant_models.Filter] = None,
+    ) -> Optional[CachedAnswer]:
+        """
+        Look up the answer of a similar, previously answered question.
+
+        Args:
+            question_embedding (List[float]): The embedding of the question
+            filters (qdrant_models.Filter, optional): The search filters of the
+                question
+
+        Returns:
+            CachedAnswer, optional: The cached answer, or None on a cache miss
+        """
+        with track(QDRANT_REQUEST_DURATION, operation="answer_cache_lookup"):
+            search_results = await self.qdrant.query_points(
+                collection_name=self.collection_name,
+                query=question_embedding,
+                limit=1,
+                score_threshold=self.similarity_threshold,
+                query_filter=self._lookup_filter(filters),
+            )
+
+        return self._to_cached_answer(search_results.points)
+
+    async def lookup_many(
+        self,
+        question_embeddings: List[List[float]],
+        filters: List[Optional[qdrant_models.Filter]],
+    ) -> List[Optional[CachedAnswer]]:
+        """
+        Look up the answers of many questions in a single request.
+
+        Args:
+            question_embeddings (List[List[float]]): The embeddings of the questions
+            filters (List[Optional[qdrant_models.Filter]]): The search filters of
+                each question
+
+        Returns:
+            List[Optional[CachedAnswer]]: The cached answer of each question, or None
+                on a cache miss
+        """
+        if not question_embeddings:
+            return []
+
+        with track(QDRANT_REQUEST_DURATION, operation="answer_cache_lookup_batch"):
+            responses = await self.qdrant.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    qdrant_models.QueryRequest(
+                        query=question_embedding,
+                        limit=1,
+                        score_threshold=self.similarity_threshold,
+                        filter=self._lookup_filter(question_filters),
+                        with_payload=True,
+                    )
+                    for question_embedding, question_filters in zip(
+                        question_embeddings, filters
+                    )
+                ],
+            )
+
+        return [self._to_cached_answer(response.points) for response in responses]
+
+    async def store(
+        self,
+        question: str,
+        question_embedding: List[float],
+        answer: str,
+        references: List[str],
+        filenames: List[str],
+        filters: Optional[qdrant_models.Filter] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        Store the answer of a question.
+
+        Args:
+            question (str): The answered question
+            question_embedding (List[float]): The embedding of the question
+            answer (str): The generated answer
+            references (List[str]): The references returned with the answer
+            filenames (List[str]): Names of the documents the references come from
+            filters (qdrant_models.Filter, optional): The search filters of the
+                question
+            generation (int, optional): The ``generation`` of the cache when the
+                answer started to be generated; the answer is not stored if
+                documents were invalidated since
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        scope = self._scope(filters)
+        now = time.time()
+        with track(QDRANT_REQUEST_DURATION, operation="answer_cache_store"):
+            await self.qdrant.upsert(
+                collection_name=self.collection_name,
+                points=[
+                    qdrant_models.PointStruct(
+                        id=str(uuid5(NAMESPACE_URL, f"{scope}\n{question}")),
+                        vector=question_embedding,
+                        payload={
+                            "question": question,
+                            "answer": answer,
+                            "references": references,
+                            "filenames": sorted(set(filenames)),
+                            "scope": scope,
+                            "created_at": now,
+                            "expires_at": now + self.ttl_seconds,
+                        },
+                    )
+                ],
+            )
+
+    async def invalidate_documents(self, filenames: List[str]) -> None:
+        """
+        Remove the answers referencing any of the given documents, along with
+        every expired answer.
+
+        Args:
+            filenames (List[str]): Names of the documents that changed
+        """
+        self.generation += 1
+        with track(QDRANT_REQUEST_DURATION, operation="answer_cache_invalidate"):
+            await self.qdrant.delete(
+                collection_name=self.collection_name,
+                points_selector=qdrant_models.FilterSelector(
+                    filter=qdrant_models.Filter(
+                        should=[
+                            qdrant_models.FieldCondition(
+                                key="filenames",
+                                match=qdrant_models.MatchAny(any=filenames),
+                            ),
+                            qdrant_models.FieldCondition(
+                                key="expires_at",
+                                range=qdrant_models.Range(lte=time.time()),
+                            ),
+                        ]
+                    )
+                ),
+            )
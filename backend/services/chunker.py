@@ -1,6 +1,46 @@
-import asyncio
 import re
-from typing import Coroutine, List
+from typing import Callable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from services.tokenizer import get_token_counter
+
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_NON_SPACE_PATTERN = re.compile(r"\S")
+_WORD_PATTERN = re.compile(r"\S+")
+# A word of the text once HTML tags are removed, as tags may contain whitespace
+_HTML_WORD_PATTERN = re.compile(r"(?:<[^>]+>|[^\s<]+|<)+")
+
+_HEADING_PATTERN = re.compile(r"(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?")
+# The row of dashes between the header and the body of a markdown table
+_TABLE_SEPARATOR_PATTERN = re.compile(r"[|:\s]*-[-|:\s]*")
+# Pieces of a split table row without any of these only hold cell separators
+_CELL_CONTENT_PATTERN = re.compile(r"[^|\s]")
+_HTML_TABLE_END_PATTERN = re.compile(r"</table\s*>", re.IGNORECASE)
+_HTML_ROW_PATTERN = re.compile(r"<tr\b.*?</tr\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_CELL_PATTERN = re.compile(
+    r"<t([hd])\b[^>]*>(.*?)</t[hd]\s*>", re.IGNORECASE | re.DOTALL
+)
+_HTML_CAPTION_PATTERN = re.compile(
+    r"<caption\b[^>]*>(.*?)</caption\s*>", re.IGNORECASE | re.DOTALL
+)
+
+
+class TextChunk(NamedTuple):
+    """
+    A chunk of text.
+
+    Attributes:
+        text (str): Content of the chunk, prefixed with the overlap of the previous
+            chunk
+        start (int): Offset in the original text where the chunk content starts
+        end (int): Offset in the original text where the chunk content ends
+        section_path (Tuple[str, ...]): Headings of the section of the chunk, from
+            the outermost one
+    """
+
+    text: str
+    start: int
+    end: int
+    section_path: Tuple[str, ...] = ()
 
 
 class TextChunker:
@@ -12,6 +52,9 @@ class TextChunker:
     - Maintain context through overlapping chunks
     - Clean and preprocess text content
     - Handle various text formats and structures
+
+    Chunking is CPU-bound and runs synchronously in a single pass over the text,
+    keeping track of the offsets of each chunk in the original text.
     """
 
     def __init__(
@@ -30,138 +73,555 @@ class TextChunker:
             separator (str): The separator to use for splitting text
             clean_html_tags (bool): Whether to remove HTML tags from the text
         """
+        if not separator:
+            raise ValueError("The separator must not be empty")
+
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.separator = separator
         self.clean_html_tags = clean_html_tags
 
-    def _clean_text(self, text: str) -> str:
+    def _iter_segments(self, text: str) -> Iterator[Tuple[str, int, int]]:
         """
-        Clean and preprocess text before chunking.
+        Iterate over the non-blank segments between separators.
 
-        Args:
-            text (str): Raw text to clean
+        Yields:
+            Tuple[str, int, int]: The stripped segment and its start and end offsets
+        """
+        separator_length = len(self.separator)
+        position = 0
+        while position <= len(text):
+            end = text.find(self.separator, position)
+            if end == -1:
+                end = len(text)
+
+            segment = text[position:end]
+            stripped = segment.strip()
+            if stripped:
+                start = position + len(segment) - len(segment.lstrip())
+                yield stripped, start, start + len(stripped)
+
+            position = end + separator_length
+
+    def _clean(self, text: str) -> str:
+        """Remove the HTML tags if enabled and collapse whitespace."""
+        if self.clean_html_tags:
+            text = _TAG_PATTERN.sub("", text)
+        return " ".join(text.split())
+
+    def _open_tag_start(self, text: str, start: int, position: int) -> int:
+        """Return where the HTML tag around a position starts, or -1 if none."""
+        if not self.clean_html_tags:
+            return -1
+        closing = text.rfind(">", start, position)
+        opening = text.find("<", max(start, closing + 1), position)
+        if opening != -1 and text.find(">", position) != -1:
+            return opening
+        return -1
+
+    def _word_boundary(self, text: str, start: int, position: int) -> int:
+        """
+        Return the last whitespace position at or before ``position`` that is not
+        inside an HTML tag, or ``start`` if there is none.
+        """
+        while position > start:
+            if text[position].isspace():
+                tag_start = self._open_tag_start(text, start, position)
+                if tag_start == -1:
+                    return position
+                position = tag_start
+            position -= 1
+        return start
+
+    def _drop_words(self, text: str, start: int, end: int, count: int) -> int:
+        """Move the end of a chunk back by a number of words."""
+        for _ in range(count):
+            end -= 1
+            while end > start and text[end].isspace():
+                end -= 1
+            end = self._word_boundary(text, start, end)
+        return end
+
+    def _pack_words(
+        self, text: str, start: int, end: int, pattern: Pattern
+    ) -> Iterator[Tuple[str, int, int]]:
+        """
+        Pack the words of a range of the text into chunks joined by spaces.
 
-        Returns:
-            str: Cleaned text with normalized whitespace and optional HTML removal
+        Instead of walking the text word by word, the end of each chunk is found by
+        growing a window of the original text until its cleaned content fills the
+        chunk, then dropping the words that do not fit.
+
+        Yields:
+            Tuple[str, int, int]: The chunk and its start and end offsets
         """
-        # Remove multiple newlines
-        text = re.sub(r"\n\s*\n", "\n\n", text)
+        match = _NON_SPACE_PATTERN.search(text, start, end)
+        chunk_start = match.start() if match else end
+
+        while chunk_start < end:
+            # Whitespace and tags shrink when cleaned, so the window is grown in
+            # proportion to the raw text taken by each cleaned character
+            window = min(end, chunk_start + self.chunk_size)
+            while True:
+                chunk_end = window
+                if window < end:
+                    chunk_end = self._word_boundary(text, chunk_start, window)
+                content = self._clean(text[chunk_start:chunk_end])
+                if len(content) >= self.chunk_size or window == end:
+                    break
+                raw_length = (window - chunk_start) * self.chunk_size
+                estimate = chunk_start + raw_length // max(len(content), 1) + 16
+                window = min(end, max(estimate, window + 16))
+
+            while len(content) > self.chunk_size:
+                cut = content.rfind(" ", 0, self.chunk_size + 1)
+                if cut == -1:
+                    # A single word longer than a chunk
+                    chunk_end = pattern.match(text, chunk_start).end()
+                    content = self._clean(text[chunk_start:chunk_end])
+                    break
+                dropped_end = chunk_end
+                chunk_end = self._drop_words(
+                    text, chunk_start, chunk_end, content.count(" ", cut)
+                )
+                if "<" in text[chunk_end:dropped_end]:
+                    # Tags may not map to words of the cleaned content
+                    content = self._clean(text[chunk_start:chunk_end])
+                else:
+                    content = content[:cut]
+
+            if content:
+                yield content, chunk_start, chunk_end
+
+            match = _NON_SPACE_PATTERN.search(text, chunk_end, end)
+            chunk_start = match.start() if match else end
+
+    def _iter_raw_chunks(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """
+        Split the text into chunks, without overlap.
+
+        Segments are packed together until a chunk is full. Segments longer than a
+        chunk are split on word boundaries. When HTML tags are cleaned, whitespace is
+        collapsed as well and the text is packed word by word.
 
-        # Remove HTML tags if enabled
+        Yields:
+            Tuple[str, int, int]: The chunk and its start and end offsets
+        """
         if self.clean_html_tags:
-            text = re.sub(r"<[^>]+>", "", text)
-
-        return text.strip()
-
-    async def _handle_long_segment(self, segment: str) -> List[str]:
-        """Split long segments into smaller parts using word boundaries."""
-        words = segment.split()
-        chunks = []
-        temp_chunk = []
-        temp_length = 0
-
-        for word in words:
-            word_length = len(word) + 1  # +1 for space
-            if temp_length + word_length > self.chunk_size:
-                if temp_chunk:
-                    chunks.append(" ".join(temp_chunk))
-                temp_chunk = [word]
-                temp_length = word_length
+            yield from self._pack_words(text, 0, len(text), _HTML_WORD_PATTERN)
+            return
+
+        segments: List[str] = []
+        length = chunk_start = chunk_end = 0
+        separator_length = len(self.separator)
+
+        for segment, start, end in self._iter_segments(text):
+            if segments and length + separator_length + len(segment) > self.chunk_size:
+                yield self.separator.join(segments), chunk_start, chunk_end
+                segments = []
+
+            if len(segment) > self.chunk_size:
+                yield from self._pack_words(text, start, end, _WORD_PATTERN)
+                continue
+
+            if segments:
+                length += separator_length + len(segment)
             else:
-                temp_chunk.append(word)
-                temp_length += word_length
+                chunk_start = start
+                length = len(segment)
+            segments.append(segment)
+            chunk_end = end
 
-        if temp_chunk:
-            chunks.append(" ".join(temp_chunk))
+        if segments:
+            yield self.separator.join(segments), chunk_start, chunk_end
 
-        await asyncio.sleep(0)  # Allow other tasks to run
-        return chunks
+    def iter_chunks(self, text: str) -> Iterator[TextChunk]:
+        """
+        Split text into overlapping chunks, lazily.
 
-    async def _add_overlap(self, chunks: List[str]) -> List[str]:
-        """Add overlap between consecutive chunks."""
-        if self.chunk_overlap <= 0 or len(chunks) <= 1:
-            return chunks
+        Args:
+            text (str): The input text to be split into chunks
 
-        tasks: List[Coroutine] = []
+        Yields:
+            TextChunk: The next chunk, with its offsets in ``text``
+        """
+        previous = None
+        for content, start, end in self._iter_raw_chunks(text):
+            if previous is not None and self.chunk_overlap > 0:
+                overlap = previous[max(0, len(previous) - self.chunk_overlap) :]
+                yield TextChunk(overlap + self.separator + content, start, end)
+            else:
+                yield TextChunk(content, start, end)
+            previous = content
 
-        async def process_chunk(i: int) -> str:
-            if i == 0:
-                return chunks[i]
-            prev_chunk = chunks[i - 1]
-            start_idx = max(0, len(prev_chunk) - self.chunk_overlap)
-            overlap_text = prev_chunk[start_idx:]
-            return overlap_text + self.separator + chunks[i]
+    def chunk(self, text: str) -> List[TextChunk]:
+        """
+        Split text into overlapping chunks.
 
-        # Create tasks for processing each chunk
-        for i in range(len(chunks)):
-            tasks.append(process_chunk(i))
+        Args:
+            text (str): The input text to be split into chunks
 
-        # Process all chunks concurrently
-        results = await asyncio.gather(*tasks)
-        return list(results)
+        Returns:
+            List[TextChunk]: The chunks, with their offsets in ``text``
+        """
+        return list(self.iter_chunks(text))
 
     async def split_text(self, text: str) -> List[str]:
         """
         Split text into smaller chunks while maintaining semantic coherence.
 
+        Kept for compatibility, prefer ``chunk``.
+
         Args:
             text (str): The input text to be split into chunks
 
         Returns:
             List[str]: A list of text chunks
         """
-        if self.clean_html_tags:
-            # Remove HTML tags if specified
-            text = re.sub(r"<[^>]+>", "", text)
-            text = re.sub(r"\s+", " ", text).strip()
-
-        # Remove excessive newlines and whitespace
-        text = re.sub(r"\n+", "\n", text.strip())
-
-        # Split the text into smaller segments
-        segments = text.split(self.separator)
-        segments = [seg.strip() for seg in segments if seg.strip()]
-
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        chunk_tasks: List[Coroutine] = []
-
-        async def process_segment(segment: str) -> List[str]:
-            segment_length = len(segment)
-            if segment_length > self.chunk_size:
-                return await self._handle_long_segment(segment)
-            return [segment]
-
-        # Process segments concurrently in batches
-        for segment in segments:
-            segment_length = len(segment)
-
-            if segment_length > self.chunk_size:
-                if current_chunk:
-                    chunks.append(self.separator.join(current_chunk))
-                chunk_tasks.append(process_segment(segment))
-                current_chunk = []
-                current_length = 0
+        return [chunk.text for chunk in self.chunk(text)]
+
+
+class _Unit(NamedTuple):
+    """A piece of a markdown document that is never split further."""
+
+    kind: str
+    text: str
+    start: int
+    end: int
+    tokens: int
+
+
+def _is_table_row(text: str, start: int, end: int) -> bool:
+    """Return whether a line of the text is a row of a markdown table."""
+    return text[start:end].lstrip().startswith("|")
+
+
+def _clean_line(text: str) -> str:
+    """Remove the HTML tags of a line and collapse its whitespace."""
+    return " ".join(_TAG_PATTERN.sub("", text).split())
+
+
+class MarkdownChunker:
+    """
+    A service splitting markdown documents into chunks sized in tokens.
+
+    This class follows the structure of the markdown produced by MarkItDown and
+    Document Intelligence:
+    - Chunks never span two sections, so headings start a new chunk
+    - Tables (markdown or HTML) are kept whole when they fit in a chunk, and are
+      otherwise split between rows with their header repeated
+    - Paragraphs are only split between words when longer than a chunk
+    - Each chunk carries the path of headings of its section
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 512,
+        overlap_tokens: int = 64,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Initialize the MarkdownChunker.
+
+        Args:
+            max_tokens (int): Maximum size of each chunk in tokens
+            overlap_tokens (int): Number of tokens of the previous paragraph
+                repeated at the start of a chunk continuing the same section
+            count_tokens (Callable[[str], int], optional): Function counting the
+                tokens of a text, the tokenizer of the embedding model by default
+        """
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens or get_token_counter()
+        # Paragraphs and tables longer than a chunk are split into pieces leaving
+        # room for the overlap or the headings of their section
+        self.piece_tokens = max(max_tokens - overlap_tokens, max_tokens // 2)
+
+    @staticmethod
+    def _split_lines(text: str) -> List[Tuple[int, int]]:
+        """Return the start and end offsets of the lines of a text."""
+        lines = []
+        position = 0
+        while position <= len(text):
+            end = text.find("\n", position)
+            if end == -1:
+                end = len(text)
+            lines.append((position, end))
+            position = end + 1
+        return lines
+
+    def _iter_blocks(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """
+        Iterate over the headings, paragraphs and tables of a markdown document.
+
+        Yields:
+            Tuple[str, int, int]: The kind of the block and its start and end offsets
+        """
+        lines = self._split_lines(text)
+        paragraph_start = paragraph_end = None
+        i = 0
+        while i < len(lines):
+            start, end = lines[i]
+            line = text[start:end].strip()
+
+            kind = None
+            if _is_table_row(text, start, end):
+                kind = "table"
+                while i + 1 < len(lines) and _is_table_row(text, *lines[i + 1]):
+                    i += 1
+                end = lines[i][1]
+            elif line[:6].lower() == "<table":
+                kind = "html_table"
+                match = _HTML_TABLE_END_PATTERN.search(text, start)
+                end = match.end() if match else len(text)
+                while i + 1 < len(lines) and lines[i + 1][0] < end:
+                    i += 1
+            elif _HEADING_PATTERN.fullmatch(line):
+                kind = "heading"
+
+            # Blank lines and page comments of Document Intelligence end paragraphs
+            if kind or not _clean_line(line):
+                if paragraph_start is not None:
+                    yield "paragraph", paragraph_start, paragraph_end
+                    paragraph_start = None
+                if kind:
+                    yield kind, start, end
+            else:
+                if paragraph_start is None:
+                    paragraph_start = start
+                paragraph_end = end
+            i += 1
+
+        if paragraph_start is not None:
+            yield "paragraph", paragraph_start, paragraph_end
+
+    def _split_words(
+        self, text: str, start: int, end: int, max_tokens: int = None
+    ) -> Iterator[_Unit]:
+        """Split a range of the text too long for a chunk between words."""
+        max_tokens = max_tokens or self.piece_tokens
+        words: List[str] = []
+        tokens = 0
+        words_start = words_end = start
+        for match in _HTML_WORD_PATTERN.finditer(text, start, end):
+            word = _TAG_PATTERN.sub("", match.group())
+            if not word:
                 continue
+            word_tokens = self.count_tokens(" " + word)
+            if words and tokens + word_tokens > max_tokens:
+                yield _Unit(
+                    "paragraph", " ".join(words), words_start, words_end, tokens
+                )
+                words, tokens = [], 0
+            if not words:
+                words_start = match.start()
+            words.append(word)
+            tokens += word_tokens
+            words_end = match.end()
+
+        if words:
+            yield _Unit("paragraph", " ".join(words), words_start, words_end, tokens)
+
+    def _table_rows(
+        self, kind: str, text: str, start: int, end: int
+    ) -> Tuple[List[str], List[Tuple[str, int, int]]]:
+        """
+        Extract the rows of a markdown or HTML table as markdown rows.
 
-            if current_length + segment_length > self.chunk_size and current_chunk:
-                chunks.append(self.separator.join(current_chunk))
-                current_chunk = []
-                current_length = 0
+        Returns:
+            Tuple[List[str], List[Tuple[str, int, int]]]: The header rows, and the
+                other rows with their start and end offsets
+        """
+        header: List[str] = []
+        rows: List[Tuple[str, int, int]] = []
+        if kind == "table":
+            for line_start, line_end in self._split_lines(text[start:end]):
+                row = " ".join(text[start + line_start : start + line_end].split())
+                if row:
+                    rows.append((row, start + line_start, start + line_end))
+            # The header is followed by a separator row of dashes
+            if len(rows) > 1 and _TABLE_SEPARATOR_PATTERN.fullmatch(rows[1][0]):
+                header = [rows[0][0], rows[1][0]]
+                rows = rows[2:]
+            return header, rows
+
+        caption = _HTML_CAPTION_PATTERN.search(text, start, end)
+        if caption:
+            header.append(_clean_line(caption.group(1)))
+        for match in _HTML_ROW_PATTERN.finditer(text, start, end):
+            cells = _HTML_CELL_PATTERN.findall(match.group())
+            row = "| " + " | ".join(_clean_line(cell) for _, cell in cells) + " |"
+            if cells and all(tag.lower() == "h" for tag, _ in cells):
+                header.append(row)
+            else:
+                rows.append((row, match.start(), match.end()))
+        return header, rows
+
+    def _split_table(
+        self, kind: str, text: str, start: int, end: int
+    ) -> Iterator[_Unit]:
+        """Split a table into units of whole rows, each repeating the header."""
+        header, rows = self._table_rows(kind, text, start, end)
+        table = "\n".join(header + [row for row, _, _ in rows])
+        tokens = self.count_tokens(table)
+        if tokens <= self.piece_tokens or not rows:
+            if table:
+                yield _Unit("table", table, start, end, tokens)
+            return
+
+        header_tokens = self.count_tokens("\n".join(header)) + 1 if header else 0
+        group: List[str] = []
+        group_tokens = header_tokens
+        group_start = start
+        for row, row_start, row_end in rows:
+            row_tokens = self.count_tokens(row) + 1
+            too_large = header_tokens + row_tokens > self.piece_tokens
+            if group and (too_large or group_tokens + row_tokens > self.piece_tokens):
+                group_text = "\n".join(header + group)
+                yield _Unit("table", group_text, group_start, row_start, group_tokens)
+                group, group_tokens = [], header_tokens
+                group_start = row_start
+
+            if too_large:
+                # A single row larger than a chunk is split between words, each
+                # piece under the header. Pieces stay table units, so the overlap
+                # of paragraphs never repeats cell fragments
+                for piece in self._split_words(
+                    text,
+                    row_start,
+                    row_end,
+                    max(self.piece_tokens - header_tokens, self.piece_tokens // 4),
+                ):
+                    if not _CELL_CONTENT_PATTERN.search(piece.text):
+                        continue
+                    yield _Unit(
+                        "table",
+                        "\n".join(header + [piece.text]),
+                        piece.start,
+                        piece.end,
+                        header_tokens + piece.tokens,
+                    )
+                group_start = row_end
+                continue
+            group.append(row)
+            group_tokens += row_tokens
+
+        if group:
+            group_text = "\n".join(header + group)
+            yield _Unit("table", group_text, group_start, end, group_tokens)
+
+    def _iter_units(self, text: str) -> Iterator[Tuple[_Unit, Tuple[str, ...]]]:
+        """
+        Iterate over the units of a markdown document and the path of headings of
+        their section.
+
+        Yields:
+            Tuple[_Unit, Tuple[str, ...]]: The unit and its section path
+        """
+        headings: List[Tuple[int, str]] = []
+        for kind, start, end in self._iter_blocks(text):
+            if kind == "heading":
+                match = _HEADING_PATTERN.fullmatch(text[start:end].strip())
+                level, title = len(match.group(1)), _clean_line(match.group(2))
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, title))
+                line = f"{match.group(1)} {title}"
+                units = [_Unit(kind, line, start, end, self.count_tokens(line))]
+            elif kind == "paragraph":
+                paragraph = "\n".join(
+                    filter(None, map(_clean_line, text[start:end].split("\n")))
+                )
+                tokens = self.count_tokens(paragraph)
+                if tokens <= self.piece_tokens:
+                    units = [_Unit(kind, paragraph, start, end, tokens)]
+                else:
+                    units = self._split_words(text, start, end)
+            else:
+                units = self._split_table(kind, text, start, end)
+
+            section_path = tuple(title for _, title in headings if title)
+            for unit in units:
+                yield unit, section_path
+
+    def _overlap(self, unit: _Unit) -> Tuple[str, int]:
+        """Return the end of a paragraph to repeat in the next chunk, and its tokens."""
+        if unit.kind != "paragraph" or self.overlap_tokens <= 0:
+            return "", 0
+
+        words = unit.text.split()
+        tokens = 0
+        count = 0
+        for word in reversed(words):
+            word_tokens = self.count_tokens(" " + word)
+            if tokens + word_tokens > self.overlap_tokens:
+                break
+            tokens += word_tokens
+            count += 1
+        return " ".join(words[len(words) - count :]), tokens
+
+    def iter_chunks(self, text: str) -> Iterator[TextChunk]:
+        """
+        Split a markdown document into chunks, lazily.
 
-            current_chunk.append(segment)
-            current_length += segment_length + len(self.separator)
+        Units are packed into a chunk until it is full or the section changes.
+        Headings are never emitted alone: they are carried into the chunk of the
+        next content, even a subsection or a unit filling a chunk, so headings stay
+        with their content. Chunks continuing a section start with the end of the
+        last paragraph of the previous chunk.
 
-        if current_chunk:
-            chunks.append(self.separator.join(current_chunk))
+        Args:
+            text (str): The markdown document to be split into chunks
 
-        # Process any remaining tasks and extend chunks with results
-        if chunk_tasks:
-            results = await asyncio.gather(*chunk_tasks)
-            for result in results:
-                chunks.extend(result)
+        Yields:
+            TextChunk: The next chunk, with its offsets in ``text`` and its section
+                path
+        """
+        units: List[_Unit] = []
+        tokens = 0
+        section_path: Tuple[str, ...] = ()
+        overlap = ""
+
+        for unit, unit_path in self._iter_units(text):
+            has_content = any(previous.kind != "heading" for previous in units)
+            new_section = has_content and unit_path != section_path
+            if has_content and (
+                new_section or tokens + 1 + unit.tokens > self.max_tokens
+            ):
+                yield self._make_chunk(overlap, units, section_path)
+                overlap, tokens = ("", 0) if new_section else self._overlap(units[-1])
+                units = []
+
+            if not units and tokens + 1 + unit.tokens > self.max_tokens:
+                overlap, tokens = "", 0
+            units.append(unit)
+            tokens += 1 + unit.tokens
+            section_path = unit_path
+
+        if units:
+            yield self._make_chunk(overlap, units, section_path)
+
+    @staticmethod
+    def _make_chunk(
+        overlap: str, units: List[_Unit], section_path: Tuple[str, ...]
+    ) -> TextChunk:
+        content = "\n\n".join(unit.text for unit in units)
+        return TextChunk(
+            overlap + "\n" + content if overlap else content,
+            units[0].start,
+            units[-1].end,
+            section_path,
+        )
+
+    def chunk(self, text: str) -> List[TextChunk]:
+        """
+        Split a markdown document into chunks.
 
-        # Add overlap between chunks
-        return await self._add_overlap(chunks)
+        Args:
+            text (str): The markdown document to be split into chunks
+
+        Returns:
+            List[TextChunk]: The chunks, with their offsets in ``text`` and their
+                section path
+        """
+        return list(self.iter_chunks(text))
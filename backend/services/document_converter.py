@@ -0,0 +1,168 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from markitdown import MarkItDown
+
+from config.settings import Settings
+from services.logs import logger
+
+settings = Settings()
+
+_worker_state = threading.local()
+
+
+def _get_markitdown() -> MarkItDown:
+    """Return the MarkItDown instance of the current worker, creating it once."""
+    if getattr(_worker_state, "markitdown", None) is None:
+        _worker_state.markitdown = MarkItDown()
+    return _worker_state.markitdown
+
+
+def _init_worker(worker_pids: multiprocessing.SimpleQueue) -> None:
+    """Record the process id of a new pool worker and load its converter."""
+    worker_pids.put(os.getpid())
+    _get_markitdown()
+
+
+def _convert_pdf(pdf_path: str) -> str:
+    """Convert a PDF document to markdown inside a pool worker."""
+    return _get_markitdown().convert(pdf_path).markdown
+
+
+class DocumentConverter:
+    """
+    A service converting PDF documents to markdown outside of the event loop.
+
+    This class provides:
+    - A process pool for large documents, so CPU-bound parsing does not hold the GIL
+      of the API process
+    - A thread pool for light documents, avoiding the process startup overhead
+    - A per-document timeout
+    - Reuse of the MarkItDown converter by each worker
+
+    Documents are read by the workers from their file, so their content is never
+    copied between processes.
+    """
+
+    def __init__(
+        self,
+        process_workers: int = None,
+        thread_workers: int = None,
+        process_min_bytes: int = None,
+        timeout: float = None,
+    ):
+        """
+        Initialize the DocumentConverter. Worker pools are started on first use.
+
+        Args:
+            process_workers (int, optional): Number of worker processes, 0 to disable
+                the process pool
+            thread_workers (int, optional): Number of worker threads
+            process_min_bytes (int, optional): Size from which a document is
+                converted in the process pool
+            timeout (float, optional): Maximum time in seconds to convert a document
+        """
+        self.process_workers = (
+            settings.PDF_PROCESS_WORKERS if process_workers is None else process_workers
+        )
+        self.thread_workers = thread_workers or settings.PDF_THREAD_WORKERS
+        self.process_min_bytes = (
+            settings.PDF_PROCESS_POOL_MIN_BYTES
+            if process_min_bytes is None
+            else process_min_bytes
+        )
+        self.timeout = timeout or settings.PDF_CONVERSION_TIMEOUT
+
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        # Process ids of the workers of the process pool, sent by each worker
+        self._worker_pids: Optional[multiprocessing.SimpleQueue] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self, size: int) -> Executor:
+        """Pick the worker pool for a document of the given size."""
+        if self.process_workers > 0 and size >= self.process_min_bytes:
+            if self._process_pool is None:
+                context = multiprocessing.get_context("spawn")
+                self._worker_pids = context.SimpleQueue()
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self._worker_pids,),
+                )
+            return self._process_pool
+
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers, thread_name_prefix="pdf-converter"
+            )
+        return self._thread_pool
+
+    def _kill_process_pool(self) -> None:
+        """Terminate the worker processes, the next conversion starts a new pool."""
+        pool, self._process_pool = self._process_pool, None
+        worker_pids, self._worker_pids = self._worker_pids, None
+        if pool is None:
+            return
+        pids = []
+        while not worker_pids.empty():
+            pids.append(worker_pids.get())
+        worker_pids.close()
+        # ProcessPoolExecutor cannot stop a running task, only its process can
+        pool.shutdown(wait=False, cancel_futures=True)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    async def convert_pdf(self, pdf_path: str) -> str:
+        """
+        Convert a PDF document to markdown.
+
+        When a conversion in the process pool times out, the worker processes are
+        terminated so they stop converting it, and the other documents of the pool
+        are converted again in a new one. A timed out conversion in the thread pool
+        keeps its thread busy until it finishes.
+
+        Args:
+            pdf_path (str): Path of the PDF document
+
+        Returns:
+            str: Extracted text in markdown format
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor(os.path.getsize(pdf_path))
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, _convert_pdf, pdf_path), self.timeout
+            )
+        except asyncio.TimeoutError:
+            if executor is self._process_pool:
+                logger.warning(
+                    f"Conversion of {pdf_path} timed out, restarting the PDF workers"
+                )
+                self._kill_process_pool()
+            raise
+        except BrokenProcessPool:
+            if executor is self._process_pool:
+                # A worker crashed, the broken pool is replaced on next use
+                self._process_pool = None
+                raise
+            # The pool was terminated because of another document
+            return await self.convert_pdf(pdf_path)
+
+    def shutdown(self) -> None:
+        """Stop the worker pools, cancelling queued conversions."""
+        for pool in (self._process_pool, self._thread_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._process_pool = None
+        self._worker_pids = None
+        self._thread_pool = None
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config.settings import Settings
+
+settings = Settings()
+
+
+class DocumentRegistry:
+    """
+    A persistent record of the ingested documents backed by SQLite.
+
+    For each document, the registry stores:
+    - The hash of its content, so unchanged documents are not processed again
+    - The ingestion settings (chunking, embedding model) it was processed with
+    - The ids of its points, so changed documents only embed their new chunks
+      and the points of the chunks that disappeared can be deleted
+    - Its metadata, matched in the questions to filter the search
+
+    The metadata extracted from each content is also cached by the hash of the
+    content, so re-ingesting a document with other settings, or under another
+    name, does not extract it again.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Initialize the DocumentRegistry.
+
+        Args:
+            path (str, optional): Path of the SQLite database
+        """
+        self.path = path or settings.INGESTION_REGISTRY_DB_PATH
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    filename TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    point_ids TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extracted_metadata (
+                    content_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    PRIMARY KEY (content_hash, model)
+                )
+                """
+            )
+        return self._db
+
+    @staticmethod
+    def _to_document(row: sqlite3.Row) -> Dict[str, Any]:
+        document = dict(row)
+        document["point_ids"] = json.loads(document["point_ids"])
+        document["metadata"] = json.loads(document["metadata"])
+        return document
+
+    def _get(self, filename: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = (
+                self._connect()
+                .execute("SELECT * FROM documents WHERE filename = ?", (filename,))
+                .fetchone()
+            )
+        return self._to_document(row) if row is not None else None
+
+    def _list_documents(self) -> List[Dict[str, Any]]:
+        with self._db_lock:
+            rows = self._connect().execute("SELECT * FROM documents").fetchall()
+        return [self._to_document(row) for row in rows]
+
+    def _put(
+        self,
+        filename: str,
+        content_hash: str,
+        config: str,
+        point_ids: List[str],
+        metadata: Dict[str, Any],
+    ) -> None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO documents (filename, content_hash, config, point_ids, metadata, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    filename,
+                    content_hash,
+                    config,
+                    json.dumps(point_ids),
+                    json.dumps(metadata),
+                    time.time(),
+                ),
+            )
+            db.commit()
+
+    def _get_extracted_metadata(
+        self, content_hash: str, model: str
+    ) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT metadata FROM extracted_metadata WHERE content_hash = ? AND model = ?",
+                    (content_hash, model),
+                )
+                .fetchone()
+            )
+        return json.loads(row["metadata"]) if row is not None else None
+
+    def _put_extracted_metadata(
+        self, content_hash: str, model: str, metadata: Dict[str, Any]
+    ) -> None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO extracted_metadata (content_hash, model, metadata) "
+                "VALUES (?, ?, ?)",
+                (content_hash, model, json.dumps(metadata)),
+            )
+            db.commit()
+
+    def _set_metadata(self, filename: str, metadata: Dict[str, Any]) -> None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "UPDATE documents SET metadata = ? WHERE filename = ?",
+                (json.dumps(metadata), filename),
+            )
+            db.commit()
+
+    async def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the record of an ingested document.
+
+        Args:
+            filename (str): Name of the document
+
+        Returns:
+            Dict[str, Any], optional: The record, or None if the document was never
+                ingested
+        """
+        return await asyncio.to_thread(self._get, filename)
+
+    async def list_documents(self) -> List[Dict[str, Any]]:
+        """
+        Get the records of all the ingested documents.
+
+        Returns:
+            List[Dict[str, Any]]: The records
+        """
+        return await asyncio.to_thread(self._list_documents)
+
+    async def put(
+        self,
+        filename: str,
+        content_hash: str,
+        config: str,
+        point_ids: List[str],
+        metadata: Dict[str, Any],
+    ) -> None:
+        """
+        Record a successfully ingested document, replacing its previous record.
+
+        Args:
+            filename (str): Name of the document
+            content_hash (str): Hash of the content of the document
+            config (str): Ingestion settings the document was processed with
+            point_ids (List[str]): Ids of the points of the document
+            metadata (Dict[str, Any]): Metadata of the document
+        """
+        await asyncio.to_thread(
+            self._put, filename, content_hash, config, point_ids, metadata
+        )
+
+    async def set_metadata(self, filename: str, metadata: Dict[str, Any]) -> None:
+        """
+        Record the metadata of an ingested document.
+
+        Args:
+            filename (str): Name of the document
+            metadata (Dict[str, Any]): Metadata of the document
+        """
+        await asyncio.to_thread(self._set_metadata, filename, metadata)
+
+    async def get_extracted_metadata(
+        self, content_hash: str, model: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the metadata extracted from a content.
+
+        Args:
+            content_hash (str): Hash of the content
+            model (str): Chat model the metadata was extracted with
+
+        Returns:
+            Dict[str, Any], optional: The metadata, or None if it was never
+                extracted
+        """
+        return await asyncio.to_thread(
+            self._get_extracted_metadata, content_hash, model
+        )
+
+    async def put_extracted_metadata(
+        self, content_hash: str, model: str, metadata: Dict[str, Any]
+    ) -> None:
+        """
+        Cache the metadata extracted from a content.
+
+        Args:
+            content_hash (str): Hash of the content
+            model (str): Chat model the metadata was extracted with
+            metadata (Dict[str, Any]): The extracted metadata
+        """
+        await asyncio.to_thread(
+            self._put_extracted_metadata, content_hash, model, metadata
+        )
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from config.settings import Settings
+from services.telemetry import CACHE_MEMORY, CACHE_REQUESTS
+
+settings = Settings()
+
+
+class EmbeddingCache:
+    """
+    A content-addressed cache for embedding vectors.
+
+    Vectors are keyed by the embedding model and a hash of the embedded text and
+    stored in two tiers:
+    - An in-process LRU tier bounded by the memory taken by the vectors
+    - An optional persistent SQLite tier shared across restarts, bounded by its
+      number of vectors, evicting the least recently used ones
+    """
+
+    def __init__(
+        self, max_bytes: int, path: Optional[str] = None, max_disk_entries: int = 0
+    ):
+        """
+        Initialize the EmbeddingCache.
+
+        Args:
+            max_bytes (int): Maximum size in bytes of the vectors kept in memory
+            path (str, optional): Path of the SQLite database used as the persistent tier
+            max_disk_entries (int, optional): Maximum number of vectors of the
+                persistent tier, 0 for no limit
+        """
+        self.max_bytes = max_bytes
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: OrderedDict[str, array] = OrderedDict()
+        self._memory_bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        """
+        Build the cache key of a text embedded with a given model.
+
+        Args:
+            model (str): Name of the embedding model
+            text (str): The embedded text
+
+        Returns:
+            str: The cache key
+        """
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size of the in-memory tier."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "memory_items": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)"
+            )
+        return self._db
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, array]:
+        found = {}
+        with self._db_lock:
+            db = self._connect()
+            # Stay below SQLite's limit of host parameters per statement
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector
+                if rows:
+                    db.execute(
+                        f"UPDATE embeddings SET used_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time(), *(key for key, _ in rows)],
+                    )
+            db.commit()
+        return found
+
+    def _write_disk(self, items: Dict[str, array]) -> None:
+        with self._db_lock:
+            db = self._connect()
+            used_at = time.time()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, used_at) VALUES (?, ?, ?)",
+                [(key, vector.tobytes(), used_at) for key, vector in items.items()],
+            )
+            if self.max_disk_entries:
+                db.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+            db.commit()
+
+    def _remember(self, key: str, vector: array) -> None:
+        """Store a vector in the in-memory tier, evicting least recently used entries."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+
+        self._memory[key] = vector
+        self._memory_bytes += vector.itemsize * len(vector)
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.itemsize * len(evicted)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Look up vectors in the cache.
+
+        Args:
+            keys (Iterable[str]): Cache keys to look up
+
+        Returns:
+            Dict[str, List[float]]: The vectors found, by key
+        """
+        found: Dict[str, List[float]] = {}
+        keys = list(dict.fromkeys(keys))
+        missing = []
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                found[key] = vector.tolist()
+            else:
+                missing.append(key)
+
+        if missing and self.path:
+            from_disk = await asyncio.to_thread(self._read_disk, missing)
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+                found[key] = vector.tolist()
+            self.disk_hits += len(from_disk)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        CACHE_REQUESTS.labels(cache="embedding", result="hit").inc(len(found))
+        CACHE_REQUESTS.labels(cache="embedding", result="miss").inc(
+            len(keys) - len(found)
+        )
+        CACHE_MEMORY.labels(cache="embedding").set(self._memory_bytes)
+        return found
+
+    async def set_many(self, items: Dict[str, List[float]]) -> None:
+        """
+        Store vectors in the cache.
+
+        Args:
+            items (Dict[str, List[float]]): Vectors to store, by key
+        """
+        if not items:
+            return
+
+        packed = {key: array("f", vector) for key, vector in items.items()}
+        for key, vector in packed.items():
+            self._remember(key, vector)
+        CACHE_MEMORY.labels(cache="embedding").set(self._memory_bytes)
+
+        if self.path:
+            await asyncio.to_thread(self._write_disk, packed)
+
+    def close(self) -> None:
+        """Close the persistent tier."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+embedding_cache = EmbeddingCache(
+    max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+    path=settings.EMBEDDING_CACHE_PATH,
+    max_disk_entries=settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+)
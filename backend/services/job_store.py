@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from config.settings import Settings
+
+settings = Settings()
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobStore:
+    """
+    A persistent store of ingestion jobs backed by SQLite.
+
+    Jobs survive restarts, so unfinished work can be resumed on startup.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Initialize the JobStore.
+
+        Args:
+            path (str, optional): Path of the SQLite database
+        """
+        self.path = path or settings.INGESTION_JOBS_DB_PATH
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    content_hash TEXT,
+                    status TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+        return self._db
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"])
+        return job
+
+    def _create(
+        self,
+        filename: str,
+        file_path: str,
+        job_id: str,
+        content_hash: Optional[str],
+    ) -> Dict[str, Any]:
+        now = time.time()
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT INTO jobs (id, filename, file_path, content_hash, status, progress, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    filename,
+                    file_path,
+                    content_hash,
+                    JobStatus.QUEUED,
+                    "{}",
+                    now,
+                    now,
+                ),
+            )
+            db.commit()
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = (
+                self._connect()
+                .execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+                .fetchone()
+            )
+        return self._to_dict(row) if row else None
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        if "progress" in fields:
+            fields["progress"] = json.dumps(fields["progress"])
+        fields["updated_at"] = time.time()
+
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            db.commit()
+
+    def _list_unfinished(self) -> List[Dict[str, Any]]:
+        with self._db_lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                    (JobStatus.QUEUED, JobStatus.RUNNING),
+                )
+                .fetchall()
+            )
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def new_id() -> str:
+        """Generate a new job id."""
+        return str(uuid4())
+
+    async def create(
+        self,
+        filename: str,
+        file_path: str,
+        job_id: str = None,
+        content_hash: str = None,
+    ) -> Dict[str, Any]:
+        """
+        Create a queued job.
+
+        Args:
+            filename (str): Name of the uploaded file
+            file_path (str): Path where the uploaded file is stored
+            job_id (str, optional): Id of the job, generated when not provided
+            content_hash (str, optional): SHA-256 hash of the uploaded file
+
+        Returns:
+            Dict[str, Any]: The created job
+        """
+        return await asyncio.to_thread(
+            self._create, filename, file_path, job_id or self.new_id(), content_hash
+        )
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job by id.
+
+        Args:
+            job_id (str): Id of the job
+
+        Returns:
+            Dict[str, Any], optional: The job, or None if it does not exist
+        """
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        """
+        Update fields of a job.
+
+        Args:
+            job_id (str): Id of the job
+            **fields: Columns to update (status, progress, error)
+        """
+        await asyncio.to_thread(self._update, job_id, **fields)
+
+    async def list_unfinished(self) -> List[Dict[str, Any]]:
+        """
+        List the jobs that are queued or were running, oldest first.
+
+        Returns:
+            List[Dict[str, Any]]: The unfinished jobs
+        """
+        return await asyncio.to_thread(self._list_unfinished)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,49 +1,447 @@
-from typing import List
+import asyncio
+import json
+import random
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 
-from openai import AsyncAzureOpenAI, AsyncOpenAI
+import httpx
+from openai import (
+    AsyncAzureOpenAI,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    RateLimitError,
+)
 
 from config.settings import Settings
+from services.embedding_cache import EmbeddingCache, embedding_cache
+from services.logs import logger
+from services.rate_governor import Permit, get_rate_governor
+from services.single_flight import SingleFlight
+from services.telemetry import (
+    LLM_REQUEST_DURATION,
+    LLM_TOKENS,
+    RETRIES,
+    record_tokens,
+    track,
+)
 
 settings = Settings()
 
 
+def _estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in a text (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _total_tokens(usage: Any) -> Optional[int]:
+    """Return the total tokens of a usage report, if any."""
+    return getattr(usage, "total_tokens", None)
+
+
 class OpenAI(AsyncAzureOpenAI, AsyncOpenAI):
     """
     A wrapper class for interacting with OpenAI's API services.
 
     This class provides unified access to:
-    - Text embedding generation
-    - Chat completions
+    - Text embedding generation (single and batched), backed by the embedding cache
+    - Chat completions, recording their latency and token usage
     - Automatic handling of Azure OpenAI and standard OpenAI endpoints
+
+    Identical concurrent embedding and chat requests are coalesced into a single
+    upstream request when ``SINGLE_FLIGHT_ENABLED`` is set. Every request goes
+    through the rate governor of its model, shared by the whole process, which
+    serves interactive requests before background ones.
     """
 
     def __init__(self):
-        """Initialize the OpenAI client based on configuration settings."""
+        """
+        Initialize the OpenAI client based on configuration settings.
+
+        The client keeps a pool of keep-alive connections, so a single instance
+        should be shared by the whole application and closed on shutdown.
+        """
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=settings.HTTP_TIMEOUT,
+        )
+
         if settings.OPENAI_TYPE == "azure":
             self.client = AsyncAzureOpenAI(
                 azure_endpoint=settings.OPENAI_ENDPOINT,
                 api_key=settings.OPENAI_API_KEY,
                 api_version=settings.OPENAI_API_VERSION,
+                http_client=http_client,
             )
         else:
             self.client = AsyncOpenAI(
                 base_url=settings.OPENAI_ENDPOINT,
                 api_key=settings.OPENAI_API_KEY,
+                http_client=http_client,
             )
 
+        self._embedding_semaphore = asyncio.Semaphore(
+            settings.EMBEDDING_MAX_CONCURRENCY
+        )
+        self.embedding_cache = (
+            embedding_cache if settings.EMBEDDING_CACHE_ENABLED else None
+        )
+        self._embedding_flights = SingleFlight("embedding")
+        self._chat_flights = SingleFlight("chat")
+
+    async def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
+
+    @staticmethod
+    def _retry_after(error: RateLimitError) -> Optional[float]:
+        """Return the delay requested by a rate limited response, if any."""
+        try:
+            return float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    @asynccontextmanager
+    async def _governed(model: str, tokens: int) -> AsyncIterator[Permit]:
+        """
+        Wait for the rate governor of a model to allow a request, and pause it
+        when the request is rate limited.
+
+        Args:
+            model (str): Model of the request
+            tokens (int): Estimated tokens of the request
+
+        Yields:
+            Permit: The permit of the request
+        """
+        governor = get_rate_governor(model)
+        async with governor.acquire(tokens) as permit:
+            try:
+                yield permit
+            except RateLimitError as e:
+                governor.update(e.response.headers)
+                governor.pause(OpenAI._retry_after(e))
+                raise
+
+    @staticmethod
+    def _estimate_chat_tokens(kwargs: Dict[str, Any]) -> int:
+        """Estimate the prompt and completion tokens of a chat request."""
+        prompt_tokens = sum(
+            _estimate_tokens(message["content"])
+            for message in kwargs.get("messages", [])
+            if isinstance(message.get("content"), str)
+        )
+        return prompt_tokens + (
+            kwargs.get("max_tokens") or settings.LLM_CHAT_COMPLETION_TOKENS
+        )
+
     async def get_embedding(self, text: str) -> List[float]:
         """
         Generate an embedding vector for the given text.
 
+        Identical concurrent requests share the same embedding request.
+
         Args:
             text (str): The text to generate an embedding for
 
         Returns:
             list[float]: The embedding vector
         """
-        embedding = await self.client.embeddings.create(
-            input=text,
-            model=settings.OPENAI_EMBEDDING_MODEL,
+        key = EmbeddingCache.key(settings.OPENAI_EMBEDDING_MODEL, text)
+        if settings.SINGLE_FLIGHT_ENABLED:
+            return await self._embedding_flights.do(
+                key, lambda: self._get_embedding(text, key)
+            )
+        return await self._get_embedding(text, key)
+
+    async def _get_embedding(self, text: str, key: str) -> List[float]:
+        """
+        Generate an embedding vector for the given text, using the cache and
+        retrying with backoff when rate limited.
+
+        Args:
+            text (str): The text to generate an embedding for
+            key (str): The cache key of the text
+
+        Returns:
+            list[float]: The embedding vector
+        """
+        if self.embedding_cache:
+            cached = await self.embedding_cache.get_many([key])
+            if key in cached:
+                return cached[key]
+
+        # Single embeddings are requested by questions, they do not wait for the
+        # batches of the ingestion
+        vector = (await self._embed_batch([text], bounded=False))[0]
+
+        if self.embedding_cache:
+            await self.embedding_cache.set_many({key: vector})
+
+        return vector
+
+    async def chat_completion(self, **kwargs: Any) -> Any:
+        """
+        Create a chat completion, recording its latency and token usage.
+
+        Identical concurrent requests share the same completion. Streamed
+        completions are never shared.
+
+        Args:
+            **kwargs: Arguments of ``client.chat.completions.create``
+
+        Returns:
+            Any: The chat completion, or an async iterator of completion chunks when
+                ``stream=True``
+        """
+        if kwargs.get("stream"):
+            return self._stream_chat_completion(**kwargs)
+        if settings.SINGLE_FLIGHT_ENABLED:
+            key = json.dumps(kwargs, sort_keys=True, default=str)
+            return await self._chat_flights.do(
+                key, lambda: self._chat_completion(**kwargs)
+            )
+        return await self._chat_completion(**kwargs)
+
+    async def _chat_completion(self, **kwargs: Any) -> Any:
+        """
+        Create a chat completion, recording its latency and token usage.
+
+        Args:
+            **kwargs: Arguments of ``client.chat.completions.create``
+
+        Returns:
+            Any: The chat completion
+        """
+        model = kwargs["model"]
+        async with self._governed(model, self._estimate_chat_tokens(kwargs)) as permit:
+            with track(LLM_REQUEST_DURATION, operation="chat"):
+                raw = await self.client.chat.completions.with_raw_response.create(
+                    **kwargs
+                )
+            response = raw.parse()
+            get_rate_governor(model).update(raw.headers)
+            permit.record_usage(_total_tokens(response.usage))
+        record_tokens("chat", response.usage)
+
+        return response
+
+    async def _stream_chat_completion(self, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Stream a chat completion, recording its latency and token usage.
+
+        Streamed responses only report their usage when the API is asked to, so the
+        completion tokens are counted as the number of streamed content pieces,
+        which the API sends one token at a time. The rate governor only holds a
+        concurrency slot until the stream starts, and the connection is closed
+        when the iterator is closed early.
+        """
+        model = kwargs["model"]
+        with track(LLM_REQUEST_DURATION, operation="chat_stream"):
+            # The concurrency slot is released once the stream is admitted, so a
+            # slow or disconnected reader does not hold it
+            async with self._governed(
+                model, self._estimate_chat_tokens(kwargs)
+            ) as permit:
+                raw = await self.client.chat.completions.with_raw_response.create(
+                    **kwargs
+                )
+            get_rate_governor(model).update(raw.headers)
+            response = raw.parse()
+            usage = None
+            content_chunks = 0
+            try:
+                async for chunk in response:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        content_chunks += 1
+                    yield chunk
+            finally:
+                await response.close()
+        permit.record_usage(_total_tokens(usage))
+
+        if usage is not None:
+            record_tokens("chat", usage)
+        else:
+            LLM_TOKENS.labels(operation="chat", type="completion").inc(content_chunks)
+
+    @staticmethod
+    def _make_batches(texts: List[str]) -> List[List[int]]:
+        """
+        Group text indexes into batches bounded by item count and estimated tokens.
+
+        Args:
+            texts (List[str]): The texts to be grouped
+
+        Returns:
+            List[List[int]]: Batches of indexes into ``texts``
+        """
+        batches = []
+        current_batch = []
+        current_tokens = 0
+
+        for i, text in enumerate(texts):
+            tokens = _estimate_tokens(text)
+            if current_batch and (
+                len(current_batch) >= settings.EMBEDDING_BATCH_SIZE
+                or current_tokens + tokens > settings.EMBEDDING_BATCH_MAX_TOKENS
+            ):
+                batches.append(current_batch)
+                current_batch = []
+                current_tokens = 0
+
+            current_batch.append(i)
+            current_tokens += tokens
+
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
+
+    async def _embed_batch(
+        self, texts: List[str], bounded: bool = True
+    ) -> List[List[float]]:
+        """
+        Embed a single batch of texts, retrying with backoff when rate limited.
+
+        Args:
+            texts (List[str]): The texts of the batch
+            bounded (bool): Whether the batch counts towards
+                ``EMBEDDING_MAX_CONCURRENCY``
+
+        Returns:
+            List[List[float]]: The embedding vectors, in the same order as ``texts``
+        """
+        model = settings.OPENAI_EMBEDDING_MODEL
+        tokens = sum(_estimate_tokens(text) for text in texts)
+        create_embeddings = self.client.embeddings.with_raw_response.create
+        attempt = 0
+        while True:
+            try:
+                async with self._embedding_semaphore if bounded else nullcontext():
+                    async with self._governed(model, tokens) as permit:
+                        with track(LLM_REQUEST_DURATION, operation="embedding"):
+                            raw = await create_embeddings(input=texts, model=model)
+                        response = raw.parse()
+                        get_rate_governor(model).update(raw.headers)
+                        permit.record_usage(_total_tokens(response.usage))
+                break
+            except RateLimitError as e:
+                attempt += 1
+                if attempt > settings.EMBEDDING_MAX_RETRIES:
+                    raise
+
+                RETRIES.labels(operation="embedding").inc()
+                # The rate governor holds the requests for the delay requested by
+                # the API, if any
+                retry_after = self._retry_after(e)
+                delay = random.uniform(0, settings.EMBEDDING_RETRY_BASE_DELAY)
+                if retry_after is None:
+                    delay += settings.EMBEDDING_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                paused = (
+                    f", after the {retry_after:.1f}s pause requested by the API"
+                    if retry_after is not None
+                    else ""
+                )
+
+                logger.warning(
+                    f"Embedding rate limited, retrying in {delay:.1f}s{paused} "
+                    f"(attempt {attempt}/{settings.EMBEDDING_MAX_RETRIES})"
+                )
+                await asyncio.sleep(delay)
+
+        record_tokens("embedding", response.usage)
+        data = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data]
+
+    async def _embed_texts(
+        self,
+        texts: List[str],
+        on_batch: Callable[[int], Awaitable[None]] = None,
+    ) -> List[List[float]]:
+        """
+        Embed texts in token-budgeted batches with bounded concurrency.
+
+        Args:
+            texts (List[str]): The texts to generate embeddings for
+            on_batch (Callable[[int], Awaitable[None]], optional): Called with the
+                number of texts of each batch once it is embedded
+
+        Returns:
+            List[List[float]]: The embedding vectors, in the same order as ``texts``
+        """
+
+        async def embed_batch(batch: List[int]) -> List[List[float]]:
+            batch_embeddings = await self._embed_batch([texts[i] for i in batch])
+            if on_batch:
+                await on_batch(len(batch))
+            return batch_embeddings
+
+        batches = self._make_batches(texts)
+        results = await asyncio.gather(*[embed_batch(batch) for batch in batches])
+
+        embeddings: List[List[float]] = [None] * len(texts)
+        for batch, batch_embeddings in zip(batches, results):
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+
+        return embeddings
+
+    async def get_embeddings(
+        self,
+        texts: List[str],
+        on_progress: Callable[[int, int], Awaitable[None]] = None,
+    ) -> List[List[float]]:
+        """
+        Generate embedding vectors for many texts using batched requests.
+
+        Cached and duplicated texts are embedded only once. The remaining texts are
+        packed into batches bounded by ``EMBEDDING_BATCH_SIZE`` and
+        ``EMBEDDING_BATCH_MAX_TOKENS``, and at most ``EMBEDDING_MAX_CONCURRENCY``
+        batches are in flight at the same time.
+
+        Args:
+            texts (List[str]): The texts to generate embeddings for
+            on_progress (Callable[[int, int], Awaitable[None]], optional): Called with
+                the number of embedded texts and the total number of texts each time
+                a batch is done
+
+        Returns:
+            List[List[float]]: The embedding vectors, in the same order as ``texts``
+        """
+        keys = [EmbeddingCache.key(settings.OPENAI_EMBEDDING_MODEL, t) for t in texts]
+        vectors = (
+            await self.embedding_cache.get_many(keys) if self.embedding_cache else {}
         )
 
-        return embedding.data[0].embedding
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        done = len(texts) - len(missing)
+
+        async def on_batch(count: int) -> None:
+            nonlocal done
+            done += count
+            await on_progress(done, len(texts))
+
+        if missing:
+            embedded = dict(
+                zip(
+                    missing.keys(),
+                    await self._embed_texts(
+                        list(missing.values()), on_batch if on_progress else None
+                    ),
+                )
+            )
+            if self.embedding_cache:
+                await self.embedding_cache.set_many(embedded)
+            vectors.update(embedded)
+
+        return [vectors[key] for key in keys]
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import Settings
+from services.llm import OpenAI
+from services.logs import logger
+from services.tokenizer import get_token_counter
+
+settings = Settings()
+
+_HEADING_PATTERN = re.compile(r"^#{1,6}[ \t]+\S.*$", re.MULTILINE)
+
+# Maximum number of keywords kept when merging the metadata of several parts
+_MAX_KEYWORDS = 30
+
+_SYSTEM_PROMPT = """
+                    You are a helpful assistant that extracts relevant information from documents.
+
+                    Your task is to analyze the provided document and extract key information.
+
+                    Extract the following information:
+                    - Product Name
+                    - Keywords
+
+                    The output should be in JSON format with the following structure:
+                    {
+                        "product_name": "<Product Name>",
+                        "keywords": ["<Keyword1>", "<Keyword2>", ...]
+                    }
+                    Please provide the output in JSON format.
+                    Do not include any other text or explanation.
+                    """
+
+
+class MetadataExtractor:
+    """
+    An extractor of the metadata of a document with the LLM, within a token
+    budget whatever the size of the document.
+
+    A document that fits the budget of a prompt is sent whole. Larger documents
+    are split into parts that each fit it, and at most ``max_parts`` of them are
+    sent, in parallel:
+    - The first part, holding the title pages
+    - An outline of the headings of the document, if any
+    - Parts spread evenly over the rest of the document
+    The metadata of the parts is then merged: the most frequent product name and
+    keywords are kept.
+    """
+
+    def __init__(
+        self,
+        llm: OpenAI = None,
+        max_tokens: int = None,
+        max_parts: int = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Initialize the MetadataExtractor.
+
+        Args:
+            llm (OpenAI, optional): Shared LLM service
+            max_tokens (int, optional): Maximum number of tokens of the document
+                sent in a prompt
+            max_parts (int, optional): Maximum number of prompts for a document
+            count_tokens (Callable[[str], int], optional): Function counting the
+                tokens of a text
+        """
+        self.llm = llm or OpenAI()
+        self.max_tokens = max_tokens or settings.METADATA_MAX_TOKENS
+        self.max_parts = max_parts or settings.METADATA_MAX_PARTS
+        self.count_tokens = count_tokens or get_token_counter(
+            settings.OPENAI_CHAT_MODEL
+        )
+
+    def _truncate(self, text: str) -> str:
+        """Cut a text to the token budget, at a line or word boundary if any."""
+        tokens = self.count_tokens(text)
+        while tokens > self.max_tokens:
+            end = int(len(text) * self.max_tokens / tokens * 0.95)
+            boundary = max(text.rfind("\n", 0, end), text.rfind(" ", 0, end))
+            text = text[: boundary if boundary > end // 2 else end]
+            tokens = self.count_tokens(text)
+        return text
+
+    def _parts(self, text: str, tokens: int) -> List[str]:
+        """
+        Select the parts of a document larger than the token budget.
+
+        Args:
+            text (str): The document
+            tokens (int): Number of tokens of the document
+
+        Returns:
+            List[str]: The parts, each within the token budget
+        """
+        # Parts are cut by characters, from the average size of the tokens of the
+        # document, and truncated to the budget afterwards
+        part_size = max(1, int(len(text) * self.max_tokens / tokens))
+        starts = list(range(0, len(text), part_size))
+
+        outline = "\n".join(_HEADING_PATTERN.findall(text))
+        if self.max_parts < 2:
+            outline = ""
+        spread_count = self.max_parts - 1 - (1 if outline else 0)
+        if len(starts) - 1 > spread_count:
+            step = (len(starts) - 1) / max(spread_count, 1)
+            starts = [starts[0]] + [
+                starts[1 + math.floor(i * step)] for i in range(spread_count)
+            ]
+
+        parts = []
+        for start in starts:
+            # Start after a line break, so the part does not begin mid-sentence
+            if start:
+                line_break = text.find("\n", start, start + part_size // 4)
+                start = line_break + 1 if line_break != -1 else start
+            parts.append(self._truncate(text[start : start + part_size]))
+        if outline:
+            parts.insert(1, self._truncate(outline))
+        return [part for part in parts if part.strip()]
+
+    async def _extract_part(self, text: str) -> Dict[str, Any]:
+        """
+        Extract the metadata of a document, or of a part of it, in one prompt.
+
+        Args:
+            text (str): The text sent to the LLM
+
+        Returns:
+            Dict[str, Any]: The extracted metadata, empty if the response is invalid
+        """
+        response = await self.llm.chat_completion(
+            messages=[
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": text},
+            ],
+            model=settings.OPENAI_CHAT_MODEL,
+            temperature=0,
+            response_format={"type": "json_object"},
+        )
+
+        response_str = response.choices[0].message.content.lower()
+        try:
+            metadata = json.loads(response_str)
+        except json.JSONDecodeError:
+            logger.warning(f"Invalid metadata returned by the LLM: {response_str}")
+            return {}
+        return metadata if isinstance(metadata, dict) else {}
+
+    @staticmethod
+    def _merge(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge the metadata extracted from the parts of a document.
+
+        Args:
+            results (List[Dict[str, Any]]): Metadata of each part, in document order
+
+        Returns:
+            Dict[str, Any]: The most frequent product name, the first part winning
+                ties, and the most frequent keywords
+        """
+        product_names = Counter(
+            result["product_name"].strip()
+            for result in results
+            if isinstance(result.get("product_name"), str)
+            and result["product_name"].strip()
+        )
+        # Each part counts a keyword once
+        keywords = Counter(
+            keyword
+            for result in results
+            if isinstance(result.get("keywords"), list)
+            for keyword in dict.fromkeys(
+                keyword.strip()
+                for keyword in result["keywords"]
+                if isinstance(keyword, str) and keyword.strip()
+            )
+        )
+
+        metadata: Dict[str, Any] = {}
+        if product_names:
+            metadata["product_name"] = product_names.most_common(1)[0][0]
+        metadata["keywords"] = [
+            keyword for keyword, _ in keywords.most_common(_MAX_KEYWORDS)
+        ]
+        return metadata
+
+    async def extract(self, text: str) -> Dict[str, Any]:
+        """
+        Extract the product name and keywords of a document.
+
+        Args:
+            text (str): Text content of the document
+
+        Returns:
+            Dict[str, Any]: Extracted metadata in JSON format
+        """
+        tokens = self.count_tokens(text)
+        if tokens <= self.max_tokens:
+            return await self._extract_part(text)
+
+        parts = self._parts(text, tokens)
+        logger.info(
+            f"Extracting metadata from {len(parts)} parts of a document of "
+            f"{tokens} tokens"
+        )
+        results = await asyncio.gather(*[self._extract_part(part) for part in parts])
+        return self._merge(results)
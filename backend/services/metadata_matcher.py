@@ -0,0 +1,231 @@
+import difflib
+import math
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config.settings import Settings
+
+settings = Settings()
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Metadata fields matched in the questions, as stored in the point payloads
+_FIELDS = ("product_name", "keywords")
+
+# Words shorter than this are only matched exactly, as fuzzy matches of short
+# words are mostly noise
+_MIN_FUZZY_LENGTH = 4
+
+
+def _normalize(text: str) -> str:
+    """Lowercase a text and keep its words, separated by single spaces."""
+    return " ".join(_WORD_PATTERN.findall(text.lower()))
+
+
+class _Automaton:
+    """An Aho-Corasick automaton finding all the patterns of a text in one pass."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(len(self.patterns))
+            self.patterns.append(pattern)
+
+        # Breadth-first, so the failure state of a state is always built first
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int]]:
+        """
+        Find the patterns in a text.
+
+        Args:
+            text (str): The text
+
+        Yields:
+            Tuple[int, int]: The index of a pattern and the end of its occurrence
+        """
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                yield pattern, end
+
+
+class MetadataMatcher:
+    """
+    An in-memory matcher of the product names and keywords of the ingested
+    documents in the questions, producing the search filters without calling the
+    LLM.
+
+    Known values are found exactly, on word boundaries, with an Aho-Corasick
+    automaton over the normalized question. The words of the question that are
+    not part of an exact match are then compared with the known values of the
+    same number of words, so misspelled values are still matched.
+
+    The matcher is fed with the metadata of each document once it is ingested,
+    and the automaton is rebuilt on the next match.
+    """
+
+    def __init__(self, fuzzy_cutoff: float = None):
+        """
+        Initialize the MetadataMatcher.
+
+        Args:
+            fuzzy_cutoff (float, optional): Minimum similarity ratio, from 0 to 1,
+                between words of a question and a known value for a fuzzy match
+        """
+        self.fuzzy_cutoff = (
+            settings.FILTER_FUZZY_CUTOFF if fuzzy_cutoff is None else fuzzy_cutoff
+        )
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._automaton: Optional[_Automaton] = None
+        self._values: Dict[str, List[Tuple[str, str]]] = {}
+        # Known values by number of words, then number of characters
+        self._values_by_length: Dict[int, Dict[int, List[str]]] = {}
+
+    @property
+    def document_count(self) -> int:
+        """Number of documents whose metadata is matched."""
+        return len(self._documents)
+
+    def update(self, filename: str, metadata: Dict[str, Any]) -> None:
+        """
+        Set the metadata of a document, replacing its previous metadata.
+
+        Args:
+            filename (str): Name of the document
+            metadata (Dict[str, Any]): Metadata of the document
+        """
+        self._documents[filename] = metadata
+        self._automaton = None
+
+    def remove(self, filename: str) -> None:
+        """
+        Forget the metadata of a document.
+
+        Args:
+            filename (str): Name of the document
+        """
+        if self._documents.pop(filename, None) is not None:
+            self._automaton = None
+
+    def _build(self) -> _Automaton:
+        values: Dict[str, List[Tuple[str, str]]] = {}
+        for metadata in self._documents.values():
+            for field in _FIELDS:
+                field_values = metadata.get(field)
+                if isinstance(field_values, str):
+                    field_values = [field_values]
+                if not isinstance(field_values, list):
+                    continue
+                for value in field_values:
+                    if not isinstance(value, str):
+                        continue
+                    normalized = _normalize(value)
+                    if normalized and (field, value) not in values.get(normalized, []):
+                        values.setdefault(normalized, []).append((field, value))
+
+        self._values = values
+        self._values_by_length = {}
+        for normalized in values:
+            self._values_by_length.setdefault(
+                normalized.count(" ") + 1, {}
+            ).setdefault(len(normalized), []).append(normalized)
+        # The spaces around the patterns and the text restrict the matches to
+        # whole words
+        return _Automaton(f" {normalized} " for normalized in values)
+
+    def _fuzzy_matches(self, words: List[str], matched: Set[int]) -> List[str]:
+        # The similarity ratio of two strings is at most 2 * min(a, b) / (a + b),
+        # so only the values of a close enough length are compared
+        cutoff = self.fuzzy_cutoff
+        found = []
+        for length, values_by_size in self._values_by_length.items():
+            for start in range(len(words) - length + 1):
+                if matched.intersection(range(start, start + length)):
+                    continue
+                phrase = " ".join(words[start : start + length])
+                if len(phrase) < _MIN_FUZZY_LENGTH:
+                    continue
+                candidates = [
+                    value
+                    for size in range(
+                        math.ceil(len(phrase) * cutoff / (2 - cutoff)),
+                        math.floor(len(phrase) * (2 - cutoff) / cutoff) + 1,
+                    )
+                    for value in values_by_size.get(size, ())
+                ]
+                found.extend(
+                    difflib.get_close_matches(phrase, candidates, n=1, cutoff=cutoff)
+                )
+        return found
+
+    def match(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Find the known product names and keywords in a text.
+
+        Args:
+            text (str): The text, usually a question
+
+        Returns:
+            List[Tuple[str, str]]: The (field, value) pairs found, in the order of
+                the text for the exact matches
+        """
+        if self._automaton is None:
+            self._automaton = self._build()
+
+        normalized = _normalize(text)
+        if not normalized or not self._values:
+            return []
+        padded = f" {normalized} "
+
+        # Word index of each character, to know which words were matched exactly
+        word_at = []
+        word = -1
+        for char in padded:
+            if char == " ":
+                word += 1
+            word_at.append(word)
+
+        found: List[str] = []
+        matched: Set[int] = set()
+        for index, end in self._automaton.iter_matches(padded):
+            pattern = self._automaton.patterns[index]
+            found.append(pattern[1:-1])
+            matched.update(range(word_at[end - len(pattern) + 1], word_at[end - 1]))
+
+        if self.fuzzy_cutoff < 1:
+            found.extend(self._fuzzy_matches(normalized.split(" "), matched))
+
+        items: List[Tuple[str, str]] = []
+        for value in found:
+            for item in self._values[value]:
+                if item not in items:
+                    items.append(item)
+        return items
@@ -0,0 +1,305 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, List, Mapping, Optional, Tuple
+
+from config.settings import Settings
+from services.telemetry import RATE_LIMIT_WAIT
+
+settings = Settings()
+
+
+class Priority(IntEnum):
+    """Priority classes of the LLM requests, the lowest value served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+_priority: ContextVar[Priority] = ContextVar(
+    "llm_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """
+    Set the priority of the LLM requests made in a block, including by the tasks
+    it creates.
+
+    Args:
+        priority (Priority): The priority of the requests
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Bucket:
+    """A token bucket refilled continuously up to a per minute limit."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = 0.0
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.set_limit(per_minute)
+
+    @property
+    def limited(self) -> bool:
+        return self.capacity > 0
+
+    def set_limit(self, per_minute: int) -> None:
+        # A new limit starts with a full bucket, the remaining budget reported by
+        # the API then lowers it
+        if per_minute != self.capacity:
+            self.capacity = float(per_minute)
+            self.level = self.capacity
+
+    def refill(self, now: float) -> None:
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.capacity / 60
+        )
+        self.updated = now
+
+    def delay(self, cost: float, reserve: float) -> float:
+        """Seconds until the bucket holds the cost on top of the reserve."""
+        if not self.limited:
+            return 0.0
+        # Costs larger than the bucket would never fit
+        needed = min(cost + reserve * self.capacity, self.capacity)
+        return max(0.0, (needed - self.level) * 60 / self.capacity)
+
+
+class Permit:
+    """The right to send one request, granted by a RateGovernor."""
+
+    def __init__(self, governor: "RateGovernor", tokens: int):
+        self._governor = governor
+        self.tokens = tokens
+
+    def record_usage(self, tokens: Optional[int]) -> None:
+        """
+        Replace the estimated tokens of the request by the actual ones.
+
+        Args:
+            tokens (int, optional): Tokens reported by the API, if any
+        """
+        if tokens is None:
+            return
+        self._governor._tokens.level += self.tokens - tokens
+        self.tokens = tokens
+
+
+class RateGovernor:
+    """
+    A shared budget of requests per minute, tokens per minute and concurrent
+    requests for a model.
+
+    Requests wait until both token buckets hold their cost and a concurrency slot
+    is free, and are served by priority, then in order of arrival. Background
+    requests cannot use the share ``background_reserve`` of the budgets, which is
+    kept for interactive requests, so background bursts never delay them.
+
+    The budgets follow the API: the limits reported by the rate limit headers
+    are used when none are configured, the remaining budget they report lowers
+    the buckets, and a rate limited response pauses every request.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        max_concurrency: int = None,
+        background_reserve: float = None,
+    ):
+        """
+        Initialize the RateGovernor.
+
+        Args:
+            requests_per_minute (int, optional): Requests per minute, 0 to learn it
+                from the API
+            tokens_per_minute (int, optional): Tokens per minute, 0 to learn it from
+                the API
+            max_concurrency (int, optional): Maximum number of requests in flight,
+                0 for no limit
+            background_reserve (float, optional): Share of the budgets, from 0 to 1,
+                only usable by interactive requests
+        """
+        self.requests_per_minute = (
+            settings.LLM_REQUESTS_PER_MINUTE
+            if requests_per_minute is None
+            else requests_per_minute
+        )
+        self.tokens_per_minute = (
+            settings.LLM_TOKENS_PER_MINUTE
+            if tokens_per_minute is None
+            else tokens_per_minute
+        )
+        self.max_concurrency = (
+            settings.LLM_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        )
+        self.background_reserve = (
+            settings.LLM_BACKGROUND_RESERVE
+            if background_reserve is None
+            else background_reserve
+        )
+
+        self._requests = _Bucket(self.requests_per_minute)
+        self._tokens = _Bucket(self.tokens_per_minute)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _max_in_flight(self, priority: Priority) -> float:
+        if not self.max_concurrency:
+            return math.inf
+        if priority == Priority.INTERACTIVE:
+            return self.max_concurrency
+        background_share = 1 - self.background_reserve
+        return max(1, math.floor(self.max_concurrency * background_share))
+
+    def _delay(self, priority: Priority, tokens: int, now: float) -> float:
+        """Seconds until a request fits the budgets, infinite for a free slot."""
+        if self._in_flight >= self._max_in_flight(priority):
+            return math.inf
+        reserve = self.background_reserve if priority == Priority.BACKGROUND else 0
+        return max(
+            self._paused_until - now,
+            self._requests.delay(1, reserve),
+            self._tokens.delay(tokens, reserve),
+        )
+
+    def _dispatch(self) -> None:
+        """Grant the waiting requests that fit the budgets, by priority."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        while self._waiters:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._delay(Priority(priority), tokens, now)
+            if delay == math.inf:
+                # Woken up when a request completes
+                return
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(
+                    delay, self._dispatch
+                )
+                return
+            heapq.heappop(self._waiters)
+            self._grant(tokens)
+            future.set_result(None)
+
+    def _grant(self, tokens: int) -> None:
+        self._requests.level -= 1
+        self._tokens.level -= tokens
+        self._in_flight += 1
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        if self._waiters:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int) -> AsyncIterator[Permit]:
+        """
+        Wait until a request fits the budgets, at the priority of the current
+        context, and hold a concurrency slot while it runs.
+
+        Args:
+            tokens (int): Estimated tokens of the request
+
+        Yields:
+            Permit: The permit of the request, recording its actual tokens
+        """
+        priority = _priority.get()
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters, (priority, next(self._sequence), tokens, future)
+        )
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        RATE_LIMIT_WAIT.labels(priority=priority.name).observe(
+            time.monotonic() - start
+        )
+
+        try:
+            yield Permit(self, tokens)
+        finally:
+            self._release()
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Adapt the budgets to the rate limit headers of a response.
+
+        Args:
+            headers (Mapping[str, str]): Headers of the response
+        """
+        for bucket, configured, kind in (
+            (self._requests, self.requests_per_minute, "requests"),
+            (self._tokens, self.tokens_per_minute, "tokens"),
+        ):
+            limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+            if not configured and limit:
+                bucket.refill(time.monotonic())
+                bucket.set_limit(int(limit))
+            remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+            if bucket.limited and remaining is not None:
+                bucket.level = min(bucket.level, remaining)
+
+    def pause(self, seconds: Optional[float]) -> None:
+        """
+        Hold every request after a rate limited response.
+
+        Args:
+            seconds (float, optional): Delay requested by the API, if any; otherwise
+                the budgets are emptied and refill at their rate
+        """
+        if seconds:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            return
+        self._requests.level = min(self._requests.level, 0)
+        self._tokens.level = min(self._tokens.level, 0)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_rate_governor(model: str) -> RateGovernor:
+    """
+    Get the rate governor of a model, shared by the whole process.
+
+    Args:
+        model (str): Name of the model, or of the Azure deployment
+
+    Returns:
+        RateGovernor: The rate governor of the model
+    """
+    return RateGovernor()
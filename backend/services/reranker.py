@@ -0,0 +1,124 @@
+from typing import Callable, List, Optional
+
+import numpy as np
+from qdrant_client import models as qdrant_models
+
+from config.settings import Settings
+from services.tokenizer import get_token_counter
+
+settings = Settings()
+
+
+class Reranker:
+    """
+    A CPU-friendly reranker of the chunks retrieved for a question.
+
+    Candidates are reordered with Maximal Marginal Relevance over their
+    embeddings, balancing their similarity to the question with their diversity,
+    so near-duplicate chunks do not fill the context. The selection then stops
+    at:
+    - A minimum similarity to the question
+    - A maximum number of chunks
+    - A budget of context tokens
+    so the number of chunks sent to the LLM adapts to their size and relevance.
+    """
+
+    def __init__(
+        self,
+        mmr_lambda: float = None,
+        min_score: float = None,
+        max_results: int = None,
+        max_tokens: int = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Initialize the Reranker.
+
+        Args:
+            mmr_lambda (float, optional): Weight of the relevance against the
+                diversity, from 0 (only diversity) to 1 (only relevance)
+            min_score (float, optional): Minimum cosine similarity between a chunk
+                and the question
+            max_results (int, optional): Maximum number of chunks
+            max_tokens (int, optional): Maximum number of tokens of the chunks
+            count_tokens (Callable[[str], int], optional): Function counting the
+                tokens of a text
+        """
+        self.mmr_lambda = (
+            settings.RERANK_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        )
+        self.min_score = settings.RERANK_MIN_SCORE if min_score is None else min_score
+        self.max_results = max_results or settings.RERANK_MAX_RESULTS
+        self.max_tokens = max_tokens or settings.RERANK_MAX_CONTEXT_TOKENS
+        self.count_tokens = count_tokens or get_token_counter()
+
+    @staticmethod
+    def _dense_vector(point: qdrant_models.ScoredPoint) -> Optional[List[float]]:
+        """Return the dense vector of a point, which is unnamed."""
+        if isinstance(point.vector, dict):
+            return point.vector.get("")
+        return point.vector
+
+    @staticmethod
+    def _without_vector(point: qdrant_models.ScoredPoint) -> qdrant_models.ScoredPoint:
+        """Drop the vector of a point, which is only needed to rerank it."""
+        return point.model_copy(update={"vector": None})
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def rerank(
+        self,
+        query_embedding: List[float],
+        candidates: List[qdrant_models.ScoredPoint],
+    ) -> List[qdrant_models.ScoredPoint]:
+        """
+        Select the chunks to send to the LLM among the retrieved candidates.
+
+        Args:
+            query_embedding (List[float]): The embedding of the question
+            candidates (List[qdrant_models.ScoredPoint]): The retrieved chunks, with
+                their vectors
+
+        Returns:
+            List[qdrant_models.ScoredPoint]: The selected chunks, best first, without
+                their vectors which are no longer needed
+        """
+        vectors = [self._dense_vector(candidate) for candidate in candidates]
+        if not candidates or any(vector is None for vector in vectors):
+            return [self._without_vector(c) for c in candidates[: self.max_results]]
+
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+        query = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+        relevance = matrix @ query
+        similarity = matrix @ matrix.T
+
+        # The most relevant chunk is kept whatever the cutoff
+        available = relevance >= self.min_score
+        available[int(np.argmax(relevance))] = True
+        max_similarity = np.full(len(candidates), -np.inf, dtype=np.float32)
+
+        selected: List[int] = []
+        tokens = 0
+        while len(selected) < self.max_results and available.any():
+            if selected:
+                scores = (
+                    self.mmr_lambda * relevance
+                    - (1 - self.mmr_lambda) * max_similarity
+                )
+            else:
+                scores = relevance.copy()
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            available[best] = False
+
+            chunk_tokens = self.count_tokens(candidates[best].payload["text"])
+            if selected and tokens + chunk_tokens > self.max_tokens:
+                continue
+            selected.append(best)
+            tokens += chunk_tokens
+            max_similarity = np.maximum(max_similarity, similarity[best])
+
+        return [self._without_vector(candidates[i]) for i in selected]
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from services.telemetry import SINGLE_FLIGHT_REQUESTS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    A coalescer of identical concurrent calls.
+
+    The first call of a key starts the request, and the calls made with the same
+    key while it is in flight wait for its result instead of starting their own.
+    Once the request is done, the next call of the key starts a new one, so
+    results are shared but never cached.
+
+    The request runs in its own task: a caller that is cancelled stops waiting
+    without cancelling it for the others, and the request is only cancelled when
+    no caller waits for it anymore.
+    """
+
+    def __init__(self, operation: str):
+        """
+        Initialize the SingleFlight.
+
+        Args:
+            operation (str): Name of the coalesced operation, used in the metrics
+        """
+        self.operation = operation
+        # Task of each key in flight and the number of callers waiting for it
+        self._calls: Dict[Hashable, Tuple[asyncio.Task, int]] = {}
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is None or call[0] is not task:
+            return
+        if call[1] > 1:
+            self._calls[key] = (task, call[1] - 1)
+            return
+        del self._calls[key]
+        task.cancel()
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        # The exception is raised to the callers, if any are still waiting
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a call, or wait for the result of an identical call in flight.
+
+        Args:
+            key (Hashable): Key identifying identical calls
+            call (Callable[[], Awaitable[T]]): Function starting the call
+
+        Returns:
+            T: The result of the call
+        """
+        in_flight = self._calls.get(key)
+        if in_flight is None:
+            task = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._done(key, done))
+            self._calls[key] = (task, 1)
+            SINGLE_FLIGHT_REQUESTS.labels(
+                operation=self.operation, result="leader"
+            ).inc()
+        else:
+            task = in_flight[0]
+            self._calls[key] = (task, in_flight[1] + 1)
+            SINGLE_FLIGHT_REQUESTS.labels(
+                operation=self.operation, result="coalesced"
+            ).inc()
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self._release(key, task)
+            raise
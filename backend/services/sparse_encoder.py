@@ -0,0 +1,117 @@
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from qdrant_client import models as qdrant_models
+
+# Words, numbers and codes such as "P0204", "VF-nC1" or "1.3.1"
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/_][a-z0-9]+)*")
+_CODE_SEPARATOR_PATTERN = re.compile(r"[.\-/_]")
+
+_STOPWORDS = frozenset(
+    """
+    a about above after again all am an and any are as at be because been before
+    being below between both but by can could did do does doing down during each
+    few for from further had has have having he her here hers him his how i if in
+    into is it its itself just me more most my no nor not of off on once only or
+    other our ours out over own same she should so some such than that the their
+    theirs them then there these they this those through to too under until up
+    very was we were what when where which while who whom why will with would you
+    your yours
+    """.split()
+)
+
+
+class SparseEncoder:
+    """
+    A local encoder of texts into sparse lexical vectors for hybrid search.
+
+    Documents are encoded with the term frequency part of BM25, and queries with
+    one unit weight per term. The inverse document frequency is applied by Qdrant,
+    through the IDF modifier of the sparse vector, so it stays up to date as
+    documents are added. Terms are hashed into the vector indices, so no
+    vocabulary has to be stored.
+
+    Codes such as parameter or fault codes are kept whole, and also indexed by
+    their parts, so "VF-nC1" matches both "vf-nc1" and "nc1".
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, average_length: int = 200):
+        """
+        Initialize the SparseEncoder.
+
+        Args:
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 document length normalization
+            average_length (int): Expected average number of terms of a chunk
+        """
+        self.k1 = k1
+        self.b = b
+        self.average_length = average_length
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        Split a text into the terms indexed by the sparse vectors.
+
+        Args:
+            text (str): The text
+
+        Returns:
+            List[str]: The terms, with repetitions
+        """
+        terms = []
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            if token in _STOPWORDS:
+                continue
+            terms.append(token)
+            if _CODE_SEPARATOR_PATTERN.search(token):
+                terms.extend(
+                    part
+                    for part in _CODE_SEPARATOR_PATTERN.split(token)
+                    if part not in _STOPWORDS
+                )
+        return terms
+
+    @staticmethod
+    def _to_vector(weights: Dict[str, float]) -> qdrant_models.SparseVector:
+        indices: Dict[int, float] = {}
+        for term, weight in weights.items():
+            index = zlib.crc32(term.encode())
+            indices[index] = indices.get(index, 0.0) + weight
+        return qdrant_models.SparseVector(
+            indices=list(indices), values=list(indices.values())
+        )
+
+    def encode_document(self, text: str) -> qdrant_models.SparseVector:
+        """
+        Encode a chunk of a document.
+
+        Args:
+            text (str): Text of the chunk
+
+        Returns:
+            qdrant_models.SparseVector: The sparse vector of the chunk
+        """
+        terms = Counter(self.tokenize(text))
+        length = sum(terms.values())
+        normalization = self.k1 * (1 - self.b + self.b * length / self.average_length)
+        return self._to_vector(
+            {
+                term: count * (self.k1 + 1) / (count + normalization)
+                for term, count in terms.items()
+            }
+        )
+
+    def encode_query(self, text: str) -> qdrant_models.SparseVector:
+        """
+        Encode a search query.
+
+        Args:
+            text (str): The query
+
+        Returns:
+            qdrant_models.SparseVector: The sparse vector of the query
+        """
+        return self._to_vector(dict.fromkeys(self.tokenize(text), 1.0))
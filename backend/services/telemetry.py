@@ -0,0 +1,181 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from opentelemetry import trace
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+from config.settings import Settings
+
+settings = Settings()
+
+_tracer = trace.get_tracer("rag-system")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+registry = CollectorRegistry()
+
+STAGE_DURATION = Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of the pipeline stages",
+    ["pipeline", "stage", "status"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+LLM_REQUEST_DURATION = Histogram(
+    "rag_llm_request_duration_seconds",
+    "Duration of the requests to the LLM API",
+    ["operation", "status"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total",
+    "Tokens consumed by the LLM API requests",
+    ["operation", "type"],
+    registry=registry,
+)
+QDRANT_REQUEST_DURATION = Histogram(
+    "rag_qdrant_request_duration_seconds",
+    "Duration of the requests to Qdrant",
+    ["operation", "status"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+RETRIES = Counter(
+    "rag_retries_total",
+    "Retried requests to the external services",
+    ["operation"],
+    registry=registry,
+)
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests_total",
+    "Cache lookups by result",
+    ["cache", "result"],
+    registry=registry,
+)
+CACHE_MEMORY = Gauge(
+    "rag_cache_memory_bytes",
+    "Memory taken by the in-process cache entries",
+    ["cache"],
+    registry=registry,
+)
+RATE_LIMIT_WAIT = Histogram(
+    "rag_llm_rate_limit_wait_seconds",
+    "Time the LLM requests waited for the rate limit budgets",
+    ["priority"],
+    buckets=DEFAULT_BUCKETS,
+    registry=registry,
+)
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "rag_single_flight_requests_total",
+    "Calls that started a request or joined an identical one in flight",
+    ["operation", "result"],
+    registry=registry,
+)
+EVENT_LOOP_LAG = Histogram(
+    "rag_event_loop_lag_seconds",
+    "Delay of the event loop in running a scheduled callback",
+    buckets=LAG_BUCKETS,
+    registry=registry,
+)
+
+
+@contextmanager
+def track(histogram: Histogram, **labels: Any) -> Iterator[None]:
+    """
+    Observe the duration of a block, labelled with its outcome.
+
+    The outcome is recorded in the ``status`` label as ``ok``, ``error`` or
+    ``cancelled``.
+
+    Args:
+        histogram (Histogram): Histogram with a ``status`` label
+        **labels: Value of the other labels of the histogram
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        histogram.labels(status=status, **labels).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def span(pipeline: str, stage: str, **attributes: Any) -> Iterator[None]:
+    """
+    Trace a pipeline stage.
+
+    The duration of the stage is recorded in ``rag_stage_duration_seconds``, and
+    the stage is traced as an OpenTelemetry span, which is only exported when an
+    OpenTelemetry SDK is configured.
+
+    Args:
+        pipeline (str): Name of the pipeline
+        stage (str): Name of the stage
+        **attributes: Attributes of the OpenTelemetry span
+    """
+    with _tracer.start_as_current_span(
+        f"{pipeline}.{stage}", attributes=attributes
+    ), track(STAGE_DURATION, pipeline=pipeline, stage=stage):
+        yield
+
+
+def record_tokens(operation: str, usage: Any) -> None:
+    """
+    Record the token usage reported by the LLM API.
+
+    Args:
+        operation (str): The LLM operation (chat, embedding)
+        usage (Any): The ``usage`` object of the response, if any
+    """
+    if usage is None:
+        return
+    LLM_TOKENS.labels(operation=operation, type="prompt").inc(usage.prompt_tokens or 0)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if completion_tokens:
+        LLM_TOKENS.labels(operation=operation, type="completion").inc(completion_tokens)
+
+
+class EventLoopMonitor:
+    """
+    Measures the event loop lag, the delay between the time a sleeping task should
+    wake up and the time it actually runs. A growing lag means blocking code is
+    running on the event loop.
+    """
+
+    def __init__(self, interval: float = None):
+        """
+        Initialize the EventLoopMonitor.
+
+        Args:
+            interval (float, optional): Time in seconds between two measurements
+        """
+        self.interval = interval or settings.METRICS_EVENT_LOOP_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - self.interval))
+
+    def start(self) -> None:
+        """Start measuring the lag of the running event loop."""
+        self._task = asyncio.create_task(self._run(), name="event-loop-monitor")
+
+    async def stop(self) -> None:
+        """Stop measuring."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,59 @@
+import re
+from functools import lru_cache
+from typing import Callable
+
+import tiktoken
+
+from config.settings import Settings
+from services.logs import logger
+
+settings = Settings()
+
+# Words and punctuation, the pieces byte-pair encodings rarely merge across
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def _estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without a tokenizer.
+
+    Each punctuation mark counts as one token and words as one token every four
+    characters, which is close to the OpenAI encodings for English text.
+    """
+    return sum((len(piece) + 3) // 4 for piece in _PIECE_PATTERN.findall(text))
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model: str = None) -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a text for an embedding model.
+
+    The encoding of the model is loaded once with ``tiktoken``. Unknown models
+    (such as Azure deployment names) use the ``cl100k_base`` encoding of the OpenAI
+    embedding models. When the encoding cannot be loaded (``tiktoken`` downloads it
+    on first use), a warning is logged and the number of tokens is estimated.
+
+    Args:
+        model (str, optional): Name of the model, ``OPENAI_EMBEDDING_MODEL`` by
+            default
+
+    Returns:
+        Callable[[str], int]: Function returning the number of tokens of a text
+    """
+    model = model or settings.OPENAI_EMBEDDING_MODEL
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(
+            f"Could not load the tokenizer of {model}, token counts are estimated: "
+            f"{e!r}"
+        )
+        return _estimate_tokens
+
+    def count_tokens(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return count_tokens
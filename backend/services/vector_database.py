@@ -1,13 +1,48 @@
-from typing import List, Tuple
+import asyncio
+import random
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import httpx
 from qdrant_client import AsyncQdrantClient
 from qdrant_client import models as qdrant_models
+from qdrant_client.http.exceptions import UnexpectedResponse
 
 from config.settings import Settings
 from services.llm import OpenAI
+from services.logs import logger
+from services.sparse_encoder import SparseEncoder
+from services.telemetry import QDRANT_REQUEST_DURATION, RETRIES, track
 
 settings = Settings()
 
+# Number of point ids sent per request by the operations that only carry ids
+_IDS_BATCH_SIZE = 1000
+
+# Name of the sparse lexical vector of the points, next to the unnamed dense one
+SPARSE_VECTOR_NAME = "text-sparse"
+
+# Payload key of the normalized product name, partitioning the points by product
+PRODUCT_ID_KEY = "product_id"
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def get_product_id(product_name: Any) -> Optional[str]:
+    """
+    Normalize a product name into the id of its partition.
+
+    Args:
+        product_name (Any): The product name, as extracted from a document
+
+    Returns:
+        str, optional: The product id, or None if the name has no words
+    """
+    if not isinstance(product_name, str):
+        return None
+    return "-".join(_WORD_PATTERN.findall(product_name.lower())) or None
+
 
 class VectorDatabase:
     """
@@ -18,65 +53,283 @@ class VectorDatabase:
     - Performing similarity searches
     - Managing metadata and filters
     - Handling collection operations
+    - Hybrid search, fusing dense and sparse lexical vectors when
+      ``HYBRID_SEARCH_ENABLED`` is set
+
+    The points are partitioned by product: their normalized product name is
+    stored under ``product_id``, a keyword index flagged as tenant, so Qdrant
+    stores the points of a product together and searches filtered on it only
+    visit the partition of the product.
+
+    The dense vectors can be quantized (``QDRANT_QUANTIZATION``) with their
+    originals kept on disk (``QDRANT_ON_DISK``): searches then run on the
+    quantized vectors, over-fetching ``QDRANT_OVERSAMPLING`` times the results,
+    which are rescored with the originals.
     """
 
-    def __init__(self):
-        """Initialize connection to the Qdrant vector database."""
-        self.qdrant = self._get_client()
-        self.llm = OpenAI()
+    def __init__(self, qdrant: AsyncQdrantClient = None, llm: OpenAI = None):
+        """
+        Initialize connection to the Qdrant vector database.
+
+        Args:
+            qdrant (AsyncQdrantClient, optional): Shared Qdrant client. A new one is
+                created when not provided
+            llm (OpenAI, optional): Shared OpenAI client used to embed queries. A new
+                one is created when not provided
+        """
+        self.qdrant = qdrant or self._get_client()
+        self.llm = llm or OpenAI()
+        self.sparse_encoder = SparseEncoder()
+        # Disabled by assert_collection when the collection has no sparse vectors
+        self.hybrid = settings.HYBRID_SEARCH_ENABLED
 
     @classmethod
     def _get_client(cls) -> AsyncQdrantClient:
+        # Local in-process mode, used by the benchmarks
+        if settings.QDRANT_ENDPOINT == ":memory:":
+            return AsyncQdrantClient(location=":memory:")
+
         return AsyncQdrantClient(
             url=settings.QDRANT_ENDPOINT,
             port=settings.QDRANT_PORT,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
             api_key=settings.QDRANT_API_KEY,
+            timeout=int(settings.HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
         )
 
-    @classmethod
-    async def assert_collection(cls):
+    async def close(self) -> None:
+        """Close the connections to the Qdrant vector database."""
+        await self.qdrant.close()
+
+    async def assert_collection(self):
         """
         Assert that the Qdrant collection exists.
         This method checks if the collection is created and raises an error if not.
         """
-        qdrant = cls._get_client()
-        assert (
-            await qdrant.get_collection(settings.QDRANT_COLLECTION_NAME) is not None
-        ), "Qdrant Collection is not created"
+        collection = await self.qdrant.get_collection(settings.QDRANT_COLLECTION_NAME)
+        assert collection is not None, "Qdrant Collection is not created"
 
-    @classmethod
-    async def create_collection(cls):
+        sparse_vectors = collection.config.params.sparse_vectors or {}
+        if self.hybrid and SPARSE_VECTOR_NAME not in sparse_vectors:
+            logger.warning(
+                f"Collection {settings.QDRANT_COLLECTION_NAME} has no sparse vectors, "
+                "hybrid search is disabled. Recreate the collection and ingest the "
+                "documents again to enable it"
+            )
+            self.hybrid = False
+
+    @staticmethod
+    def _quantization_config() -> Optional[qdrant_models.QuantizationConfig]:
+        """Quantization of the dense vectors, as configured."""
+        if settings.QDRANT_QUANTIZATION == "scalar":
+            return qdrant_models.ScalarQuantization(
+                scalar=qdrant_models.ScalarQuantizationConfig(
+                    type=qdrant_models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+                )
+            )
+        if settings.QDRANT_QUANTIZATION == "binary":
+            return qdrant_models.BinaryQuantization(
+                binary=qdrant_models.BinaryQuantizationConfig(
+                    always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+                )
+            )
+        return None
+
+    @staticmethod
+    def _quantization_fields(
+        config: Optional[qdrant_models.QuantizationConfig],
+    ) -> Tuple:
+        """The fields of a quantization that are controlled by the settings."""
+        if isinstance(config, qdrant_models.ScalarQuantization):
+            scalar = config.scalar
+            return ("scalar", scalar.type, scalar.quantile, bool(scalar.always_ram))
+        if isinstance(config, qdrant_models.BinaryQuantization):
+            return ("binary", bool(config.binary.always_ram))
+        if isinstance(config, qdrant_models.ProductQuantization):
+            return ("product",)
+        return ("none",)
+
+    @staticmethod
+    def _search_params() -> Optional[qdrant_models.SearchParams]:
+        """Parameters of the dense searches, as configured."""
+        quantization = None
+        if settings.QDRANT_QUANTIZATION != "none":
+            quantization = qdrant_models.QuantizationSearchParams(
+                rescore=settings.QDRANT_RESCORE,
+                oversampling=settings.QDRANT_OVERSAMPLING,
+            )
+        if quantization is None and settings.QDRANT_HNSW_EF is None:
+            return None
+        return qdrant_models.SearchParams(
+            hnsw_ef=settings.QDRANT_HNSW_EF, quantization=quantization
+        )
+
+    async def create_collection(self):
         """
         Create the needed Qdrant collection with the specified configuration.
         This method sets up the collection for storing vector embeddings and metadata.
         """
-        qdrant = cls._get_client()
-        await qdrant.create_collection(
+        await self.qdrant.create_collection(
             collection_name=settings.QDRANT_COLLECTION_NAME,
             vectors_config=qdrant_models.VectorParams(
                 size=settings.VECTOR_DIMENSIONS,
                 distance=qdrant_models.Distance.COSINE,
+                on_disk=settings.QDRANT_ON_DISK,
+            ),
+            hnsw_config=qdrant_models.HnswConfigDiff(
+                m=settings.QDRANT_HNSW_M,
+                ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
             ),
+            quantization_config=self._quantization_config(),
+            # Sparse vectors are always created, so hybrid search can be enabled
+            # later without recreating the collection
+            sparse_vectors_config={
+                SPARSE_VECTOR_NAME: qdrant_models.SparseVectorParams(
+                    modifier=qdrant_models.Modifier.IDF
+                )
+            },
         )
-        await qdrant.create_payload_index(
+        await self.qdrant.create_payload_index(
             collection_name=settings.QDRANT_COLLECTION_NAME,
             field_name="product_name",
             field_schema=qdrant_models.PayloadSchemaType.TEXT,
         )
-        await qdrant.create_payload_index(
+        await self.qdrant.create_payload_index(
             collection_name=settings.QDRANT_COLLECTION_NAME,
             field_name="keywords",
             field_schema=qdrant_models.PayloadSchemaType.KEYWORD,
         )
+        await self._create_product_index()
 
-    @classmethod
-    async def delete_collection(cls) -> None:
+    async def _create_product_index(self) -> None:
+        await self.qdrant.create_payload_index(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            field_name=PRODUCT_ID_KEY,
+            field_schema=qdrant_models.KeywordIndexParams(
+                type=qdrant_models.KeywordIndexType.KEYWORD, is_tenant=True
+            ),
+        )
+
+    async def partition_by_product(self) -> int:
+        """
+        Set the product id of the points stored before the partitioning by
+        product, from the product name in their payload.
+
+        Returns:
+            int: Number of points partitioned
+        """
+        unpartitioned = qdrant_models.Filter(
+            must=[
+                qdrant_models.IsEmptyCondition(
+                    is_empty=qdrant_models.PayloadField(key=PRODUCT_ID_KEY)
+                )
+            ]
+        )
+        partitioned = 0
+        offset = None
+        while True:
+            with track(QDRANT_REQUEST_DURATION, operation="scroll"):
+                points, offset = await self.qdrant.scroll(
+                    collection_name=settings.QDRANT_COLLECTION_NAME,
+                    scroll_filter=unpartitioned,
+                    limit=_IDS_BATCH_SIZE,
+                    offset=offset,
+                    with_payload=["product_name"],
+                    with_vectors=False,
+                )
+            point_ids = defaultdict(list)
+            for point in points:
+                product_id = get_product_id(point.payload.get("product_name"))
+                if product_id is not None:
+                    point_ids[product_id].append(point.id)
+            for product_id, ids in point_ids.items():
+                await self.set_payload(ids, {PRODUCT_ID_KEY: product_id})
+                partitioned += len(ids)
+            if offset is None:
+                return partitioned
+
+    async def migrate_collection(self) -> bool:
+        """
+        Update the storage of an existing collection to the configured one.
+
+        The on disk storage, HNSW parameters and quantization of the dense vectors
+        are compared with the settings, on the fields the settings control, and
+        only the differences are sent to Qdrant, which rebuilds the index and
+        quantized vectors in the background while the collection stays searchable.
+        The tenant index of the product ids is created if missing.
+
+        Returns:
+            bool: Whether the collection was updated
+        """
+        collection = await self.qdrant.get_collection(settings.QDRANT_COLLECTION_NAME)
+        config = collection.config
+        vectors = config.params.vectors
+        if isinstance(vectors, dict):
+            vectors = vectors.get("")
+
+        changes = []
+        if PRODUCT_ID_KEY not in (collection.payload_schema or {}):
+            await self._create_product_index()
+            changes.append(f"{PRODUCT_ID_KEY} tenant index")
+        vectors_config = None
+        if vectors is not None and bool(vectors.on_disk) != settings.QDRANT_ON_DISK:
+            vectors_config = {
+                "": qdrant_models.VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK)
+            }
+            changes.append(f"on_disk={settings.QDRANT_ON_DISK}")
+
+        hnsw_config = None
+        if (config.hnsw_config.m, config.hnsw_config.ef_construct) != (
+            settings.QDRANT_HNSW_M,
+            settings.QDRANT_HNSW_EF_CONSTRUCT,
+        ):
+            hnsw_config = qdrant_models.HnswConfigDiff(
+                m=settings.QDRANT_HNSW_M,
+                ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+            )
+            changes.append(
+                f"m={settings.QDRANT_HNSW_M}, "
+                f"ef_construct={settings.QDRANT_HNSW_EF_CONSTRUCT}"
+            )
+
+        quantization_config = None
+        wanted = self._quantization_config()
+        if self._quantization_fields(
+            config.quantization_config
+        ) != self._quantization_fields(wanted):
+            quantization_config = wanted or qdrant_models.Disabled.DISABLED
+            changes.append(f"quantization={settings.QDRANT_QUANTIZATION}")
+
+        if not changes:
+            return False
+
+        logger.info(
+            f"Migrating collection {settings.QDRANT_COLLECTION_NAME}: "
+            + "; ".join(changes)
+        )
+        if (vectors_config, hnsw_config, quantization_config) != (None, None, None):
+            await self.qdrant.update_collection(
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                vectors_config=vectors_config,
+                hnsw_config=hnsw_config,
+                quantization_config=quantization_config,
+            )
+        return True
+
+    async def delete_collection(self) -> None:
         """
         Delete the Qdrant collection.
         This method removes the collection and all its data.
         """
-        qdrant = cls._get_client()
-        await qdrant.delete_collection(
+        await self.qdrant.delete_collection(
             collection_name=settings.QDRANT_COLLECTION_NAME,
         )
 
@@ -84,12 +337,33 @@ class VectorDatabase:
         """
         Create Qdrant filters from filter items.
 
+        When product names are among the items, the filter selects the partitions
+        of these products, and the other items are left to the ranking. Otherwise
+        the points matching any of the items are selected.
+
         Args:
             filters_data (List[Tuple]): List of (key, value) pairs to filter on
 
         Returns:
             qdrant_models.Filter: Qdrant filter object
         """
+        product_ids = list(
+            dict.fromkeys(
+                product_id
+                for k, v in filters_data
+                if k == "product_name" and (product_id := get_product_id(v))
+            )
+        )
+        if product_ids:
+            return qdrant_models.Filter(
+                must=[
+                    qdrant_models.FieldCondition(
+                        key=PRODUCT_ID_KEY,
+                        match=qdrant_models.MatchAny(any=product_ids),
+                    )
+                ]
+            )
+
         qdrant_filter = qdrant_models.Filter(
             should=[
                 qdrant_models.FieldCondition(
@@ -101,23 +375,316 @@ class VectorDatabase:
 
         return qdrant_filter
 
+    async def _upsert_batch(
+        self, points: List[qdrant_models.PointStruct], wait: bool
+    ) -> bool:
+        """
+        Upsert a single batch of points, retrying transient failures with backoff.
+
+        Args:
+            points (List[qdrant_models.PointStruct]): Points of the batch
+            wait (bool): Whether to wait until the points are applied
+
+        Returns:
+            bool: Whether Qdrant reported the points as applied, rather than only
+                acknowledged
+        """
+        attempt = 0
+        while True:
+            try:
+                with track(QDRANT_REQUEST_DURATION, operation="upsert"):
+                    result = await self.qdrant.upsert(
+                        collection_name=settings.QDRANT_COLLECTION_NAME,
+                        points=points,
+                        wait=wait,
+                    )
+                return result.status == qdrant_models.UpdateStatus.COMPLETED
+            except Exception as e:
+                # Client errors other than rate limiting will not succeed on retry
+                if (
+                    isinstance(e, UnexpectedResponse)
+                    and 400 <= e.status_code < 500
+                    and e.status_code != 429
+                ):
+                    raise
+
+                attempt += 1
+                if attempt > settings.QDRANT_UPSERT_MAX_RETRIES:
+                    raise
+
+                RETRIES.labels(operation="qdrant_upsert").inc()
+                delay = settings.QDRANT_UPSERT_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                delay += random.uniform(0, settings.QDRANT_UPSERT_RETRY_BASE_DELAY)
+                logger.warning(
+                    f"Upsert of {len(points)} points failed, retrying in {delay:.1f}s "
+                    f"(attempt {attempt}/{settings.QDRANT_UPSERT_MAX_RETRIES}): {e!r}"
+                )
+                await asyncio.sleep(delay)
+
     async def upsert(
         self,
         points: List[qdrant_models.PointStruct],
-    ) -> None:
+        wait: bool = True,
+    ) -> List[qdrant_models.PointStruct]:
         """
         Insert or update points in the vector database.
 
+        Points are sent in batches of ``QDRANT_UPSERT_BATCH_SIZE``, with at most
+        ``QDRANT_UPSERT_PARALLELISM`` batches in flight, and each batch is retried
+        on its own when it fails.
+
         Args:
             points (List[qdrant_models.PointStruct]): List of points to upsert
+            wait (bool): Whether to wait until the points are applied. When False,
+                the call returns once Qdrant acknowledged the batches
+
+        Returns:
+            List[qdrant_models.PointStruct]: Points of the batches Qdrant only
+                acknowledged. Upserting them again with ``wait=True``, which is
+                idempotent, returns once they are applied and searchable
         """
-        await self.qdrant.upsert(
-            collection_name=settings.QDRANT_COLLECTION_NAME,
-            points=points,
-        )
+        semaphore = asyncio.Semaphore(settings.QDRANT_UPSERT_PARALLELISM)
+
+        async def upsert_batch(batch: List[qdrant_models.PointStruct]) -> bool:
+            async with semaphore:
+                return await self._upsert_batch(batch, wait)
+
+        batch_size = settings.QDRANT_UPSERT_BATCH_SIZE
+        batches = [
+            points[i : i + batch_size] for i in range(0, len(points), batch_size)
+        ]
+        applied = await asyncio.gather(*[upsert_batch(batch) for batch in batches])
+        return [
+            point
+            for batch, batch_applied in zip(batches, applied)
+            if not batch_applied
+            for point in batch
+        ]
+
+    async def delete(self, point_ids: List[str]) -> None:
+        """
+        Delete points from the vector database, in batches.
+
+        Args:
+            point_ids (List[str]): Ids of the points to delete
+        """
+        for i in range(0, len(point_ids), _IDS_BATCH_SIZE):
+            with track(QDRANT_REQUEST_DURATION, operation="delete"):
+                await self.qdrant.delete(
+                    collection_name=settings.QDRANT_COLLECTION_NAME,
+                    points_selector=qdrant_models.PointIdsList(
+                        points=point_ids[i : i + _IDS_BATCH_SIZE]
+                    ),
+                )
+
+    async def delete_by_filename(self, filename: str) -> None:
+        """
+        Delete every point of a document from the vector database.
+
+        Args:
+            filename (str): Name of the document
+        """
+        with track(QDRANT_REQUEST_DURATION, operation="delete"):
+            await self.qdrant.delete(
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                points_selector=qdrant_models.FilterSelector(
+                    filter=qdrant_models.Filter(
+                        must=[
+                            qdrant_models.FieldCondition(
+                                key="filename",
+                                match=qdrant_models.MatchValue(value=filename),
+                            )
+                        ]
+                    )
+                ),
+            )
+
+    async def set_payload(self, point_ids: List[str], payload: Dict[str, Any]) -> None:
+        """
+        Update the payload of existing points, in batches, without touching their
+        vectors.
+
+        Args:
+            point_ids (List[str]): Ids of the points to update
+            payload (Dict[str, Any]): Payload keys to set on every point
+        """
+        for i in range(0, len(point_ids), _IDS_BATCH_SIZE):
+            with track(QDRANT_REQUEST_DURATION, operation="set_payload"):
+                await self.qdrant.set_payload(
+                    collection_name=settings.QDRANT_COLLECTION_NAME,
+                    payload=payload,
+                    points=point_ids[i : i + _IDS_BATCH_SIZE],
+                )
+
+    async def delete_payload(self, point_ids: List[str], keys: List[str]) -> None:
+        """
+        Remove payload keys from existing points, in batches.
+
+        Args:
+            point_ids (List[str]): Ids of the points to update
+            keys (List[str]): Payload keys to remove from every point
+        """
+        for i in range(0, len(point_ids), _IDS_BATCH_SIZE):
+            with track(QDRANT_REQUEST_DURATION, operation="delete_payload"):
+                await self.qdrant.delete_payload(
+                    collection_name=settings.QDRANT_COLLECTION_NAME,
+                    keys=keys,
+                    points=point_ids[i : i + _IDS_BATCH_SIZE],
+                )
+
+    def get_point_vector(
+        self, embedding: List[float], text: str
+    ) -> Union[List[float], Dict[str, Any]]:
+        """
+        Build the vectors of a point from the embedding of its text.
+
+        Args:
+            embedding (List[float]): Dense embedding of the text
+            text (str): The text, encoded as a sparse vector for hybrid search
+
+        Returns:
+            Union[List[float], Dict[str, Any]]: The vector of the point
+        """
+        if not self.hybrid:
+            return embedding
+        return {
+            "": embedding,
+            SPARSE_VECTOR_NAME: self.sparse_encoder.encode_document(text),
+        }
+
+    def _hybrid_prefetch(
+        self,
+        query_embedding: List[float],
+        query_text: str,
+        filters: Optional[qdrant_models.Filter],
+    ) -> List[qdrant_models.Prefetch]:
+        """The dense and sparse searches fused by a hybrid search."""
+        return [
+            qdrant_models.Prefetch(
+                query=query_embedding,
+                filter=filters,
+                params=self._search_params(),
+                limit=settings.HYBRID_PREFETCH_LIMIT,
+            ),
+            qdrant_models.Prefetch(
+                query=self.sparse_encoder.encode_query(query_text),
+                using=SPARSE_VECTOR_NAME,
+                filter=filters,
+                limit=settings.HYBRID_PREFETCH_LIMIT,
+            ),
+        ]
+
+    async def search_by_embedding(
+        self,
+        query_embedding: List[float],
+        filters: qdrant_models.Filter = None,
+        query_text: str = None,
+        limit: int = 5,
+        with_vectors: bool = False,
+    ) -> List[qdrant_models.ScoredPoint]:
+        """
+        Search for vectors similar to an already computed query embedding.
+
+        With hybrid search, the dense search and a sparse lexical search of the
+        query text are prefetched and fused with Reciprocal Rank Fusion by Qdrant,
+        in a single request.
+
+        Args:
+            query_embedding (List[float]): The embedding of the query
+            filters (qdrant_models.Filter, optional): Optional filters to apply to the search
+            query_text (str, optional): The text of the query, needed for hybrid
+                search
+            limit (int): Number of results
+            with_vectors (bool): Whether to return the vectors of the results
+
+        Returns:
+            List[qdrant_models.ScoredPoint]: List of matching vectors with their scores
+        """
+        if self.hybrid and query_text:
+            with track(QDRANT_REQUEST_DURATION, operation="hybrid_search"):
+                search_results = await self.qdrant.query_points(
+                    collection_name=settings.QDRANT_COLLECTION_NAME,
+                    prefetch=self._hybrid_prefetch(
+                        query_embedding, query_text, filters
+                    ),
+                    query=qdrant_models.FusionQuery(fusion=qdrant_models.Fusion.RRF),
+                    limit=limit,
+                    with_vectors=with_vectors,
+                )
+            return search_results.points
+
+        with track(QDRANT_REQUEST_DURATION, operation="search"):
+            search_results = await self.qdrant.query_points(
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                query=query_embedding,
+                limit=limit,
+                query_filter=filters,
+                search_params=self._search_params(),
+                with_vectors=with_vectors,
+            )
+
+        return search_results.points
+
+    async def search_batch_by_embedding(
+        self,
+        query_embeddings: List[List[float]],
+        filters: List[Optional[qdrant_models.Filter]],
+        query_texts: List[str],
+        limit: int = 5,
+        with_vectors: bool = False,
+    ) -> List[List[qdrant_models.ScoredPoint]]:
+        """
+        Run the searches of many query embeddings in a single request.
+
+        Args:
+            query_embeddings (List[List[float]]): The embeddings of the queries
+            filters (List[Optional[qdrant_models.Filter]]): The filters of each
+                query, None for no filter
+            query_texts (List[str]): The text of each query, needed for hybrid
+                search
+            limit (int): Number of results of each query
+            with_vectors (bool): Whether to return the vectors of the results
+
+        Returns:
+            List[List[qdrant_models.ScoredPoint]]: The matching vectors of each
+                query, in the same order as ``query_embeddings``
+        """
+        if not query_embeddings:
+            return []
+
+        requests = []
+        for query_embedding, query_filter, query_text in zip(
+            query_embeddings, filters, query_texts
+        ):
+            if self.hybrid and query_text:
+                request = qdrant_models.QueryRequest(
+                    prefetch=self._hybrid_prefetch(
+                        query_embedding, query_text, query_filter
+                    ),
+                    query=qdrant_models.FusionQuery(fusion=qdrant_models.Fusion.RRF),
+                    limit=limit,
+                    with_payload=True,
+                    with_vector=with_vectors,
+                )
+            else:
+                request = qdrant_models.QueryRequest(
+                    query=query_embedding,
+                    filter=query_filter,
+                    params=self._search_params(),
+                    limit=limit,
+                    with_payload=True,
+                    with_vector=with_vectors,
+                )
+            requests.append(request)
+
+        with track(QDRANT_REQUEST_DURATION, operation="search_batch"):
+            responses = await self.qdrant.query_batch_points(
+                collection_name=settings.QDRANT_COLLECTION_NAME, requests=requests
+            )
+        return [response.points for response in responses]
 
     async def search_context(
-        self, query: str, filters: qdrant_models.Filter = None
+        self, query: str, filters: qdrant_models.Filter = None, limit: int = 5
     ) -> List[qdrant_models.ScoredPoint]:
         """
         Search for similar vectors in the database.
@@ -125,17 +692,13 @@ class VectorDatabase:
         Args:
             query (str): The query text to search for
             filters (qdrant_models.Filter, optional): Optional filters to apply to the search
+            limit (int): Number of results
 
         Returns:
             List[qdrant_models.ScoredPoint]: List of matching vectors with their scores
         """
         query_embedding = await self.llm.get_embedding(query)
 
-        search_results = await self.qdrant.query_points(
-            collection_name=settings.QDRANT_COLLECTION_NAME,
-            query=query_embedding,
-            limit=5,
-            query_filter=filters,
+        return await self.search_by_embedding(
+            query_embedding, filters=filters, query_text=query, limit=limit
         )
-
-        return search_results.points
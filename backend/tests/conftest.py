@@ -0,0 +1,21 @@
+import os
+
+# The services load the settings when they are imported, which require the
+# configuration of the backend: the tests only need placeholders, as they never
+# reach the external services
+_TEST_ENVIRONMENT = {
+    "OPENAI_ENDPOINT": "http://127.0.0.1:9",
+    "OPENAI_API_KEY": "test",
+    "OPENAI_API_VERSION": "2024-10-21",
+    "OPENAI_TYPE": "openai",
+    "OPENAI_CHAT_MODEL": "gpt-4o-mini",
+    "OPENAI_EMBEDDING_MODEL": "text-embedding-3-small",
+    "QDRANT_ENDPOINT": ":memory:",
+    "QDRANT_PORT": "6333",
+    "QDRANT_COLLECTION_NAME": "test",
+    "AZURE_OCR_ENDPOINT": "http://127.0.0.1:9",
+    "AZURE_OCR_KEY": "test",
+}
+
+for name, value in _TEST_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
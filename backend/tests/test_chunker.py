@@ -0,0 +1,139 @@
+import re
+
+from services.chunker import MarkdownChunker, TextChunker
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def make_chunker(max_tokens: int, overlap_tokens: int) -> MarkdownChunker:
+    return MarkdownChunker(
+        max_tokens=max_tokens, overlap_tokens=overlap_tokens, count_tokens=count_words
+    )
+
+
+def words(prefix: str, count: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_chunks_follow_sections():
+    text = f"# Manual\n\n## Install\n\n{words('a', 5)}\n\n## Wiring\n\n{words('b', 5)}"
+
+    chunks = make_chunker(50, 5).chunk(text)
+
+    assert [chunk.section_path for chunk in chunks] == [
+        ("Manual", "Install"),
+        ("Manual", "Wiring"),
+    ]
+    assert chunks[0].text == f"# Manual\n\n## Install\n\n{words('a', 5)}"
+    assert chunks[1].text == f"## Wiring\n\n{words('b', 5)}"
+
+
+def test_chunks_fit_and_point_into_the_text():
+    text = "# Title\n\n" + "\n\n".join(words(f"p{p}w", 8) for p in range(6))
+
+    chunks = make_chunker(20, 4).chunk(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert count_words(chunk.text) <= 20
+        # The chunk ends with its content, after the overlap of the previous one
+        assert chunk.text.endswith(text[chunk.start : chunk.end])
+
+
+def test_continued_section_starts_with_overlap():
+    text = "# Title\n\n" + "\n\n".join(words(f"p{p}w", 8) for p in range(3))
+
+    chunks = make_chunker(20, 4).chunk(text)
+
+    assert chunks[1].text.startswith("p0w4 p0w5 p0w6 p0w7\np1w0")
+
+
+def test_long_paragraph_is_split_between_words():
+    text = f"# Title\n\n{words('w', 100)}"
+
+    chunks = make_chunker(30, 5).chunk(text)
+
+    assert len(chunks) > 3
+    assert all(count_words(chunk.text) <= 30 for chunk in chunks)
+    content = " ".join(text[chunk.start : chunk.end] for chunk in chunks)
+    assert content.split()[2:] == words("w", 100).split()
+
+
+def test_split_table_repeats_its_header():
+    header = "| Pin | Signal |\n| --- | --- |"
+    rows = "\n".join(f"| r{i} | value {i} |" for i in range(30))
+    text = f"## Wiring\n\n{header}\n{rows}"
+
+    chunks = make_chunker(40, 5).chunk(text)
+
+    assert len(chunks) > 1
+    assert chunks[0].text.startswith(f"## Wiring\n\n{header}\n| r0 |")
+    for chunk in chunks[1:]:
+        assert chunk.text.startswith(f"{header}\n| r")
+    found_rows = [line for chunk in chunks for line in chunk.text.split("\n")[2:]]
+    assert [row for row in found_rows if row.startswith("| r")] == rows.split("\n")
+
+
+def test_headings_are_never_alone():
+    text = "# Part\n\n## Empty\n\n### Section\n\nShort text."
+
+    chunks = make_chunker(50, 5).chunk(text)
+
+    assert len(chunks) == 1
+    assert chunks[0].text == text
+    assert chunks[0].section_path == ("Part", "Empty", "Section")
+
+
+def test_text_chunks_pack_lines_with_their_offsets():
+    lines = [words(f"l{i}_", 4) for i in range(6)]
+    text = "\n".join(lines) + "\n"
+
+    chunks = TextChunker(chunk_size=60, chunk_overlap=0).chunk(text)
+
+    assert [chunk.text for chunk in chunks] == [
+        "\n".join(lines[i : i + 3]) for i in (0, 3)
+    ]
+    for chunk in chunks:
+        assert len(chunk.text) <= 60
+        assert text[chunk.start : chunk.end] == chunk.text
+
+
+def test_text_chunks_overlap_the_previous_chunk():
+    text = "\n".join(words(f"l{i}_", 4) for i in range(6))
+
+    chunks = TextChunker(chunk_size=60, chunk_overlap=10).chunk(text)
+
+    first, second = (text[chunk.start : chunk.end] for chunk in chunks[:2])
+    assert chunks[1].text == first[-10:] + "\n" + second
+
+
+def test_long_lines_are_split_on_words():
+    text = "intro\n" + words("w", 40) + "\noutro"
+
+    chunks = TextChunker(chunk_size=50, chunk_overlap=0).chunk(text)
+
+    assert all(len(chunk.text) <= 50 for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks).split() == text.split()
+    for chunk in chunks:
+        assert text[chunk.start : chunk.end] == chunk.text
+
+
+def test_html_tags_are_cleaned_within_the_chunk_offsets():
+    html = "<p>Torque  <b>values</b></p>\n<table><tr><td>M8</td></tr></table>"
+    text = f"{html} {words('w', 20)}"
+    chunker = TextChunker(chunk_size=40, chunk_overlap=0, clean_html_tags=True)
+
+    chunks = chunker.chunk(text)
+
+    assert all("<" not in chunk.text and len(chunk.text) <= 40 for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks).split() == [
+        "Torque",
+        "values",
+        "M8",
+        *words("w", 20).split(),
+    ]
+    for chunk in chunks:
+        raw = text[chunk.start : chunk.end]
+        assert " ".join(re.sub(r"<[^>]+>", "", raw).split()) == chunk.text
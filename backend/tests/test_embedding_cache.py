@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from services.embedding_cache import EmbeddingCache
+
+# Vectors of 4 floats take 16 bytes
+VECTORS = {key: [float(i)] * 4 for i, key in enumerate("abcd")}
+
+
+def test_memory_tier_evicts_least_recently_used_beyond_its_size():
+    async def main():
+        cache = EmbeddingCache(max_bytes=48)
+        await cache.set_many({key: VECTORS[key] for key in "abc"})
+        # Reading "a" makes "b" the least recently used
+        assert await cache.get_many(["a"]) == {"a": VECTORS["a"]}
+        await cache.set_many({"d": VECTORS["d"]})
+        return cache, await cache.get_many("abcd")
+
+    cache, found = asyncio.run(main())
+    assert found == {key: VECTORS[key] for key in "acd"}
+    assert cache.stats["memory_items"] == 3
+    assert cache.stats["memory_bytes"] == 48
+
+
+def test_disk_tier_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    vector = [0.25, -1.5, 3.0]
+
+    async def main():
+        cache = EmbeddingCache(max_bytes=0, path=path)
+        await cache.set_many({"a": vector})
+        cache.close()
+
+        cache = EmbeddingCache(max_bytes=1024, path=path)
+        try:
+            return cache, await cache.get_many(["a", "b"])
+        finally:
+            cache.close()
+
+    cache, found = asyncio.run(main())
+    assert found == {"a": vector}
+    assert cache.stats["disk_hits"] == 1
+    assert (cache.stats["hits"], cache.stats["misses"]) == (1, 1)
+
+
+def test_disk_tier_evicts_least_recently_used_beyond_its_entries(tmp_path):
+    async def main():
+        # Nothing is kept in memory, every read goes to disk
+        cache = EmbeddingCache(
+            max_bytes=0, path=str(tmp_path / "embeddings.sqlite3"), max_disk_entries=3
+        )
+        try:
+            for key in "abc":
+                await cache.set_many({key: VECTORS[key]})
+                time.sleep(0.01)
+            # Reading "a" makes "b" the least recently used
+            await cache.get_many(["a"])
+            time.sleep(0.01)
+            await cache.set_many({"d": VECTORS["d"]})
+            return await cache.get_many("abcd")
+        finally:
+            cache.close()
+
+    assert asyncio.run(main()) == {key: VECTORS[key] for key in "acd"}
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+from uuid import uuid4
+
+from qdrant_client import models as qdrant_models
+
+from core.ingestion_pipeline import IngestionPipeline
+from services.chunker import TextChunker
+from services.document_registry import DocumentRegistry
+from services.vector_database import VectorDatabase
+
+SECTIONS = [
+    f"# Section {i}\n\n" + " ".join(f"word{i}_{j}" for j in range(150))
+    for i in range(6)
+]
+
+
+class FakeLLM:
+    def __init__(self):
+        self.embedded = []
+
+    async def get_embeddings(self, texts, on_progress=None):
+        self.embedded.extend(texts)
+        return [self.vector(text) for text in texts]
+
+    @staticmethod
+    def vector(text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [(digest[i % 32] + 1) / 256 for i in range(1536)]
+
+
+class Document:
+    """A PDF file whose extracted text and metadata are set by the test."""
+
+    def __init__(self, tmp_path, text, metadata):
+        self.path = str(tmp_path / "manual.pdf")
+        self.version = 0
+        self.update(text, metadata)
+
+    def update(self, text, metadata):
+        self.text, self.metadata = text, metadata
+        self.version += 1
+        with open(self.path, "w") as f:
+            f.write(f"version {self.version}")
+
+
+def make_pipeline(tmp_path, document):
+    llm = FakeLLM()
+    pipeline = IngestionPipeline(
+        llm=llm,
+        vector_database=VectorDatabase(llm=llm),
+        document_registry=DocumentRegistry(path=str(tmp_path / "registry.sqlite3")),
+    )
+
+    async def extract_text(pdf_path):
+        return document.text
+
+    async def extract_metadata(text, content_hash=None):
+        return dict(document.metadata)
+
+    pipeline._extract_text_from_pdf = extract_text
+    pipeline._extract_metadata = extract_metadata
+    return pipeline
+
+
+def reported(progress, key):
+    return [values[key] for values in progress if key in values]
+
+
+async def stored_points(pipeline):
+    points, _ = await pipeline.vector_database.qdrant.scroll(
+        collection_name="test", limit=1000, with_payload=True
+    )
+    return {str(point.id): point.payload for point in points}
+
+
+def test_reingest_embeds_new_chunks_and_deletes_stale_ones(tmp_path):
+    document = Document(
+        tmp_path, "\n\n".join(SECTIONS[:4]), {"product_name": "MW500", "year": 2020}
+    )
+
+    async def main():
+        pipeline = make_pipeline(tmp_path, document)
+        await pipeline.vector_database.create_collection()
+        await pipeline.process("manual.pdf", document.path)
+        record = await pipeline.document_registry.get("manual.pdf")
+        first_ids = set(record["point_ids"])
+        pipeline.llm.embedded.clear()
+
+        # Replaces the last section
+        document.update(
+            "\n\n".join(SECTIONS[:3] + SECTIONS[4:5]), {"product_name": "MW500"}
+        )
+        progress = []
+
+        async def on_progress(**values):
+            progress.append(values)
+
+        count = await pipeline.process("manual.pdf", document.path, on_progress)
+        record = await pipeline.document_registry.get("manual.pdf")
+        points = await stored_points(pipeline)
+        return pipeline, first_ids, count, record, progress, points
+
+    pipeline, first_ids, count, record, progress, points = asyncio.run(main())
+    new_ids = set(record["point_ids"])
+    kept_ids, stale_ids = new_ids & first_ids, first_ids - new_ids
+
+    assert kept_ids and stale_ids and new_ids - first_ids
+    assert count == len(new_ids)
+    assert set(points) == new_ids
+    # Only the new chunks are embedded
+    assert len(pipeline.llm.embedded) == len(new_ids - first_ids)
+    # Metadata keys gone from the new version are removed from the kept points
+    assert all("year" not in points[point_id] for point_id in kept_ids)
+    assert progress[-1] == {"reused": len(kept_ids), "deleted": len(stale_ids)}
+    assert reported(progress, "total_chunks") == [len(new_ids)]
+    assert reported(progress, "embedded")[-1] == len(new_ids)
+
+
+def test_unchanged_document_is_skipped(tmp_path):
+    document = Document(tmp_path, "\n\n".join(SECTIONS[:2]), {"product_name": "MW500"})
+
+    async def main():
+        pipeline = make_pipeline(tmp_path, document)
+        await pipeline.vector_database.create_collection()
+        count = await pipeline.process("manual.pdf", document.path)
+        pipeline.llm.embedded.clear()
+        progress = []
+
+        async def on_progress(**values):
+            progress.append(values)
+
+        assert await pipeline.process("manual.pdf", document.path, on_progress) == count
+        return pipeline, count, progress
+
+    pipeline, count, progress = asyncio.run(main())
+    assert pipeline.llm.embedded == []
+    assert progress == [{"skipped": True, "total_chunks": count}]
+
+
+def test_repeated_chunks_are_stored_and_counted_once(tmp_path):
+    document = Document(tmp_path, "spare part " * 800, {})
+
+    async def main():
+        pipeline = make_pipeline(tmp_path, document)
+        await pipeline.vector_database.create_collection()
+        progress = []
+
+        async def on_progress(**values):
+            progress.append(values)
+
+        count = await pipeline.process("manual.pdf", document.path, on_progress)
+        return count, progress, await stored_points(pipeline)
+
+    count, progress, points = asyncio.run(main())
+    chunks = list(TextChunker(1000, 200).iter_chunks(document.text))
+    assert count == len(points) < len(chunks)
+    assert reported(progress, "total_chunks") == [count]
+
+
+def test_points_of_documents_without_record_are_replaced(tmp_path):
+    document = Document(tmp_path, "\n\n".join(SECTIONS[:2]), {"product_name": "MW500"})
+
+    async def main():
+        pipeline = make_pipeline(tmp_path, document)
+        vector_database = pipeline.vector_database
+        await vector_database.create_collection()
+        # Points stored with random ids, before the document registry
+        legacy_points = [
+            qdrant_models.PointStruct(
+                id=str(uuid4()),
+                vector=vector_database.get_point_vector(FakeLLM.vector(text), text),
+                payload={"text": text, "filename": filename},
+            )
+            for text, filename in [
+                (SECTIONS[0], "manual.pdf"),
+                (SECTIONS[1], "manual.pdf"),
+                (SECTIONS[1], "other.pdf"),
+            ]
+        ]
+        await vector_database.upsert(legacy_points)
+
+        await pipeline.process("manual.pdf", document.path)
+        record = await pipeline.document_registry.get("manual.pdf")
+        return legacy_points, record, await stored_points(pipeline)
+
+    legacy_points, record, points = asyncio.run(main())
+    assert set(points) == set(record["point_ids"]) | {str(legacy_points[2].id)}
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from services import llm
+from services.rate_governor import get_rate_governor
+
+
+def vector(text: str) -> list:
+    return [float(len(text)), float(sum(map(ord, text)))]
+
+
+def rate_limit_error(retry_after: str = None) -> RateLimitError:
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(
+        429, headers=headers, request=httpx.Request("POST", "http://test")
+    )
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+class FakeEmbeddings:
+    """Embedding endpoint returning its data out of order, failing on demand."""
+
+    def __init__(self, errors=()):
+        self.inputs = []
+        self.errors = list(errors)
+
+    async def create(self, input, model):
+        self.inputs.append(input)
+        if self.errors:
+            raise self.errors.pop(0)
+        texts = [input] if isinstance(input, str) else input
+        data = [
+            SimpleNamespace(index=i, embedding=vector(text))
+            for i, text in enumerate(texts)
+        ]
+        usage = SimpleNamespace(prompt_tokens=len(texts), total_tokens=len(texts))
+        response = SimpleNamespace(data=data[::-1], usage=usage)
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+
+@asynccontextmanager
+async def embedding_client(embeddings: FakeEmbeddings):
+    client = llm.OpenAI()
+    http_client = client.client
+    client.client = SimpleNamespace(
+        embeddings=SimpleNamespace(with_raw_response=embeddings)
+    )
+    client.embedding_cache = None
+    try:
+        yield client
+    finally:
+        await http_client.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_governors():
+    # Governors are shared by the process and pausing one holds the next tests
+    get_rate_governor.cache_clear()
+    yield
+    get_rate_governor.cache_clear()
+
+
+def test_batches_are_bounded_by_size_and_tokens(monkeypatch):
+    monkeypatch.setattr(llm.settings, "EMBEDDING_BATCH_SIZE", 3)
+    monkeypatch.setattr(llm.settings, "EMBEDDING_BATCH_MAX_TOKENS", 10)
+
+    # Estimated tokens: len // 4 + 1
+    texts = ["a", "b", "c", "d", "x" * 20, "y" * 20, "z" * 60, "e"]
+    assert llm.OpenAI._make_batches(texts) == [[0, 1, 2], [3, 4], [5], [6], [7]]
+
+
+def test_embeddings_keep_order_and_embed_duplicates_once(monkeypatch):
+    monkeypatch.setattr(llm.settings, "EMBEDDING_BATCH_SIZE", 2)
+    embeddings = FakeEmbeddings()
+    texts = ["alpha", "beta", "alpha", "gamma", "delta", "beta"]
+    progress = []
+
+    async def on_progress(done, total):
+        progress.append((done, total))
+
+    async def main():
+        async with embedding_client(embeddings) as client:
+            return await client.get_embeddings(texts, on_progress)
+
+    assert asyncio.run(main()) == [vector(text) for text in texts]
+    assert sorted(text for batch in embeddings.inputs for text in batch) == [
+        "alpha",
+        "beta",
+        "delta",
+        "gamma",
+    ]
+    assert len(embeddings.inputs) == 2
+    # Duplicates count as done from the start
+    assert progress[-1] == (6, 6)
+
+
+def test_rate_limited_batch_is_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(llm.settings, "EMBEDDING_RETRY_BASE_DELAY", 0.02)
+    embeddings = FakeEmbeddings([rate_limit_error(), rate_limit_error()])
+
+    async def main():
+        async with embedding_client(embeddings) as client:
+            return await client._embed_batch(["alpha", "beta"])
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) == [vector("alpha"), vector("beta")]
+    # Exponential backoff: 0.02s then 0.04s, plus jitter
+    assert time.perf_counter() - start >= 0.06
+    assert len(embeddings.inputs) == 3
+
+
+def test_rate_limited_batch_waits_for_retry_after(monkeypatch):
+    monkeypatch.setattr(llm.settings, "EMBEDDING_RETRY_BASE_DELAY", 0)
+    embeddings = FakeEmbeddings([rate_limit_error(retry_after="0.1")])
+
+    async def main():
+        async with embedding_client(embeddings) as client:
+            return await client._embed_batch(["alpha"])
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) == [vector("alpha")]
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_rate_limited_batch_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(llm.settings, "EMBEDDING_RETRY_BASE_DELAY", 0)
+    monkeypatch.setattr(llm.settings, "EMBEDDING_MAX_RETRIES", 2)
+    embeddings = FakeEmbeddings([rate_limit_error() for _ in range(3)])
+
+    async def main():
+        async with embedding_client(embeddings) as client:
+            await client._embed_batch(["alpha"])
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(main())
+    assert len(embeddings.inputs) == 3
+
+
+def test_rate_limited_single_embedding_is_retried(monkeypatch):
+    monkeypatch.setattr(llm.settings, "EMBEDDING_RETRY_BASE_DELAY", 0)
+    monkeypatch.setattr(llm.settings, "SINGLE_FLIGHT_ENABLED", False)
+    embeddings = FakeEmbeddings([rate_limit_error()])
+
+    async def main():
+        async with embedding_client(embeddings) as client:
+            return await client.get_embedding("alpha")
+
+    assert asyncio.run(main()) == vector("alpha")
+    assert embeddings.inputs == [["alpha"], ["alpha"]]
@@ -0,0 +1,45 @@
+from services.metadata_matcher import MetadataMatcher
+
+
+def make_matcher(fuzzy_cutoff: float = 0.85) -> MetadataMatcher:
+    matcher = MetadataMatcher(fuzzy_cutoff=fuzzy_cutoff)
+    matcher.update(
+        "acs580.pdf",
+        {"product_name": "ACS580 Drive", "keywords": ["frequency inverter", "IP55"]},
+    )
+    matcher.update("mw500.pdf", {"product_name": "MW500", "keywords": "inverter"})
+    return matcher
+
+
+def test_matches_known_values_on_word_boundaries():
+    matcher = make_matcher()
+
+    assert matcher.match("How do I wire the acs580  DRIVE frequency inverter?") == [
+        ("product_name", "ACS580 Drive"),
+        ("keywords", "frequency inverter"),
+        ("keywords", "inverter"),
+    ]
+    exact_matcher = make_matcher(fuzzy_cutoff=1)
+    assert exact_matcher.match("Is the MW5000 rated IP55?") == [("keywords", "IP55")]
+    assert exact_matcher.match("What is the lifetime of inverters?") == []
+
+
+def test_matches_misspelled_values():
+    matcher = make_matcher()
+
+    assert matcher.match("Reset the ACS580 Drvie") == [
+        ("product_name", "ACS580 Drive")
+    ]
+    assert make_matcher(fuzzy_cutoff=1).match("Reset the ACS580 Drvie") == []
+
+
+def test_follows_document_updates():
+    matcher = make_matcher()
+    assert matcher.match("mw500 manual") == [("product_name", "MW500")]
+
+    matcher.remove("mw500.pdf")
+    assert matcher.match("mw500 manual") == []
+    assert matcher.document_count == 1
+
+    matcher.update("acs580.pdf", {"product_name": "ACS880"})
+    assert matcher.match("ACS580 Drive or ACS880") == [("product_name", "ACS880")]
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from services.rate_governor import Priority, RateGovernor, request_priority
+
+
+def make_governor(**budgets) -> RateGovernor:
+    options = {
+        "requests_per_minute": 0,
+        "tokens_per_minute": 0,
+        "max_concurrency": 0,
+        "background_reserve": 0,
+    }
+    options.update(budgets)
+    return RateGovernor(**options)
+
+
+async def hold(governor: RateGovernor, order: list, name: str, release: asyncio.Event):
+    async with governor.acquire(1):
+        order.append(name)
+        await release.wait()
+
+
+def test_limits_concurrent_requests():
+    async def main():
+        governor = make_governor(max_concurrency=2)
+        order = []
+        release = asyncio.Event()
+        tasks = [
+            asyncio.create_task(hold(governor, order, name, release))
+            for name in ("a", "b", "c")
+        ]
+        await asyncio.sleep(0.01)
+        assert order == ["a", "b"]
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert governor._in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_serves_interactive_requests_first():
+    async def main():
+        governor = make_governor(max_concurrency=1)
+        order = []
+        first, others = asyncio.Event(), asyncio.Event()
+        others.set()
+        running = asyncio.create_task(hold(governor, order, "first", first))
+        await asyncio.sleep(0.01)
+
+        with request_priority(Priority.BACKGROUND):
+            background = asyncio.create_task(
+                hold(governor, order, "background", others)
+            )
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(hold(governor, order, "interactive", others))
+        await asyncio.sleep(0.01)
+
+        first.set()
+        await asyncio.gather(running, background, interactive)
+        assert order == ["first", "interactive", "background"]
+
+    asyncio.run(main())
+
+
+def test_keeps_a_reserve_for_interactive_requests():
+    async def main():
+        governor = make_governor(max_concurrency=4, background_reserve=0.5)
+        order = []
+        release = asyncio.Event()
+        with request_priority(Priority.BACKGROUND):
+            background = [
+                asyncio.create_task(hold(governor, order, f"background{i}", release))
+                for i in range(3)
+            ]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(hold(governor, order, "interactive", release))
+        await asyncio.sleep(0.01)
+
+        assert order == ["background0", "background1", "interactive"]
+        release.set()
+        await asyncio.gather(*background, interactive)
+
+    asyncio.run(main())
+
+
+def test_waits_for_the_token_budget():
+    async def main():
+        # 6000 tokens per minute refill 100 tokens per second
+        governor = make_governor(tokens_per_minute=6000)
+        start = time.monotonic()
+        async with governor.acquire(6000):
+            pass
+        async with governor.acquire(10):
+            pass
+        return time.monotonic() - start
+
+    assert 0.05 < asyncio.run(main()) < 1
+
+
+def test_records_the_actual_usage():
+    async def main():
+        governor = make_governor(tokens_per_minute=6000)
+        async with governor.acquire(1000) as permit:
+            permit.record_usage(200)
+        return governor._tokens.level
+
+    assert 5790 < asyncio.run(main()) <= 6000
+
+
+def test_pause_holds_every_request():
+    async def main():
+        governor = make_governor()
+        governor.pause(0.1)
+        start = time.monotonic()
+        async with governor.acquire(1):
+            pass
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.09
@@ -0,0 +1,83 @@
+from qdrant_client import models as qdrant_models
+
+from services.reranker import Reranker
+
+QUERY = [0.8, 0.6]
+
+
+def point(name: str, vector: list, text: str = "chunk") -> qdrant_models.ScoredPoint:
+    return qdrant_models.ScoredPoint(
+        id=len(name),
+        version=0,
+        score=0.0,
+        payload={"name": name, "text": text},
+        vector=vector,
+    )
+
+
+def make_reranker(**options) -> Reranker:
+    defaults = {"mmr_lambda": 0.5, "min_score": 0.0, "max_results": 10}
+    defaults.update(options)
+    return Reranker(
+        max_tokens=defaults.pop("max_tokens", 100),
+        count_tokens=lambda text: len(text.split()),
+        **defaults,
+    )
+
+
+def names(points) -> list:
+    return [point.payload["name"] for point in points]
+
+
+# Relevance to the query: best 0.96, duplicate 0.86, other 0.8. The duplicate is
+# almost the same as other, far from best.
+CANDIDATES = [
+    point("other", [1.0, 0.0]),
+    point("duplicate", [0.995, 0.0998]),
+    point("best", [0.6, 0.8]),
+]
+
+
+def test_mmr_puts_near_duplicates_last():
+    assert names(make_reranker(mmr_lambda=1).rerank(QUERY, CANDIDATES)) == [
+        "best",
+        "duplicate",
+        "other",
+    ]
+    assert names(make_reranker().rerank(QUERY, CANDIDATES)) == [
+        "best",
+        "other",
+        "duplicate",
+    ]
+
+
+def test_results_are_bounded_and_lose_their_vectors():
+    results = make_reranker(max_results=2).rerank(QUERY, CANDIDATES)
+
+    assert names(results) == ["best", "other"]
+    assert all(result.vector is None for result in results)
+
+
+def test_chunks_beyond_the_token_budget_are_skipped():
+    candidates = [
+        point("best", [0.6, 0.8], "a b c d e f"),
+        point("duplicate", [0.995, 0.0998], "a b c"),
+        point("other", [1.0, 0.0], "a b"),
+    ]
+
+    def rerank(max_tokens):
+        reranker = make_reranker(mmr_lambda=1, max_tokens=max_tokens)
+        return names(reranker.rerank(QUERY, candidates))
+
+    # The best chunk is kept even when it does not fit
+    assert rerank(4) == ["best"]
+    assert rerank(8) == ["best", "other"]
+
+
+def test_chunks_below_the_min_score_are_dropped():
+    assert names(make_reranker(min_score=0.85).rerank(QUERY, CANDIDATES)) == [
+        "best",
+        "duplicate",
+    ]
+    # The most relevant chunk is kept whatever the cutoff
+    assert names(make_reranker(min_score=0.99).rerank(QUERY, CANDIDATES)) == ["best"]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_request():
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        flights = SingleFlight("test")
+        results = await asyncio.gather(
+            flights.do("a", lambda: fetch(1)),
+            flights.do("a", lambda: fetch(1)),
+            flights.do("b", lambda: fetch(2)),
+        )
+        # Results are shared, never cached
+        results.append(await flights.do("a", lambda: fetch(1)))
+        return results
+
+    assert asyncio.run(main()) == [2, 2, 4, 2]
+    assert calls == [1, 2, 1]
+
+
+def test_errors_are_raised_to_every_caller():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def main():
+        flights = SingleFlight("test")
+        return await asyncio.gather(
+            flights.do("a", fail), flights.do("a", fail), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        flights = SingleFlight("test")
+        first = asyncio.create_task(flights.do("a", fetch))
+        second = asyncio.create_task(flights.do("a", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_request_is_cancelled_without_callers():
+    async def main():
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        flights = SingleFlight("test")
+        caller = asyncio.create_task(flights.do("a", fetch))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 0.5)
+        assert flights._calls == {}
+
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import zlib
+
+import pytest
+
+from services.sparse_encoder import SparseEncoder
+
+
+def weights(vector) -> dict:
+    return dict(zip(vector.indices, vector.values))
+
+
+def term_index(term: str) -> int:
+    return zlib.crc32(term.encode())
+
+
+def test_tokenize_drops_stopwords_and_splits_codes():
+    terms = SparseEncoder.tokenize("What is the fault P0204 of the VF-nC1 drive?")
+
+    assert terms == ["fault", "p0204", "vf-nc1", "vf", "nc1", "drive"]
+
+
+def test_terms_are_hashed_into_stable_indices():
+    encoder = SparseEncoder()
+
+    first = encoder.encode_document("Inverter wiring")
+    second = SparseEncoder().encode_document("inverter WIRING")
+
+    assert set(first.indices) == {term_index("inverter"), term_index("wiring")}
+    assert weights(first) == weights(second)
+
+
+def test_query_terms_have_unit_weights():
+    vector = SparseEncoder().encode_query("reset reset fault")
+
+    assert weights(vector) == {term_index("reset"): 1.0, term_index("fault"): 1.0}
+
+
+def test_document_weights_follow_bm25_term_frequency():
+    encoder = SparseEncoder(k1=1.2, b=0.75, average_length=4)
+
+    vector = weights(encoder.encode_document("reset reset reset fault"))
+
+    # Four terms, as long as the average: the normalization is k1
+    assert vector[term_index("reset")] == pytest.approx(3 * 2.2 / (3 + 1.2))
+    assert vector[term_index("fault")] == pytest.approx(2.2 / (1 + 1.2))
+    # Repeated terms saturate below k1 + 1
+    assert vector[term_index("reset")] < 2.2
+
+
+def test_longer_documents_weigh_their_terms_less():
+    encoder = SparseEncoder(average_length=4)
+
+    short = weights(encoder.encode_document("reset fault"))
+    long = weights(encoder.encode_document("reset fault " + "torque " * 10))
+
+    assert long[term_index("reset")] < short[term_index("reset")]
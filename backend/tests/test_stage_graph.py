@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from core.stage_graph import Stage, StageGraph
+
+
+async def value(result, delay=0.0):
+    await asyncio.sleep(delay)
+    return result
+
+
+async def fail():
+    raise RuntimeError("failed")
+
+
+def test_stages_receive_their_dependencies():
+    async def add(left, right):
+        return left + right
+
+    graph = StageGraph(
+        [
+            Stage("left", lambda: value(1)),
+            Stage("right", lambda: value(2)),
+            Stage("sum", add, depends_on=("left", "right")),
+        ]
+    )
+
+    assert asyncio.run(graph.run()) == {"left": 1, "right": 2, "sum": 3}
+
+
+def test_independent_stages_run_concurrently():
+    graph = StageGraph(
+        [Stage(name, lambda: value(name, 0.1)) for name in ("a", "b", "c")]
+    )
+
+    async def main():
+        run = graph.start()
+        await run.results()
+        return run.timings
+
+    timings = asyncio.run(main())
+    assert set(timings) == {"a", "b", "c"}
+    assert all(0.09 < seconds < 0.2 for seconds in timings.values())
+
+
+def test_stages_must_be_declared_before_their_dependents():
+    with pytest.raises(ValueError):
+        StageGraph([Stage("sum", value, depends_on=("missing",))])
+
+
+def test_optional_stage_falls_back_to_its_default():
+    graph = StageGraph(
+        [
+            Stage("timed_out", lambda: value(1, 1), timeout=0.01, optional=True),
+            Stage("failed", fail, optional=True, default="default"),
+        ]
+    )
+
+    assert asyncio.run(graph.run()) == {"timed_out": None, "failed": "default"}
+
+
+def test_optional_stage_falls_back_when_a_dependency_failed():
+    async def main():
+        run = StageGraph(
+            [
+                Stage("embedding", fail),
+                Stage("slow", lambda: value("slow", 1)),
+                Stage(
+                    "cached",
+                    lambda embedding: value(embedding),
+                    depends_on=("embedding",),
+                    optional=True,
+                    default="miss",
+                ),
+            ]
+        ).start()
+        try:
+            cached = await run.result("cached")
+            with pytest.raises(RuntimeError):
+                await run.results()
+        finally:
+            run.cancel()
+        await asyncio.sleep(0)
+        others = asyncio.all_tasks() - {asyncio.current_task()}
+        return cached, [task for task in others if not task.done()]
+
+    cached, pending = asyncio.run(main())
+    assert cached == "miss"
+    assert pending == []
+
+
+def test_required_failure_cancels_the_other_stages():
+    async def main():
+        run = StageGraph(
+            [Stage("failed", fail), Stage("slow", lambda: value("slow", 1))]
+        ).start()
+        with pytest.raises(RuntimeError):
+            await run.results()
+        await asyncio.sleep(0)
+        return run._tasks["slow"].cancelled()
+
+    assert asyncio.run(main())
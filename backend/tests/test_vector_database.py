@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+import pytest
+from qdrant_client import models as qdrant_models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from services.vector_database import PRODUCT_ID_KEY, VectorDatabase, settings
+
+
+class FakeLLM:
+    pass
+
+
+def make_point(vector_database, point_id, payload):
+    embedding = [1.0] + [0.0] * 1535
+    return qdrant_models.PointStruct(
+        id=point_id,
+        vector=vector_database.get_point_vector(embedding, payload["text"]),
+        payload=payload,
+    )
+
+
+def test_points_without_product_id_are_partitioned():
+    async def main():
+        vector_database = VectorDatabase(llm=FakeLLM())
+        await vector_database.create_collection()
+        await vector_database.upsert(
+            [
+                make_point(vector_database, 1, {"text": "a", "product_name": "MW 500"}),
+                make_point(
+                    vector_database,
+                    2,
+                    {"text": "b", "product_name": "MW 500", PRODUCT_ID_KEY: "mw-500"},
+                ),
+                make_point(vector_database, 3, {"text": "c", "product_name": "XP-9"}),
+                make_point(vector_database, 4, {"text": "d"}),
+            ]
+        )
+        partitioned = await vector_database.partition_by_product()
+        points, _ = await vector_database.qdrant.scroll(
+            collection_name="test", with_payload=True
+        )
+        matches, _ = await vector_database.qdrant.scroll(
+            collection_name="test",
+            scroll_filter=await vector_database.create_filters(
+                [("product_name", "mw 500")]
+            ),
+        )
+        # Partitioned points are not visited again
+        partitioned_again = await vector_database.partition_by_product()
+        return partitioned, points, matches, partitioned_again
+
+    partitioned, points, matches, partitioned_again = asyncio.run(main())
+    assert (partitioned, partitioned_again) == (2, 0)
+    assert {point.id: point.payload.get(PRODUCT_ID_KEY) for point in points} == {
+        1: "mw-500",
+        2: "mw-500",
+        3: "xp-9",
+        4: None,
+    }
+    assert sorted(point.id for point in matches) == [1, 2]
+
+
+class FlakyQdrant:
+    """Qdrant client failing its first upserts with the given errors."""
+
+    def __init__(self, *errors, status=qdrant_models.UpdateStatus.COMPLETED):
+        self.errors = list(errors)
+        self.status = status
+        self.upserts = []
+
+    async def upsert(self, collection_name, points, wait):
+        self.upserts.append((len(points), wait))
+        if self.errors:
+            raise self.errors.pop(0)
+        return qdrant_models.UpdateResult(operation_id=1, status=self.status)
+
+
+def http_error(status_code):
+    return UnexpectedResponse(status_code, "error", b"", httpx.Headers())
+
+
+def upsert_points(qdrant, count, wait=True):
+    vector_database = VectorDatabase(qdrant=qdrant, llm=FakeLLM())
+    points = [
+        qdrant_models.PointStruct(id=i, vector=[1.0], payload={"text": str(i)})
+        for i in range(count)
+    ]
+    return asyncio.run(vector_database.upsert(points, wait=wait))
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(settings, "QDRANT_UPSERT_RETRY_BASE_DELAY", 0)
+
+
+@pytest.mark.parametrize(
+    "error", [http_error(429), http_error(503), ResponseHandlingException(OSError())]
+)
+def test_upsert_retries_transient_failures(no_retry_delay, error):
+    qdrant = FlakyQdrant(error, error)
+    assert upsert_points(qdrant, 3) == []
+    assert qdrant.upserts == [(3, True)] * 3
+
+
+def test_upsert_does_not_retry_client_errors(no_retry_delay):
+    qdrant = FlakyQdrant(http_error(400))
+    with pytest.raises(UnexpectedResponse):
+        upsert_points(qdrant, 3)
+    assert len(qdrant.upserts) == 1
+
+
+def test_upsert_gives_up_after_max_retries(no_retry_delay, monkeypatch):
+    monkeypatch.setattr(settings, "QDRANT_UPSERT_MAX_RETRIES", 2)
+    qdrant = FlakyQdrant(*[http_error(503)] * 3)
+    with pytest.raises(UnexpectedResponse):
+        upsert_points(qdrant, 3)
+    assert len(qdrant.upserts) == 3
+
+
+def test_upsert_returns_the_points_only_acknowledged(monkeypatch):
+    monkeypatch.setattr(settings, "QDRANT_UPSERT_BATCH_SIZE", 2)
+    qdrant = FlakyQdrant(status=qdrant_models.UpdateStatus.ACKNOWLEDGED)
+    acknowledged = upsert_points(qdrant, 5, wait=False)
+    assert [point.id for point in acknowledged] == [0, 1, 2, 3, 4]
+    assert sorted(qdrant.upserts) == [(1, False), (2, False), (2, False)]
@@ -1,5 +1,7 @@
+import json
 import os
-from typing import List
+import time
+from typing import Any, Iterator, List, Tuple
 
 import requests
 import streamlit as st
@@ -33,14 +35,55 @@ def upload_documents(files: List[UploadedFile]) -> dict:
     return response.json()
 
 
-def get_answer(question: str) -> dict:
-    """Get answer from the backend API"""
-    question_endpoint = f"{BACKEND_URL}/question"
+def get_job(job_id: str) -> dict:
+    """Get the status of an ingestion job from the backend API"""
+    job_endpoint = f"{BACKEND_URL}/jobs/{job_id}"
 
-    response = requests.post(question_endpoint, json={"question": question})
+    response = requests.get(job_endpoint)
     return response.json()
 
 
+def wait_for_jobs(job_ids: List[str], poll_interval: float = 2.0) -> List[dict]:
+    """Poll the ingestion jobs until they are finished, showing their progress"""
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+
+    while True:
+        jobs = [get_job(job_id) for job_id in job_ids]
+
+        done = 0.0
+        for job in jobs:
+            progress = job["progress"]
+            if job["status"] in ("completed", "failed"):
+                done += 1
+            elif progress.get("total_chunks"):
+                done += 0.5 * progress["embedded"] / progress["total_chunks"]
+                done += 0.5 * progress["upserted"] / progress["total_chunks"]
+        progress_bar.progress(done / len(jobs))
+
+        finished = [job for job in jobs if job["status"] in ("completed", "failed")]
+        status_text.text(f"{len(finished)}/{len(jobs)} documents processed")
+        if len(finished) == len(jobs):
+            return jobs
+
+        time.sleep(poll_interval)
+
+
+def stream_answer(question: str) -> Iterator[Tuple[str, Any]]:
+    """Stream the answer from the backend API as (event, data) pairs"""
+    question_endpoint = f"{BACKEND_URL}/question/stream"
+
+    with requests.post(
+        question_endpoint, json={"question": question}, stream=True
+    ) as response:
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: ") :]
+            elif line.startswith("data: "):
+                yield event, json.loads(line[len("data: ") :])
+
+
 # App title
 st.title("🤖 RAG System")
 
@@ -55,9 +98,16 @@ with st.expander("Document Upload", expanded=True):
         if st.button("Process Documents"):
             with st.spinner("Processing documents..."):
                 result = upload_documents(uploaded_files)
-                st.success(
-                    f"Processed {result['documents_indexed']} documents with {result['total_chunks']} chunks"
-                )
+                jobs = wait_for_jobs([job["job_id"] for job in result["jobs"]])
+
+            completed = [job for job in jobs if job["status"] == "completed"]
+            total_chunks = sum(job["progress"]["upserted"] for job in completed)
+            st.success(
+                f"Processed {len(completed)} documents with {total_chunks} chunks"
+            )
+            for job in jobs:
+                if job["status"] == "failed":
+                    st.error(f"Failed to process {job['filename']}: {job['error']}")
 
 # Chat interface
 with st.expander("Chat", expanded=True):
@@ -79,19 +129,32 @@ with st.expander("Chat", expanded=True):
         with st.chat_message("user"):
             st.write(prompt)
 
-        # Get AI response
+        # Get AI response, rendering it as it is streamed
         with st.chat_message("assistant"):
+            answer_placeholder = st.empty()
+            references_placeholder = st.empty()
+            answer = ""
+            references = []
+
             with st.spinner("Thinking..."):
-                response = get_answer(prompt)
-                st.write(response["answer"])
-                if response["references"]:
-                    st.info("References: " + ", ".join(response["references"]))
-
-                # Add assistant message to chat history
-                st.session_state.messages.append(
-                    {
-                        "role": "assistant",
-                        "content": response["answer"],
-                        "references": ", ".join(response["references"]),
-                    }
-                )
+                for event, data in stream_answer(prompt):
+                    if event == "references":
+                        references = data
+                        if references:
+                            references_placeholder.info(
+                                "References: " + ", ".join(references)
+                            )
+                    elif event == "token":
+                        answer += data
+                        answer_placeholder.write(answer)
+                    elif event == "error":
+                        st.error(data)
+
+            # Add assistant message to chat history
+            st.session_state.messages.append(
+                {
+                    "role": "assistant",
+                    "content": answer,
+                    "references": ", ".join(references),
+                }
+            )